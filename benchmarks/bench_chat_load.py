@@ -0,0 +1,96 @@
+"""Concurrent /chat load against a stub LLM that simulates Ollama latency.
+
+The LLM scheduler is off by default (``--max-in-flight 0``), so the numbers
+measure the server itself. Pass ``--max-in-flight`` and ``--max-queue`` to
+measure admission control as well; requests it rejects with 503 are counted
+and reported, not treated as failures.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_chat_load.py``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.config import AppConfig, RAGConfig, SchedulerConfig
+from app.server import create_app
+
+
+class StubLLM:
+    def __init__(self, delay_s: float) -> None:
+        self.delay_s = delay_s
+
+    def invoke(self, prompt: str) -> str:
+        time.sleep(self.delay_s)
+        return "stub answer"
+
+    async def ainvoke(self, prompt: str) -> str:
+        await asyncio.sleep(self.delay_s)
+        return "stub answer"
+
+
+async def run(
+    concurrency: int, total: int, delay_s: float, max_in_flight: int, max_queue: int
+) -> None:
+    config = AppConfig(
+        rag=RAGConfig(vector_store="in_memory"),
+        scheduler=SchedulerConfig(max_in_flight=max_in_flight, max_queue=max_queue),
+    )
+    app = create_app(config, llm=StubLLM(delay_s))
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+    rejected = 0
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+
+        async def one(i: int) -> None:
+            nonlocal rejected
+            async with gate:
+                start = time.perf_counter()
+                response = await client.post("/chat", json={"message": f"question {i}"})
+                if response.status_code == 503:
+                    rejected += 1
+                    return
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"requests={total} concurrency={concurrency} llm_delay={delay_s * 1000:.0f}ms")
+    print(f"answered={len(latencies)} rejected={rejected} (503)")
+    print(f"throughput={len(latencies) / elapsed:.1f} answers/s")
+    if latencies:
+        print(f"p50={latencies[len(latencies) // 2]:.1f}ms max={latencies[-1]:.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=float, default=500.0)
+    parser.add_argument(
+        "--max-in-flight", type=int, default=0, help="LLM scheduler slots (0 disables it)"
+    )
+    parser.add_argument("--max-queue", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(
+        run(
+            args.concurrency,
+            args.requests,
+            args.delay_ms / 1000,
+            args.max_in_flight,
+            args.max_queue,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""First-message latency: per-session wiring versus shared components.
+
+"before" rebuilds the LLM client, guardrails, escalation logic, pipeline and
+agent for every new session, as the server used to. "after" looks up a
+session in the store and reuses the shared agent. Uses the real Ollama client
+when langchain-ollama is installed; pass ``--stub`` to isolate wiring cost.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_first_message.py``.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from statistics import median
+from typing import Callable, List
+
+from agent.agent import SupportAgent
+from agent.escalation import EscalationLogic
+from agent.guardrails import GuardrailEngine
+from agent.memory import ConversationMemory
+from app.components import build_components, create_llm, create_session_store
+from app.config import AppConfig, RAGConfig
+from rag.pipeline import RagPipeline
+
+QUESTION = "Where can I download invoices?"
+
+
+class StubLLM:
+    def invoke(self, prompt: str) -> str:
+        return "Invoices are under Account > Billing."
+
+
+def measure(first_message: Callable[[int], None], sessions: int) -> List[float]:
+    latencies = []
+    for i in range(sessions):
+        start = time.perf_counter()
+        first_message(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--stub", action="store_true")
+    args = parser.parse_args()
+
+    # Keep the answer cache out of the comparison.
+    config = AppConfig(rag=RAGConfig(vector_store="in_memory", answer_cache_size=0))
+    components = build_components(config, llm=StubLLM() if args.stub else None)
+    components.vector_store.add(["Invoices are under Account > Billing."])
+
+    def before(i: int) -> None:
+        if args.stub:
+            llm = StubLLM()
+        else:
+            from langchain_ollama import OllamaLLM
+
+            llm = OllamaLLM(model=config.ollama.model)
+        agent = SupportAgent(
+            config=config,
+            memory=ConversationMemory(max_turns=6, summary_trigger=10),
+            rag=RagPipeline(config=config.rag, vector_store=components.vector_store, llm=llm),
+            guardrails=GuardrailEngine(config=config.guardrails),
+            escalation=EscalationLogic(config=config.escalation),
+        )
+        agent.handle_message(f"{QUESTION} ({i})")
+
+    sessions = create_session_store(config)
+
+    def after(i: int) -> None:
+        components.agent.handle_message(f"{QUESTION} ({i})", session=sessions.get(str(i)))
+
+    if not args.stub and create_llm(config.ollama) is None:
+        raise SystemExit("langchain-ollama is not installed; rerun with --stub")
+
+    for label, fn in (("before", before), ("after", after)):
+        latencies = measure(fn, args.sessions)
+        print(f"{label:>6}: median={median(latencies):.2f}ms max={max(latencies):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
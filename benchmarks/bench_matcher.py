@@ -0,0 +1,88 @@
+"""Guardrail + escalation matching throughput as the term lists grow.
+
+Compares the compiled single-pass matcher with the previous approach: one
+substring check per keyword and two regex passes per PII pattern.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_matcher.py``.
+"""
+from __future__ import annotations
+
+import random
+import time
+from typing import Callable, List, Set
+
+from agent.escalation import ESCALATION_KEYWORDS, FRUSTRATION_KEYWORDS
+from agent.guardrails import PII_PATTERNS, RESTRICTED_KEYWORDS
+from agent.matcher import CompiledMatcher
+
+MESSAGES = [
+    "How do I reset my password? My email is jane.doe@example.com",
+    "I have been waiting for two weeks and this is not helpful at all",
+    "Where can I download invoices for the last billing cycle?",
+    "Please call me at 555-123-4567 about my order status",
+    "Can you explain the difference between the pro and team plans?",
+]
+
+
+def synthetic_terms(count: int) -> Set[str]:
+    rng = random.Random(count)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return {
+        " ".join("".join(rng.choices(letters, k=rng.randint(4, 9))) for _ in range(2))
+        for _ in range(count)
+    }
+
+
+def naive(restricted: Set[str]) -> Callable[[str], None]:
+    keyword_sets = [restricted, set(ESCALATION_KEYWORDS), set(FRUSTRATION_KEYWORDS)]
+
+    def run(text: str) -> None:
+        redacted = text
+        for pattern in PII_PATTERNS:
+            if pattern.search(redacted):
+                redacted = pattern.sub("[REDACTED]", redacted)
+        lowered = text.lower()
+        for keywords in keyword_sets:
+            any(keyword in lowered for keyword in keywords)
+
+    return run
+
+
+def compiled(restricted: Set[str]) -> Callable[[str], None]:
+    matcher = CompiledMatcher(
+        {
+            "restricted": restricted,
+            "escalation": ESCALATION_KEYWORDS,
+            "frustration": FRUSTRATION_KEYWORDS,
+        },
+        {f"pii{i}": pattern for i, pattern in enumerate(PII_PATTERNS)},
+    )
+
+    def run(text: str) -> None:
+        scan = matcher.scan(text)
+        scan.redact(text)
+
+    return run
+
+
+def throughput(fn: Callable[[str], None], messages: List[str], seconds: float = 0.5) -> float:
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for message in messages:
+            fn(message)
+        done += len(messages)
+    return done / (time.perf_counter() - start)
+
+
+def main() -> None:
+    print(f"{'terms':>7} {'compiled msg/s':>15} {'naive msg/s':>12}")
+    for count in (0, 100, 1_000, 5_000, 20_000):
+        restricted = set(RESTRICTED_KEYWORDS) | synthetic_terms(count)
+        fast = throughput(compiled(restricted), MESSAGES)
+        slow = throughput(naive(restricted), MESSAGES)
+        print(f"{len(restricted):>7} {fast:>15,.0f} {slow:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Query latency of the in-memory keyword store as the corpus grows.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_retrieval.py``.
+"""
+from __future__ import annotations
+
+import random
+import time
+from typing import List
+
+from rag.index import InMemoryVectorStore
+
+VOCABULARY = [f"term{i}" for i in range(20000)]
+QUERIES = [
+    "how do I reset my password",
+    "download invoices billing cycle",
+    "term17 term4242 shipping",
+]
+
+
+def make_corpus(size: int, words_per_doc: int = 120) -> List[str]:
+    rng = random.Random(size)
+    return [" ".join(rng.choices(VOCABULARY, k=words_per_doc)) for _ in range(size)]
+
+
+def linear_scan(documents: List[str], query: str, top_k: int) -> list:
+    # The pre-index implementation, kept for comparison.
+    ranked = []
+    query_terms = set(query.lower().split())
+    for doc in documents:
+        overlap = len(query_terms.intersection(set(doc.lower().split())))
+        if overlap > 0:
+            ranked.append((doc, overlap / max(len(query_terms), 1)))
+    ranked.sort(key=lambda item: item[1], reverse=True)
+    return ranked[:top_k]
+
+
+def time_per_query(fn, repeats: int = 20) -> float:
+    start = time.perf_counter()
+    for i in range(repeats):
+        fn(QUERIES[i % len(QUERIES)])
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main() -> None:
+    print(f"{'docs':>8} {'bm25 ms':>10} {'scan ms':>10}")
+    for size in (1_000, 5_000, 20_000, 50_000):
+        documents = make_corpus(size)
+        store = InMemoryVectorStore()
+        store.add(documents)
+        bm25_ms = time_per_query(lambda q: store.search(q, top_k=4))
+        scan_ms = time_per_query(lambda q: linear_scan(documents, q, 4), repeats=3)
+        print(f"{size:>8} {bm25_ms:>10.3f} {scan_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
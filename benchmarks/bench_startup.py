@@ -0,0 +1,110 @@
+"""CLI startup cost: import time and time to first answer, in fresh interpreters.
+
+Each run starts a new Python process, so nothing is warm from the previous
+run. It reports:
+- the time to import ``app.main``;
+- the time to import it and answer one question with a stub LLM and the
+  in-memory store;
+- for comparison, the eager import of ``app.server`` that ``app.main``
+  used to pay on every call.
+
+It also reports the per-query latency of a warm ``--interactive`` session.
+Pass ``--max-first-answer-ms`` to exit non-zero on a regression, for
+example in CI.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_startup.py``.
+"""
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+from statistics import median
+from typing import Optional
+
+IMPORT = "import app.main"
+EAGER_IMPORT = "import app.main, app.server"
+FIRST_ANSWER = """
+import app.main
+from app.components import build_components
+from app.config import AppConfig, RAGConfig
+
+class StubLLM:
+    def invoke(self, prompt):
+        return "Invoices are under Account > Billing."
+
+config = AppConfig(rag=RAGConfig(vector_store="in_memory"))
+build_components(config, llm=StubLLM()).agent.handle_message("Where are invoices?")
+"""
+
+
+def time_subprocess(code: str, runs: int) -> Optional[float]:
+    """Median wall time of ``code`` in fresh interpreters; ``None`` if it fails."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        done = subprocess.run(
+            [sys.executable, "-c", code],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if done.returncode != 0:
+            return None
+        timings.append((time.perf_counter() - start) * 1000)
+    return median(timings)
+
+
+def warm_query_ms(queries: int) -> float:
+    from app.components import build_components
+    from app.config import AppConfig, RAGConfig
+    from app.main import run_interactive
+
+    class StubLLM:
+        def invoke(self, prompt: str) -> str:
+            return "Invoices are under Account > Billing."
+
+    config = AppConfig(rag=RAGConfig(vector_store="in_memory", answer_cache_size=0))
+    agent = build_components(config, llm=StubLLM()).agent
+    source = io.StringIO("".join(f"Where are invoices for month {i}?\n" for i in range(queries)))
+    start = time.perf_counter()
+    run_interactive(agent, source, io.StringIO())
+    return (time.perf_counter() - start) * 1000 / queries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-first-answer-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    baseline = time_subprocess("pass", args.runs)
+    results = {
+        "import app.main": time_subprocess(IMPORT, args.runs),
+        "import + first answer": time_subprocess(FIRST_ANSWER, args.runs),
+        "eager import (+server)": time_subprocess(EAGER_IMPORT, args.runs),
+    }
+    print(f"interpreter startup: {baseline:.0f}ms (subtracted below)")
+    for label, total in results.items():
+        if total is None:
+            print(f"{label:>24}: unavailable (missing dependency)")
+        else:
+            print(f"{label:>24}: {total - baseline:8.1f}ms")
+    print(f"{'warm interactive query':>24}: {warm_query_ms(args.queries):8.3f}ms")
+
+    if results["import + first answer"] is None:
+        raise SystemExit("the first-answer run failed; run it by hand to see why")
+    first_answer = results["import + first answer"] - baseline
+    if args.max_first_answer_ms is not None and first_answer > args.max_first_answer_ms:
+        raise SystemExit(
+            f"first answer took {first_answer:.0f}ms, over {args.max_first_answer_ms:.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
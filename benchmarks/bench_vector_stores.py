@@ -0,0 +1,128 @@
+"""Recall@k versus query latency for the FAISS index types and Chroma.
+
+Vectors are synthetic (clustered, like real embeddings) and fed through a
+lookup-table embedder, so no Ollama server is needed. Recall is measured
+against exact brute-force search. Requires ``faiss-cpu`` and ``numpy``;
+Chroma is included when ``chromadb`` is installed.
+
+Run with ``PYTHONPATH=src python benchmarks/bench_vector_stores.py``.
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from rag.faiss_store import FaissVectorStore
+
+try:
+    import chromadb
+except ImportError:  # pragma: no cover
+    chromadb = None
+
+
+class TableEmbeddings:
+    def __init__(self, table: Dict[str, np.ndarray]) -> None:
+        self.table = table
+
+    def embed_documents(self, texts: List[str]) -> List[np.ndarray]:
+        return [self.table[text] for text in texts]
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self.table[text]
+
+
+def make_vectors(count: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centers[labels] + 0.35 * rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall(found: List[List[str]], truth: List[List[str]]) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / sum(len(t) for t in truth)
+
+
+def run_faiss(label, directory, embeddings, docs, queries, truth, k, **params) -> None:
+    store = FaissVectorStore(directory, embeddings, **params)
+    store.add(docs)
+    start = time.perf_counter()
+    reopened = FaissVectorStore(directory, embeddings, **params)
+    open_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    found = [[c.content for c in reopened.search(q, k)] for q in queries]
+    query_ms = (time.perf_counter() - start) / len(queries) * 1000
+    mmapped = "mmap" if reopened.stats()["faiss_mmapped"] else "read"
+    print(
+        f"{label:<22} {recall(found, truth):>8.3f} {query_ms:>10.3f} "
+        f"{open_ms:>9.1f} ({mmapped})"
+    )
+
+
+def run_chroma(directory, vectors, docs, query_vectors, truth, k) -> None:
+    client = chromadb.PersistentClient(path=directory)
+    collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+    for start in range(0, len(docs), 5000):
+        collection.add(
+            ids=docs[start : start + 5000],
+            documents=docs[start : start + 5000],
+            embeddings=vectors[start : start + 5000].tolist(),
+        )
+    start = time.perf_counter()
+    found = [
+        collection.query(query_embeddings=[vector.tolist()], n_results=k)["documents"][0]
+        for vector in query_vectors
+    ]
+    query_ms = (time.perf_counter() - start) / len(query_vectors) * 1000
+    print(f"{'chroma (hnsw)':<22} {recall(found, truth):>8.3f} {query_ms:>10.3f} {'-':>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.docs, args.dim, clusters=200, seed=1)
+    query_vectors = make_vectors(args.queries, args.dim, clusters=200, seed=1)[::-1].copy()
+    query_vectors += 0.05 * np.random.default_rng(2).normal(size=query_vectors.shape)
+    docs = [f"doc-{i}" for i in range(args.docs)]
+    queries = [f"query-{i}" for i in range(args.queries)]
+    table = dict(zip(docs, vectors))
+    table.update(zip(queries, query_vectors.astype(np.float32)))
+    embeddings = TableEmbeddings(table)
+
+    normalized = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    exact = np.argsort(-(normalized @ vectors.T), axis=1)[:, : args.k]
+    truth = [[docs[i] for i in row] for row in exact]
+
+    print(f"{args.docs} docs, dim {args.dim}, recall@{args.k}")
+    print(f"{'store':<22} {'recall':>8} {'query ms':>10} {'open ms':>9}")
+    configs = [
+        ("faiss flat", {"index_type": "flat"}),
+        ("faiss ivf nprobe=4", {"index_type": "ivf", "nlist": 256, "nprobe": 4}),
+        ("faiss ivf nprobe=16", {"index_type": "ivf", "nlist": 256, "nprobe": 16}),
+        ("faiss ivf nprobe=64", {"index_type": "ivf", "nlist": 256, "nprobe": 64}),
+        ("faiss hnsw ef=16", {"index_type": "hnsw", "ef_search": 16}),
+        ("faiss hnsw ef=64", {"index_type": "hnsw", "ef_search": 64}),
+        ("faiss hnsw ef=256", {"index_type": "hnsw", "ef_search": 256}),
+    ]
+    for label, params in configs:
+        with tempfile.TemporaryDirectory() as directory:
+            run_faiss(label, directory, embeddings, docs, queries, truth, args.k, **params)
+    if chromadb is not None:
+        with tempfile.TemporaryDirectory() as directory:
+            run_chroma(directory, vectors, docs, query_vectors, truth, args.k)
+    else:
+        print("chromadb not installed; skipping Chroma")
+
+
+if __name__ == "__main__":
+    main()
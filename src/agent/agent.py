@@ -1,13 +1,18 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional, Union
 
 from app.config import AppConfig
+from app.metrics import MetricsRegistry, activate_trace
 from agent.escalation import EscalationDecision, EscalationLogic
-from agent.guardrails import GuardrailEngine
+from agent.guardrails import GuardrailEngine, GuardrailResult
 from agent.memory import ConversationMemory
-from rag.pipeline import RagPipeline
+from agent.session import SessionState
+from rag.pipeline import RagDraft, RagPipeline
+from rag.scheduler import PRIORITY_HIGH
+
+ESCALATION_RESPONSE = "Your request needs a specialist. I will escalate this to a human agent."
 
 
 @dataclass
@@ -16,54 +21,217 @@ class AgentResult:
     escalated: bool
     escalation_reason: Optional[str]
     confidence: float
+    stage_ms: Dict[str, float] = field(default_factory=dict)
 
 
 class SupportAgent:
+    """Stateless orchestration over shared components.
+
+    Per-conversation state lives in a ``SessionState`` passed to each call, so
+    one agent can serve every session. Calls without a session use the
+    agent's own default session built from ``memory``. Sampled calls are
+    timed stage by stage into ``metrics`` and report the timings in
+    ``AgentResult.stage_ms``.
+    """
+
     def __init__(
         self,
         config: AppConfig,
-        memory: ConversationMemory,
+        memory: Optional[ConversationMemory],
         rag: RagPipeline,
         guardrails: GuardrailEngine,
         escalation: EscalationLogic,
+        metrics: Optional[MetricsRegistry] = None,
     ) -> None:
         self.config = config
-        self.memory = memory
         self.rag = rag
         self.guardrails = guardrails
         self.escalation = escalation
-        self._unresolved_turns = 0
+        self.metrics = metrics if metrics is not None else MetricsRegistry(sample_rate=0.0)
+        self.session = SessionState(
+            memory=memory if memory is not None else ConversationMemory()
+        )
+
+    @property
+    def memory(self) -> ConversationMemory:
+        return self.session.memory
+
+    def handle_message(
+        self,
+        user_input: str,
+        session: Optional[SessionState] = None,
+        guardrail: Optional[GuardrailResult] = None,
+    ) -> AgentResult:
+        """Answer one message. ``guardrail`` skips screening already done by the caller."""
+        state = session or self.session
+        trace = self.metrics.start_trace()
+        guardrail = guardrail or self.guardrails.evaluate(user_input)
+        safe_input = guardrail.redacted_input
+        trace.mark("guardrails")
+
+        early = self._escalate_early(state, user_input, guardrail, trace)
+        if early is not None:
+            return early
+
+        context = state.memory.context()
+        trace.mark("memory_context")
+        with activate_trace(trace):
+            draft = self.rag.prepare(safe_input, context=context)
+            decision = self._check_confidence(state, draft, trace)
+            if decision.escalate:
+                return self._escalate(state, user_input, decision, draft, trace)
+            answer, confidence = self.rag.generate(draft)
+        return self._record(state, user_input, decision, answer, confidence, trace)
+
+    async def ahandle_message(
+        self,
+        user_input: str,
+        session: Optional[SessionState] = None,
+        guardrail: Optional[GuardrailResult] = None,
+    ) -> AgentResult:
+        state = session or self.session
+        trace = self.metrics.start_trace()
+        guardrail = guardrail or self.guardrails.evaluate(user_input)
+        safe_input = guardrail.redacted_input
+        trace.mark("guardrails")
+
+        early = self._escalate_early(state, user_input, guardrail, trace)
+        if early is not None:
+            return early
+
+        context = await state.memory.acontext()
+        trace.mark("memory_context")
+        with activate_trace(trace):
+            draft = await self.rag.aprepare(safe_input, context=context)
+            decision = self._check_confidence(state, draft, trace)
+            if decision.escalate:
+                return self._escalate(state, user_input, decision, draft, trace)
+            answer, confidence = await self.rag.agenerate(draft)
+        return self._record(state, user_input, decision, answer, confidence, trace)
+
+    async def astream_message(
+        self, user_input: str, session: Optional[SessionState] = None
+    ) -> AsyncIterator[Union[str, AgentResult]]:
+        """Yield response tokens as they are generated, then the final AgentResult.
 
-    def handle_message(self, user_input: str) -> AgentResult:
+        Escalation is decided the same way as in ``handle_message``. An
+        escalated turn streams the handoff text without calling the LLM.
+        """
+        state = session or self.session
+        trace = self.metrics.start_trace()
         guardrail = self.guardrails.evaluate(user_input)
         safe_input = guardrail.redacted_input
+        trace.mark("guardrails")
 
-        context = self.memory.context()
-        answer, confidence = self.rag.generate_answer(safe_input, context=context)
+        early = self._escalate_early(state, user_input, guardrail, trace)
+        if early is not None:
+            yield ESCALATION_RESPONSE
+            yield early
+            return
 
-        decision = self.escalation.evaluate(
-            confidence=confidence,
+        context = await state.memory.acontext()
+        trace.mark("memory_context")
+        with activate_trace(trace):
+            draft = await self.rag.aprepare(safe_input, context=context)
+        decision = self._check_confidence(state, draft, trace)
+        if decision.escalate:
+            yield ESCALATION_RESPONSE
+            yield self._escalate(state, user_input, decision, draft, trace)
+            return
+
+        parts = []
+        async for token in self.rag.astream(draft):
+            parts.append(token)
+            yield token
+        # Includes time the consumer spent between tokens, i.e. time to last token.
+        trace.mark("llm")
+        yield self._record(
+            state, user_input, decision, "".join(parts), draft.confidence, trace
+        )
+
+    @staticmethod
+    def _lane(state: SessionState) -> Optional[int]:
+        """Scheduler lane for this turn's answer.
+
+        Turns that escalate never reach the LLM. The closest thing is a
+        session whose last turn went unresolved, which is one or two turns
+        from a handoff, so its answer goes first.
+        """
+        return PRIORITY_HIGH if state.unresolved_turns else None
+
+    def _escalate_early(
+        self,
+        state: SessionState,
+        user_input: str,
+        guardrail: GuardrailResult,
+        trace,
+    ) -> Optional[AgentResult]:
+        """Record a turn that escalates whatever the answer would be.
+
+        Returns ``None`` when an answer is needed. Escalated turns skip
+        retrieval and the LLM and report a confidence of 0.0.
+        """
+        decision = self.escalation.pre_generation(
             guardrail_reasons=guardrail.reasons,
-            unresolved_turns=self._unresolved_turns,
+            unresolved_turns=state.unresolved_turns,
             user_message=user_input,
+            scan=guardrail.scan,
         )
+        trace.mark("escalation")
+        if decision is None:
+            return None
+        return self._record(state, user_input, decision, ESCALATION_RESPONSE, 0.0, trace)
+
+    def _check_confidence(
+        self, state: SessionState, draft: RagDraft, trace
+    ) -> EscalationDecision:
+        """Decide on the draft's confidence, before any LLM call is made.
 
+        Confidence only depends on the retrieved chunks, so a turn that would
+        escalate never spends an Ollama slot. An answered draft gets its
+        scheduler lane here.
+        """
+        decision = self.escalation.post_generation(draft.confidence)
+        trace.mark("escalation")
+        draft.priority = self._lane(state)
+        return decision
+
+    def _escalate(
+        self,
+        state: SessionState,
+        user_input: str,
+        decision: EscalationDecision,
+        draft: RagDraft,
+        trace,
+    ) -> AgentResult:
+        return self._record(
+            state, user_input, decision, ESCALATION_RESPONSE, draft.confidence, trace
+        )
+
+    def _record(
+        self,
+        state: SessionState,
+        user_input: str,
+        decision: EscalationDecision,
+        answer: str,
+        confidence: float,
+        trace,
+    ) -> AgentResult:
         if decision.escalate:
-            response = (
-                "Your request needs a specialist. I will escalate this to a human agent."
-            )
-            self._unresolved_turns += 1
+            response = ESCALATION_RESPONSE
+            state.unresolved_turns += 1
         else:
             response = answer
-            self._unresolved_turns = 0
+            state.unresolved_turns = 0
 
-        self.memory.add_turn(user_input, response)
-        if self.memory.should_summarize():
-            self.memory.update_summary("Conversation summary pending.")
+        state.memory.add_turn(user_input, response)
+        trace.mark("memory_update")
+        self.metrics.record(trace)
 
         return AgentResult(
             response=response,
             escalated=decision.escalate,
             escalation_reason=decision.reason,
             confidence=confidence,
+            stage_ms=trace.stage_ms,
         )
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from dataclasses import dataclass
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+from agent.agent import SupportAgent
+from agent.guardrails import GuardrailResult
+from agent.session import SessionState
+from rag.scheduler import SchedulerOverloaded
+
+BatchRecord = Dict[str, object]
+
+
+@dataclass
+class BatchItem:
+    index: int
+    session_id: str
+    message: str
+    error: Optional[str] = None
+
+
+def parse_batch_item(
+    index: int,
+    line: str,
+    message_field: str = "message",
+    session_field: str = "session_id",
+) -> BatchItem:
+    """Parse one JSONL line; a malformed line becomes an item carrying ``error``."""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return BatchItem(index, "", "", error="invalid_json")
+    if not isinstance(record, dict):
+        return BatchItem(index, "", "", error="invalid_json")
+    # An item without a session is a conversation of its own.
+    session_id = str(record.get(session_field) or uuid.uuid4())
+    message = str(record.get(message_field) or "").strip()
+    if not message:
+        return BatchItem(index, session_id, "", error="missing_message")
+    return BatchItem(index, session_id, message)
+
+
+def read_batch_items(
+    lines: Iterable[str], message_field: str = "message", session_field: str = "session_id"
+) -> Iterable[BatchItem]:
+    index = 0
+    for line in lines:
+        if line.strip():
+            yield parse_batch_item(index, line, message_field, session_field)
+            index += 1
+
+
+async def _chunks(
+    items: Union[Iterable[BatchItem], AsyncIterable[BatchItem]], size: int
+) -> AsyncIterator[List[BatchItem]]:
+    chunk: List[BatchItem] = []
+    if isinstance(items, AsyncIterable):
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    else:
+        for item in items:
+            chunk.append(item)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchRunner:
+    """Answer a stream of ``(session_id, message)`` items with one agent.
+
+    Items are read ``chunk_size`` at a time, so memory stays bounded however
+    long the stream is. Before any item of a chunk is answered, the chunk's
+    guardrails run in one worker-thread call. Its query embeddings are then
+    computed in one request (``RagPipeline.prefetch``). Up to ``concurrency``
+    items are answered at once. Items of one session run one after another
+    in input order, so each turn sees the memory of the turns before it.
+    Records are yielded as items finish and carry the item's ``index``.
+    A failed item yields a record with ``error``; the batch carries on.
+    """
+
+    def __init__(
+        self,
+        agent: SupportAgent,
+        sessions: Callable[[str], SessionState],
+        concurrency: int = 8,
+        chunk_size: int = 256,
+    ) -> None:
+        self.agent = agent
+        self.sessions = sessions
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+
+    async def run(
+        self, items: Union[Iterable[BatchItem], AsyncIterable[BatchItem]]
+    ) -> AsyncIterator[BatchRecord]:
+        async for chunk in _chunks(items, self.chunk_size):
+            async for record in self._run_chunk(chunk):
+                yield record
+
+    async def _run_chunk(self, chunk: List[BatchItem]) -> AsyncIterator[BatchRecord]:
+        valid = [item for item in chunk if item.error is None]
+        for item in chunk:
+            if item.error is not None:
+                yield self._error(item, item.error)
+        if not valid:
+            return
+
+        guardrails = await asyncio.to_thread(
+            self.agent.guardrails.evaluate_many, [item.message for item in valid]
+        )
+        # Flagged messages escalate without retrieval, so skip their embeddings.
+        await asyncio.to_thread(
+            self.agent.rag.prefetch, [g.redacted_input for g in guardrails if g.safe]
+        )
+
+        slots = asyncio.Semaphore(self.concurrency)
+        last_turn: Dict[str, asyncio.Task] = {}
+        tasks = []
+        for item, guardrail in zip(valid, guardrails):
+            task = asyncio.ensure_future(
+                self._answer(item, guardrail, last_turn.get(item.session_id), slots)
+            )
+            last_turn[item.session_id] = task
+            tasks.append(task)
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield await done
+        finally:
+            # The consumer went away (e.g. the client disconnected).
+            for task in tasks:
+                task.cancel()
+
+    async def _answer(
+        self,
+        item: BatchItem,
+        guardrail: GuardrailResult,
+        previous: Optional[asyncio.Task],
+        slots: asyncio.Semaphore,
+    ) -> BatchRecord:
+        if previous is not None:
+            # Wait for the session's previous turn; its outcome does not matter.
+            await asyncio.wait([previous])
+        # Taken only once the turn may run, so waiting turns never hold slots.
+        async with slots:
+            try:
+                result = await self.agent.ahandle_message(
+                    item.message, session=self.sessions(item.session_id), guardrail=guardrail
+                )
+            except SchedulerOverloaded:
+                return self._error(item, "overloaded")
+            except Exception as exc:  # noqa: BLE001 - one bad item must not end the batch
+                return self._error(item, str(exc) or type(exc).__name__)
+        return {
+            "index": item.index,
+            "session_id": item.session_id,
+            "response": result.response,
+            "escalated": result.escalated,
+            "escalation_reason": result.escalation_reason,
+            "confidence": result.confidence,
+        }
+
+    @staticmethod
+    def _error(item: BatchItem, error: str) -> BatchRecord:
+        return {"index": item.index, "session_id": item.session_id or None, "error": error}
@@ -3,6 +3,13 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import List, Optional
 
+from agent.matcher import (
+    ESCALATION,
+    FRUSTRATION,
+    CompiledMatcher,
+    ScanResult,
+    create_matcher,
+)
 from app.config import EscalationConfig
 
 
@@ -30,25 +37,44 @@ class EscalationDecision:
 
 
 class EscalationLogic:
-    def __init__(self, config: EscalationConfig) -> None:
+    def __init__(
+        self, config: EscalationConfig, matcher: Optional[CompiledMatcher] = None
+    ) -> None:
         self.config = config
+        self.matcher = matcher or create_matcher(escalation=config)
 
-    def evaluate(
+    def pre_generation(
         self,
-        confidence: float,
         guardrail_reasons: List[str],
         unresolved_turns: int,
         user_message: str,
-    ) -> EscalationDecision:
-        lowered = user_message.lower()
-        if any(keyword in lowered for keyword in ESCALATION_KEYWORDS):
+        scan: Optional[ScanResult] = None,
+    ) -> Optional[EscalationDecision]:
+        """Checks that do not depend on the answer; ``None`` means generate one."""
+        # Reuse the guardrail scan of the same message when the caller has one.
+        labels = (scan or self.matcher.scan(user_message)).labels
+        if ESCALATION in labels:
             return EscalationDecision(True, "user_requested_human")
-        if any(keyword in lowered for keyword in FRUSTRATION_KEYWORDS):
+        if FRUSTRATION in labels:
             return EscalationDecision(True, "user_frustrated")
         if guardrail_reasons:
             return EscalationDecision(True, "guardrail_triggered")
-        if confidence < self.config.confidence_threshold:
-            return EscalationDecision(True, "low_confidence")
         if unresolved_turns >= self.config.max_turns_without_resolution:
             return EscalationDecision(True, "too_many_turns")
+        return None
+
+    def post_generation(self, confidence: float) -> EscalationDecision:
+        if confidence < self.config.confidence_threshold:
+            return EscalationDecision(True, "low_confidence")
         return EscalationDecision(False, None)
+
+    def evaluate(
+        self,
+        confidence: float,
+        guardrail_reasons: List[str],
+        unresolved_turns: int,
+        user_message: str,
+        scan: Optional[ScanResult] = None,
+    ) -> EscalationDecision:
+        early = self.pre_generation(guardrail_reasons, unresolved_turns, user_message, scan)
+        return early if early is not None else self.post_generation(confidence)
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import itertools
 import re
-from dataclasses import dataclass
-from typing import List
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
 
+from agent.matcher import RESTRICTED, CompiledMatcher, ScanResult, create_matcher
 from app.config import GuardrailConfig
 
 
@@ -25,28 +29,125 @@ class GuardrailResult:
     safe: bool
     reasons: List[str]
     redacted_input: str
+    scan: Optional[ScanResult] = None
+
+
+@dataclass
+class GuardrailBatch:
+    """Columnar guardrail results for ``len(redacted)`` consecutive messages.
+
+    ``pii_matches[i]`` counts the PII patterns found in message ``start + i``
+    and ``restricted[i]`` flags a restricted action; together they encode the
+    same reasons ``GuardrailResult`` lists.
+    """
+
+    start: int
+    safe: bytearray = field(default_factory=bytearray)
+    pii_matches: bytearray = field(default_factory=bytearray)
+    restricted: bytearray = field(default_factory=bytearray)
+    redacted: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.redacted)
+
+    def reasons(self, i: int) -> List[str]:
+        reasons = ["pii_detected"] * self.pii_matches[i]
+        if self.restricted[i]:
+            reasons.append("restricted_action")
+        return reasons
+
+    def rows(self) -> Iterator[Dict[str, object]]:
+        for i, redacted in enumerate(self.redacted):
+            yield {
+                "index": self.start + i,
+                "safe": bool(self.safe[i]),
+                "reasons": self.reasons(i),
+                "redacted": redacted,
+            }
+
+
+_WORKER_ENGINE: Optional["GuardrailEngine"] = None
+
+
+def _init_worker(engine: "GuardrailEngine") -> None:
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = engine
+
+
+def _screen_in_worker(start: int, texts: List[str]) -> GuardrailBatch:
+    assert _WORKER_ENGINE is not None
+    return _WORKER_ENGINE.screen(start, texts)
 
 
 class GuardrailEngine:
-    def __init__(self, config: GuardrailConfig) -> None:
+    def __init__(
+        self, config: GuardrailConfig, matcher: Optional[CompiledMatcher] = None
+    ) -> None:
         self.config = config
+        self.matcher = matcher or create_matcher(guardrails=config)
 
     def evaluate(self, text: str) -> GuardrailResult:
         reasons: List[str] = []
         redacted = text
+        scan = self.matcher.scan(text)
 
-        if self.config.block_pii:
-            for pattern in PII_PATTERNS:
-                if pattern.search(redacted):
-                    reasons.append("pii_detected")
-                    redacted = pattern.sub("[REDACTED]", redacted)
+        if self.config.block_pii and scan.pii:
+            reasons.extend("pii_detected" for _ in scan.pii)
+            redacted = scan.redact(text)
 
-        lowered = text.lower()
-        if not self.config.allow_sensitive_actions:
-            for keyword in RESTRICTED_KEYWORDS:
-                if keyword in lowered:
-                    reasons.append("restricted_action")
-                    break
+        if not self.config.allow_sensitive_actions and RESTRICTED in scan.labels:
+            reasons.append("restricted_action")
 
         safe = len(reasons) == 0
-        return GuardrailResult(safe=safe, reasons=reasons, redacted_input=redacted)
+        return GuardrailResult(safe=safe, reasons=reasons, redacted_input=redacted, scan=scan)
+
+    def evaluate_many(self, texts: Iterable[str]) -> List[GuardrailResult]:
+        """``evaluate`` every text, keeping the scans for the escalation check."""
+        return [self.evaluate(text) for text in texts]
+
+    def screen(self, start: int, texts: List[str]) -> GuardrailBatch:
+        batch = GuardrailBatch(start=start)
+        block_pii = self.config.block_pii
+        check_restricted = not self.config.allow_sensitive_actions
+        for text in texts:
+            scan = self.matcher.scan(text)
+            pii = len(scan.pii) if block_pii else 0
+            restricted = check_restricted and RESTRICTED in scan.labels
+            batch.safe.append(not pii and not restricted)
+            batch.pii_matches.append(pii)
+            batch.restricted.append(restricted)
+            batch.redacted.append(scan.redact(text) if pii else text)
+        return batch
+
+    def evaluate_batch(
+        self,
+        messages: Iterable[str],
+        chunk_size: int = 1000,
+        workers: int = 0,
+    ) -> Iterator[GuardrailBatch]:
+        """Screen a stream of messages, yielding columnar batches in input order.
+
+        With ``workers`` > 1 chunks are screened in a process pool. At most
+        two chunks per worker are in flight, so memory stays bounded however
+        long the stream is.
+        """
+        stream = iter(messages)
+        chunks = zip(
+            itertools.count(0, chunk_size),
+            iter(lambda: list(itertools.islice(stream, chunk_size)), []),
+        )
+        if workers <= 1:
+            for start, chunk in chunks:
+                yield self.screen(start, chunk)
+            return
+
+        in_flight: Deque[Future] = deque()
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(self,)
+        ) as pool:
+            for start, chunk in chunks:
+                if len(in_flight) >= workers * 2:
+                    yield in_flight.popleft().result()
+                in_flight.append(pool.submit(_screen_in_worker, start, chunk))
+            while in_flight:
+                yield in_flight.popleft().result()
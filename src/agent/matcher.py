@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Pattern, Tuple
+
+from app.config import EscalationConfig, GuardrailConfig
+
+RESTRICTED = "restricted"
+ESCALATION = "escalation"
+FRUSTRATION = "frustration"
+
+
+def load_terms(path: str) -> List[str]:
+    """Read one term per line, skipping blanks and ``#`` comments."""
+    terms = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            terms.append(line)
+    return terms
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton that reports which labelled term sets occur.
+
+    Matching is case-insensitive substring matching, like ``term in text.lower()``,
+    but the text is scanned once regardless of how many terms are loaded.
+    """
+
+    def __init__(self, term_sets: Mapping[str, Iterable[str]]) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[FrozenSet[str]] = [frozenset()]
+        self.labels = frozenset(term_sets)
+        for label, terms in term_sets.items():
+            for term in terms:
+                self._insert(term.lower(), label)
+        self._link()
+
+    def _insert(self, term: str, label: str) -> None:
+        if not term:
+            return
+        state = 0
+        for ch in term:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(frozenset())
+            state = nxt
+        self._out[state] = self._out[state] | {label}
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Fold suffix matches in so the scan never walks failure chains for output.
+                self._out[nxt] = self._out[nxt] | self._out[self._fail[nxt]]
+
+    def find(self, lowered: str) -> FrozenSet[str]:
+        goto, fail, out = self._goto, self._fail, self._out
+        found: FrozenSet[str] = frozenset()
+        state = 0
+        for ch in lowered:
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if out[state]:
+                found = found | out[state]
+                if len(found) == len(self.labels):
+                    break
+        return found
+
+
+@dataclass
+class ScanResult:
+    labels: FrozenSet[str] = frozenset()
+    pii: Tuple[str, ...] = ()
+    spans: List[Tuple[int, int]] = field(default_factory=list)
+
+    def redact(self, text: str, replacement: str = "[REDACTED]") -> str:
+        if not self.spans:
+            return text
+        parts = []
+        last = 0
+        for start, end in self.spans:
+            parts.append(text[last:start])
+            parts.append(replacement)
+            last = end
+        parts.append(text[last:])
+        return "".join(parts)
+
+
+class CompiledMatcher:
+    """Keyword sets and PII patterns evaluated in one pass per message."""
+
+    def __init__(
+        self,
+        term_sets: Mapping[str, Iterable[str]],
+        patterns: Optional[Mapping[str, Pattern]] = None,
+    ) -> None:
+        self.automaton = KeywordAutomaton(term_sets)
+        self.pattern_names = list(patterns or {})
+        self._combined: Optional[Pattern] = None
+        if patterns:
+            groups = [f"(?P<{name}>{pattern.pattern})" for name, pattern in patterns.items()]
+            self._combined = re.compile("|".join(groups))
+
+    def scan(self, text: str) -> ScanResult:
+        labels = self.automaton.find(text.lower())
+        if self._combined is None:
+            return ScanResult(labels=labels)
+        spans = []
+        hit = set()
+        for match in self._combined.finditer(text):
+            spans.append(match.span())
+            hit.add(match.lastgroup)
+        pii = tuple(name for name in self.pattern_names if name in hit)
+        return ScanResult(labels=labels, pii=pii, spans=spans)
+
+
+_DEFAULT_MATCHER: Optional[CompiledMatcher] = None
+
+
+def create_matcher(
+    guardrails: Optional[GuardrailConfig] = None,
+    escalation: Optional[EscalationConfig] = None,
+) -> CompiledMatcher:
+    """Build the matcher shared by guardrails and escalation.
+
+    Built-in term lists are extended with any configured term files. Without
+    term files, every caller gets the same cached instance.
+    """
+    global _DEFAULT_MATCHER
+    from agent.escalation import ESCALATION_KEYWORDS, FRUSTRATION_KEYWORDS
+    from agent.guardrails import PII_PATTERNS, RESTRICTED_KEYWORDS
+
+    extra_files = {
+        RESTRICTED: guardrails.restricted_terms_file if guardrails else None,
+        ESCALATION: escalation.escalation_terms_file if escalation else None,
+        FRUSTRATION: escalation.frustration_terms_file if escalation else None,
+    }
+    if not any(extra_files.values()) and _DEFAULT_MATCHER is not None:
+        return _DEFAULT_MATCHER
+
+    term_sets = {
+        RESTRICTED: set(RESTRICTED_KEYWORDS),
+        ESCALATION: set(ESCALATION_KEYWORDS),
+        FRUSTRATION: set(FRUSTRATION_KEYWORDS),
+    }
+    for label, path in extra_files.items():
+        if path:
+            term_sets[label].update(load_terms(path))
+    patterns = {f"pii{i}": pattern for i, pattern in enumerate(PII_PATTERNS)}
+    matcher = CompiledMatcher(term_sets, patterns)
+    if not any(extra_files.values()):
+        _DEFAULT_MATCHER = matcher
+    return matcher
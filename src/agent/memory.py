@@ -1,31 +1,140 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Deque, List, Optional, Tuple
+
+from app.tokens import estimate_tokens
+
+if TYPE_CHECKING:
+    from agent.memory_backend import MemoryBackend
+    from agent.summarizer import BackgroundSummarizer
+
+Turn = Tuple[str, str]
+
+
+def render_turn(user: str, assistant: str) -> str:
+    return f"User: {user}\nAssistant: {assistant}"
 
 
 @dataclass
 class ConversationMemory:
+    """Recent turns plus a running summary of older ones.
+
+    Each turn is rendered once when it is added and the joined context is
+    cached until the history changes. History is capped at ``max_turns`` and,
+    when ``max_tokens`` is set, at that many estimated tokens including the
+    summary. Turns pushed out of the window are handed to ``summarizer`` in
+    batches of ``summary_trigger`` and folded into the summary off the request
+    path; without a summarizer they are dropped.
+    """
+
     max_turns: int = 6
-    summary_trigger: int = 10
-    _turns: List[Tuple[str, str]] = field(default_factory=list)
+    summary_trigger: int = 2
+    _turns: Deque[Turn] = field(default_factory=deque)
     _summary: str = ""
+    session_id: Optional[str] = None
+    backend: Optional["MemoryBackend"] = None
+    max_tokens: int = 0
+    summarizer: Optional["BackgroundSummarizer"] = None
+    _rendered: Deque[Tuple[str, int]] = field(default_factory=deque, repr=False)
+    _history_tokens: int = field(default=0, repr=False)
+    _evicted: List[Turn] = field(default_factory=list, repr=False)
+    _context: Optional[str] = field(default=None, repr=False)
+    # The backend's newest turns as of the last sync, so a window trimmed
+    # below ``max_turns`` by the token budget is not rebuilt on every read.
+    _synced: Optional[Tuple[Turn, ...]] = field(default=None, repr=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
 
-    def add_turn(self, user: str, assistant: str) -> None:
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    def _sync(self) -> None:
+        # The backend is the source of truth when several workers share a session.
+        if self.backend is None or self.session_id is None:
+            return
+        turns, summary = self.backend.load(self.session_id, self.max_turns)
+        turns = tuple(turns)
+        with self._lock:
+            if summary != self._summary:
+                self._summary = summary
+                self._context = None
+            if turns != self._synced:
+                self._synced = turns
+                self._turns.clear()
+                self._rendered.clear()
+                self._history_tokens = 0
+                for user, assistant in turns:
+                    self._push(user, assistant)
+                # Whoever added these turns already summarized what fell out.
+                self._trim(keep_evicted=False)
+                self._context = None
+
+    def _push(self, user: str, assistant: str) -> None:
+        text = render_turn(user, assistant)
+        tokens = estimate_tokens(text)
         self._turns.append((user, assistant))
+        self._rendered.append((text, tokens))
+        self._history_tokens += tokens
+
+    def _over_budget(self) -> bool:
         if len(self._turns) > self.max_turns:
-            self._turns = self._turns[-self.max_turns :]
+            return True
+        if not self.max_tokens or len(self._turns) <= 1:
+            return False
+        return self._history_tokens + estimate_tokens(self._summary) > self.max_tokens
+
+    def _trim(self, keep_evicted: bool) -> None:
+        while self._over_budget():
+            turn = self._turns.popleft()
+            self._history_tokens -= self._rendered.popleft()[1]
+            self._context = None
+            if keep_evicted:
+                self._evicted.append(turn)
+
+    def add_turn(self, user: str, assistant: str) -> None:
+        batch: List[Turn] = []
+        with self._lock:
+            self._push(user, assistant)
+            self._context = None
+            self._trim(keep_evicted=self.summarizer is not None)
+            if self._synced is not None:
+                # Mirrors what append_turn does to the backend's copy.
+                self._synced = (self._synced + ((user, assistant),))[-self.max_turns:]
+            if self.should_summarize():
+                batch, self._evicted = self._evicted, []
+        if self.backend is not None and self.session_id is not None:
+            self.backend.append_turn(self.session_id, user, assistant, self.max_turns)
+        if batch:
+            self.summarizer.submit(self, batch)
 
     def update_summary(self, summary: str) -> None:
-        self._summary = summary.strip()
+        with self._lock:
+            self._summary = summary.strip()
+            self._context = None
+            self._trim(keep_evicted=self.summarizer is not None)
+        if self.backend is not None and self.session_id is not None:
+            self.backend.save_summary(self.session_id, self._summary)
 
     def should_summarize(self) -> bool:
-        return len(self._turns) >= self.summary_trigger
+        return self.summarizer is not None and len(self._evicted) >= self.summary_trigger
+
+    async def acontext(self) -> str:
+        """``context`` for the event loop; backend reads run in a worker thread."""
+        if self.backend is None:
+            return self.context()
+        return await asyncio.to_thread(self.context)
 
     def context(self) -> str:
-        history = "\n".join(
-            f"User: {user}\nAssistant: {assistant}" for user, assistant in self._turns
-        )
-        if self._summary:
-            return f"Summary: {self._summary}\n{history}"
-        return history
+        self._sync()
+        with self._lock:
+            if self._context is None:
+                history = "\n".join(text for text, _ in self._rendered)
+                if self._summary:
+                    self._context = f"Summary: {self._summary}\n{history}"
+                else:
+                    self._context = history
+            return self._context
@@ -0,0 +1,277 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import MemoryConfig
+
+Turn = Tuple[str, str]
+
+
+class MemoryBackend:
+    def load(self, session_id: str, max_turns: int) -> Tuple[List[Turn], str]:
+        raise NotImplementedError
+
+    def append_turn(self, session_id: str, user: str, assistant: str, max_turns: int) -> None:
+        raise NotImplementedError
+
+    def save_summary(self, session_id: str, summary: str) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+@dataclass
+class _CachedSession:
+    turns: Tuple[Turn, ...]
+    summary: str
+    loaded_at: float
+    # Newest turn row of the session and the connection's data_version when
+    # the entry was last known to match the database.
+    last_id: int
+    data_version: int
+
+
+class SqliteMemoryBackend(MemoryBackend):
+    """Session history shared by every worker through one SQLite file.
+
+    The database runs in WAL mode so readers never block the writer. Writes
+    are queued and committed in batches, either when ``batch_size`` turns are
+    pending or every ``flush_interval_s``. Both are done by a flusher thread,
+    so ``append_turn`` never waits on the disk; with ``flush_interval_s=0``
+    there is no thread and a full batch is committed by the caller. Only the
+    newest ``max_turns`` rows of a session are kept.
+
+    Reads go through a local LRU of hot sessions. A cached session is served
+    as is while no other connection has committed (``PRAGMA data_version``).
+    After a foreign commit, one index lookup of the session's newest turn
+    decides whether it must be re-read. Entries older than ``cache_ttl_s`` are
+    re-read regardless, which bounds how long a summary saved by another
+    worker can go unseen.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 32,
+        flush_interval_s: float = 0.5,
+        cache_sessions: int = 1024,
+        cache_ttl_s: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.cache_sessions = cache_sessions
+        self.cache_ttl_s = cache_ttl_s
+        self.clock = clock
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                user TEXT NOT NULL,
+                assistant TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS turns_by_session ON turns (session_id, id);
+            CREATE TABLE IF NOT EXISTS summaries (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending_turns: List[Tuple[str, str, str]] = []
+        self._pending_summaries: Dict[str, str] = {}
+        self._pending_limits: Dict[str, int] = {}
+        self._cache: "OrderedDict[str, _CachedSession]" = OrderedDict()
+        self._closed = threading.Event()
+        self._flush_requested = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval_s > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, args=(flush_interval_s,), daemon=True
+            )
+            self._flusher.start()
+
+    def _flush_periodically(self, interval_s: float) -> None:
+        while not self._closed.is_set():
+            self._flush_requested.wait(interval_s)
+            self._flush_requested.clear()
+            self.flush()
+
+    def _remember(self, session_id: str, entry: _CachedSession) -> None:
+        self._cache[session_id] = entry
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_sessions:
+            self._cache.popitem(last=False)
+
+    def _data_version(self) -> int:
+        # Changes only when another connection commits; our own writes keep it.
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _last_id(self, session_id: str) -> int:
+        row = self._conn.execute(
+            "SELECT MAX(id) FROM turns WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] or 0
+
+    def _is_current(self, session_id: str, cached: _CachedSession) -> bool:
+        if self.clock() - cached.loaded_at > self.cache_ttl_s:
+            return False
+        with self._db_lock:
+            version = self._data_version()
+            if version == cached.data_version:
+                return True
+            if self._last_id(session_id) != cached.last_id:
+                return False
+        cached.data_version = version
+        return True
+
+    def load(self, session_id: str, max_turns: int) -> Tuple[List[Turn], str]:
+        with self._lock:
+            cached = self._cache.get(session_id)
+        if cached is not None and self._is_current(session_id, cached):
+            with self._lock:
+                if session_id in self._cache:
+                    self._cache.move_to_end(session_id)
+                self.cache_hits += 1
+            return list(cached.turns[-max_turns:]), cached.summary
+        with self._lock:
+            self.cache_misses += 1
+        # This session's queued writes must be visible before reading from disk.
+        self.flush(session_id)
+        with self._db_lock:
+            version = self._data_version()
+            rows = self._conn.execute(
+                "SELECT id, user, assistant FROM turns WHERE session_id = ? "
+                "ORDER BY id DESC LIMIT ?",
+                (session_id, max_turns),
+            ).fetchall()
+            summary_row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        turns = tuple((user, assistant) for _, user, assistant in reversed(rows))
+        summary = summary_row[0] if summary_row else ""
+        last_id = rows[0][0] if rows else 0
+        with self._lock:
+            self._remember(
+                session_id, _CachedSession(turns, summary, self.clock(), last_id, version)
+            )
+        return list(turns), summary
+
+    def append_turn(self, session_id: str, user: str, assistant: str, max_turns: int) -> None:
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached is not None:
+                cached.turns = (cached.turns + ((user, assistant),))[-max_turns:]
+                self._cache.move_to_end(session_id)
+            self._pending_turns.append((session_id, user, assistant))
+            self._pending_limits[session_id] = max_turns
+            should_flush = len(self._pending_turns) >= self.batch_size
+        if not should_flush:
+            return
+        if self._flusher is not None:
+            self._flush_requested.set()
+        else:
+            self.flush()
+
+    def save_summary(self, session_id: str, summary: str) -> None:
+        with self._lock:
+            cached = self._cache.get(session_id)
+            if cached is not None:
+                cached.summary = summary
+            self._pending_summaries[session_id] = summary
+
+    def _take_pending(
+        self, session_id: Optional[str]
+    ) -> Tuple[List[Tuple[str, str, str]], Dict[str, str], Dict[str, int]]:
+        if session_id is None:
+            turns, self._pending_turns = self._pending_turns, []
+            summaries, self._pending_summaries = self._pending_summaries, {}
+            limits, self._pending_limits = self._pending_limits, {}
+            return turns, summaries, limits
+        turns = [turn for turn in self._pending_turns if turn[0] == session_id]
+        if turns:
+            self._pending_turns = [turn for turn in self._pending_turns if turn[0] != session_id]
+        summaries = {}
+        if session_id in self._pending_summaries:
+            summaries[session_id] = self._pending_summaries.pop(session_id)
+        limits = {}
+        if session_id in self._pending_limits:
+            limits[session_id] = self._pending_limits.pop(session_id)
+        return turns, summaries, limits
+
+    def flush(self, session_id: Optional[str] = None) -> None:
+        """Commit queued writes: all of them, or only those of ``session_id``."""
+        # Held while taking the queue too, so turns of a session are committed
+        # in the order they were appended even when two flushes race.
+        with self._db_lock:
+            with self._lock:
+                turns, summaries, limits = self._take_pending(session_id)
+            if not turns and not summaries:
+                return
+            last_ids = {}
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO turns (session_id, user, assistant) VALUES (?, ?, ?)", turns
+                )
+                self._conn.executemany(
+                    "INSERT INTO summaries (session_id, summary) VALUES (?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET summary = excluded.summary",
+                    list(summaries.items()),
+                )
+                for session, max_turns in limits.items():
+                    # Older turns are folded into the summary and never read again.
+                    self._conn.execute(
+                        "DELETE FROM turns WHERE session_id = ? AND id <= ("
+                        "SELECT id FROM turns WHERE session_id = ? "
+                        "ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                        (session, session, max_turns),
+                    )
+                    last_ids[session] = self._last_id(session)
+        with self._lock:
+            # The cache already holds these turns; only the row IDs are new.
+            for session, last_id in last_ids.items():
+                cached = self._cache.get(session)
+                if cached is not None:
+                    cached.last_id = last_id
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flush_requested.set()
+            self._flusher.join()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+
+def create_memory_backend(config: MemoryConfig) -> Optional[MemoryBackend]:
+    if config.backend == "sqlite":
+        return SqliteMemoryBackend(
+            path=config.sqlite_path,
+            batch_size=config.write_batch_size,
+            flush_interval_s=config.flush_interval_s,
+            cache_sessions=config.cache_sessions,
+            cache_ttl_s=config.cache_ttl_s,
+        )
+    return None
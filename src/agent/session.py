@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from agent.memory import ConversationMemory
+
+
+@dataclass(slots=True)
+class SessionState:
+    memory: ConversationMemory = field(default_factory=ConversationMemory)
+    unresolved_turns: int = 0
+    last_seen: float = 0.0
+
+
+def approx_session_bytes(state: SessionState) -> int:
+    memory = state.memory
+    size = sys.getsizeof(state) + sys.getsizeof(memory) + sys.getsizeof(memory._turns)
+    size += sys.getsizeof(memory._summary) + sys.getsizeof(memory._rendered)
+    for user, assistant in memory._turns:
+        size += sys.getsizeof(user) + sys.getsizeof(assistant)
+    for rendered in memory._rendered:
+        size += sys.getsizeof(rendered) + sys.getsizeof(rendered[0])
+    if memory._context is not None:
+        size += sys.getsizeof(memory._context)
+    if memory._synced is not None:
+        # Holds the same strings as _turns; only the tuple is extra.
+        size += sys.getsizeof(memory._synced)
+    return size
+
+
+class SessionStore:
+    """Per-session agent state with an idle TTL and an LRU capacity limit.
+
+    Sessions are kept in last-access order, so expired ones are always at the
+    front and eviction never scans the whole store.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        idle_ttl_s: float = 1800.0,
+        memory_factory: Optional[Callable[[str], ConversationMemory]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.idle_ttl_s = idle_ttl_s
+        self.memory_factory = memory_factory or (lambda _: ConversationMemory())
+        self.clock = clock
+        self.expired = 0
+        self.evicted = 0
+        self._sessions: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> SessionState:
+        now = self.clock()
+        with self._lock:
+            self._expire(now)
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = SessionState(memory=self.memory_factory(session_id))
+                self._sessions[session_id] = state
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            state.last_seen = now
+            return state
+
+    def _expire(self, now: float) -> None:
+        while self._sessions:
+            state = next(iter(self._sessions.values()))
+            if now - state.last_seen <= self.idle_ttl_s:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def evict_expired(self) -> None:
+        with self._lock:
+            self._expire(self.clock())
+
+    def metrics(self, sample_size: int = 100) -> Dict[str, float]:
+        with self._lock:
+            recent = list(self._sessions.values())[-sample_size:]
+            sessions = len(self._sessions)
+        sampled = [approx_session_bytes(state) for state in recent]
+        return {
+            "sessions": sessions,
+            "sessions_expired": self.expired,
+            "sessions_evicted": self.evicted,
+            "approx_bytes_per_session": sum(sampled) / len(sampled) if sampled else 0.0,
+        }
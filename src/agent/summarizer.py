@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import re
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence
+
+from app.config import MemoryConfig
+from app.tokens import CHARS_PER_TOKEN
+from rag.scheduler import PRIORITY_BACKGROUND, llm_priority
+
+if TYPE_CHECKING:
+    from agent.memory import ConversationMemory, Turn
+
+SummarizeFn = Callable[[str, Sequence["Turn"]], str]
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a customer support conversation.\n"
+    "Keep what the agent will need later: the customer's goal, details they\n"
+    "gave, and what has already been tried.\n"
+    "Current summary:\n{summary}\n"
+    "Earlier turns to fold in:\n{turns}\n"
+    "Write the updated summary in at most {max_words} words.\n"
+)
+
+
+def _first_sentence(text: str) -> str:
+    return SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    # Drop the oldest information first; cut on a word boundary.
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    clipped = text[-max_chars:]
+    return clipped.split(" ", 1)[-1] if " " in clipped else clipped
+
+
+def extractive_summary(previous: str, turns: Sequence["Turn"], max_tokens: int = 200) -> str:
+    """Append the first sentence of each side of every turn to the summary."""
+    notes = [
+        f"User: {_first_sentence(user)} Agent: {_first_sentence(assistant)}"
+        for user, assistant in turns
+    ]
+    return _clip(" ".join(([previous] if previous else []) + notes), max_tokens)
+
+
+def llm_summary(llm: object, max_tokens: int = 200) -> SummarizeFn:
+    """Summarize with ``llm``, falling back to ``extractive_summary`` on failure."""
+
+    def summarize(previous: str, turns: Sequence["Turn"]) -> str:
+        prompt = SUMMARY_PROMPT.format(
+            summary=previous or "(none)",
+            turns="\n".join(f"User: {user}\nAssistant: {reply}" for user, reply in turns),
+            max_words=max_tokens * 3 // 4,
+        )
+        try:
+            with llm_priority(PRIORITY_BACKGROUND):
+                summary = str(llm.invoke(prompt)).strip()
+        except Exception:  # noqa: BLE001 - a stale summary beats a lost one
+            summary = ""
+        if not summary:
+            return extractive_summary(previous, turns, max_tokens)
+        return _clip(summary, max_tokens)
+
+    return summarize
+
+
+class BackgroundSummarizer:
+    """Folds turns evicted from a memory into its summary on a worker thread.
+
+    One worker keeps jobs in submission order, so a session's summaries are
+    applied in order and each job starts from the summary the previous one
+    wrote.
+    """
+
+    def __init__(self, summarize: SummarizeFn = extractive_summary) -> None:
+        self.summarize = summarize
+        self.completed = 0
+        self.failed = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+
+    def submit(self, memory: "ConversationMemory", turns: List["Turn"]) -> Future:
+        return self._executor.submit(self._run, memory, turns)
+
+    def _run(self, memory: "ConversationMemory", turns: List["Turn"]) -> None:
+        try:
+            summary = self.summarize(memory.summary, turns)
+        except Exception:  # noqa: BLE001 - never let a summary kill the worker
+            self.failed += 1
+            return
+        memory.update_summary(summary)
+        self.completed += 1
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def create_summarizer(
+    config: MemoryConfig, llm: Optional[object] = None
+) -> Optional[BackgroundSummarizer]:
+    if config.summarizer == "none":
+        return None
+    if config.summarizer == "llm" and llm is not None:
+        return BackgroundSummarizer(llm_summary(llm, config.summary_max_tokens))
+    return BackgroundSummarizer(
+        lambda previous, turns: extractive_summary(previous, turns, config.summary_max_tokens)
+    )
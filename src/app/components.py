@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from agent.agent import SupportAgent
+from agent.escalation import EscalationLogic
+from agent.guardrails import GuardrailEngine
+from agent.matcher import create_matcher
+from agent.memory import ConversationMemory
+from agent.memory_backend import MemoryBackend
+from agent.session import SessionStore
+from agent.summarizer import BackgroundSummarizer, create_summarizer
+from app.config import AppConfig, OllamaConfig
+from app.lazy import optional_import
+from app.metrics import MetricsRegistry
+from rag.cache import AnswerCache, create_answer_cache
+from rag.index import VectorStore, create_vector_store
+from rag.pipeline import RagPipeline
+from rag.scheduler import LLMScheduler, create_scheduler
+
+_LLM_CLIENTS: Dict[Tuple[str, str], object] = {}
+_LLM_LOCK = threading.Lock()
+
+
+def create_llm(config: OllamaConfig) -> Optional[object]:
+    """Return the process-wide client for ``config``, creating it once.
+
+    Every caller shares the client and its HTTP connection pool. LangChain is
+    imported on the first call.
+    """
+    llm_class = optional_import("langchain_ollama", "OllamaLLM")
+    if llm_class is None:
+        return None
+    key = (config.base_url, config.model)
+    with _LLM_LOCK:
+        client = _LLM_CLIENTS.get(key)
+        if client is None:
+            client = llm_class(model=config.model, base_url=config.base_url)
+            _LLM_CLIENTS[key] = client
+        return client
+
+
+@dataclass
+class AgentComponents:
+    config: AppConfig
+    vector_store: VectorStore
+    answer_cache: Optional[AnswerCache]
+    llm: Optional[object]
+    scheduler: Optional[LLMScheduler]
+    rag: RagPipeline
+    agent: SupportAgent
+    metrics: MetricsRegistry
+    summarizer: Optional[BackgroundSummarizer]
+
+
+def build_components(
+    config: AppConfig,
+    llm: Optional[object] = None,
+    vector_store: Optional[VectorStore] = None,
+) -> AgentComponents:
+    if vector_store is None:
+        vector_store = create_vector_store(config.rag)
+    llm = llm if llm is not None else create_llm(config.ollama)
+    answer_cache = create_answer_cache(config.rag)
+    scheduler = create_scheduler(config.scheduler, llm)
+    # Every generation, including background summaries, passes through the scheduler.
+    generator = scheduler if scheduler is not None else llm
+    rag = RagPipeline(
+        config=config.rag, vector_store=vector_store, llm=generator, answer_cache=answer_cache
+    )
+    matcher = create_matcher(config.guardrails, config.escalation)
+    metrics = MetricsRegistry(sample_rate=config.metrics.sample_rate)
+    summarizer = create_summarizer(config.memory, generator)
+    agent = SupportAgent(
+        config=config,
+        memory=create_memory(config, summarizer=summarizer),
+        rag=rag,
+        guardrails=GuardrailEngine(config=config.guardrails, matcher=matcher),
+        escalation=EscalationLogic(config=config.escalation, matcher=matcher),
+        metrics=metrics,
+    )
+    return AgentComponents(
+        config=config,
+        vector_store=vector_store,
+        answer_cache=answer_cache,
+        llm=llm,
+        scheduler=scheduler,
+        rag=rag,
+        agent=agent,
+        metrics=metrics,
+        summarizer=summarizer,
+    )
+
+
+def create_memory(
+    config: AppConfig,
+    session_id: Optional[str] = None,
+    backend: Optional[MemoryBackend] = None,
+    summarizer: Optional[BackgroundSummarizer] = None,
+) -> ConversationMemory:
+    return ConversationMemory(
+        max_turns=config.memory.max_turns,
+        summary_trigger=config.memory.summary_trigger,
+        session_id=session_id,
+        backend=backend,
+        max_tokens=config.memory.max_context_tokens,
+        summarizer=summarizer,
+    )
+
+
+def create_session_store(
+    config: AppConfig,
+    backend: Optional[MemoryBackend] = None,
+    summarizer: Optional[BackgroundSummarizer] = None,
+) -> SessionStore:
+    return SessionStore(
+        max_sessions=config.sessions.max_sessions,
+        idle_ttl_s=config.sessions.idle_ttl_s,
+        memory_factory=lambda session_id: create_memory(
+            config, session_id, backend, summarizer
+        ),
+    )
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from pydantic import BaseModel, ConfigDict, Field
 from pydantic_settings import BaseSettings
 
@@ -15,16 +17,76 @@ class RAGConfig(BaseModel):
     min_score: float = Field(default=0.15, ge=0.0, le=1.0)
     vector_store: str = Field(default="chroma")
     persist_directory: str = Field(default="data/vector_store")
+    embedding_cache_size: int = Field(default=10000, ge=0)
+    embedding_cache_directory: Optional[str] = Field(default=None)
+    chunk_size: int = Field(default=1000, ge=1)
+    chunk_overlap: int = Field(default=200, ge=0)
+    ingest_batch_size: int = Field(default=64, ge=1)
+    ingest_workers: int = Field(default=4, ge=1)
+    manifest_path: Optional[str] = Field(default=None)
+    answer_cache_size: int = Field(default=512, ge=0)
+    answer_cache_ttl_s: float = Field(default=3600.0, gt=0.0)
+    answer_cache_similarity: float = Field(default=0.9, ge=0.0, le=1.0)
+    coalesce_requests: bool = Field(default=True)
+    snippet_token_budget: int = Field(default=1024, ge=0)
+    max_snippet_tokens: int = Field(default=256, ge=1)
+    dense_vector_store: str = Field(default="chroma")
+    rrf_k: int = Field(default=60, ge=1)
+    hybrid_candidates: int = Field(default=3, ge=1)
+    reranker_model: Optional[str] = Field(default=None)
+    retrieval_budget_ms: float = Field(default=250.0, gt=0.0)
+    faiss_index_type: str = Field(default="flat")
+    faiss_nlist: int = Field(default=256, ge=1)
+    faiss_nprobe: int = Field(default=16, ge=1)
+    faiss_hnsw_m: int = Field(default=32, ge=4)
+    faiss_ef_search: int = Field(default=64, ge=1)
 
 
 class GuardrailConfig(BaseModel):
     block_pii: bool = Field(default=True)
     allow_sensitive_actions: bool = Field(default=False)
+    restricted_terms_file: Optional[str] = Field(default=None)
 
 
 class EscalationConfig(BaseModel):
     confidence_threshold: float = Field(default=0.55, ge=0.0, le=1.0)
     max_turns_without_resolution: int = Field(default=3, ge=1)
+    escalation_terms_file: Optional[str] = Field(default=None)
+    frustration_terms_file: Optional[str] = Field(default=None)
+
+
+class MemoryConfig(BaseModel):
+    max_turns: int = Field(default=6, ge=1)
+    summary_trigger: int = Field(default=2, ge=1)
+    max_context_tokens: int = Field(default=1024, ge=0)
+    summarizer: str = Field(default="extractive")
+    summary_max_tokens: int = Field(default=200, ge=1)
+    backend: str = Field(default="local")
+    sqlite_path: str = Field(default="data/sessions.db")
+    write_batch_size: int = Field(default=32, ge=1)
+    flush_interval_s: float = Field(default=0.5, ge=0.0)
+    cache_sessions: int = Field(default=1024, ge=0)
+    cache_ttl_s: float = Field(default=300.0, ge=0.0)
+
+
+class SessionConfig(BaseModel):
+    max_sessions: int = Field(default=10000, ge=1)
+    idle_ttl_s: float = Field(default=1800.0, gt=0.0)
+
+
+class SchedulerConfig(BaseModel):
+    max_in_flight: int = Field(default=2, ge=0)
+    max_queue: int = Field(default=64, ge=0)
+    short_prompt_tokens: int = Field(default=512, ge=0)
+
+
+class WarmupConfig(BaseModel):
+    enabled: bool = Field(default=True)
+    retry_interval_s: float = Field(default=5.0, gt=0.0)
+
+
+class MetricsConfig(BaseModel):
+    sample_rate: float = Field(default=1.0, ge=0.0, le=1.0)
 
 
 class EvalConfig(BaseModel):
@@ -36,6 +98,11 @@ class AppConfig(BaseSettings):
     rag: RAGConfig = RAGConfig()
     guardrails: GuardrailConfig = GuardrailConfig()
     escalation: EscalationConfig = EscalationConfig()
+    sessions: SessionConfig = SessionConfig()
+    memory: MemoryConfig = MemoryConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
+    warmup: WarmupConfig = WarmupConfig()
+    metrics: MetricsConfig = MetricsConfig()
     eval: EvalConfig = EvalConfig()
     api_host: str = Field(default="127.0.0.1")
     api_port: int = Field(default=8000, ge=1, le=65535)
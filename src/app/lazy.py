@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import importlib
+from functools import lru_cache
+from typing import Optional
+
+
+@lru_cache(maxsize=None)
+def optional_import(module: str, name: str) -> Optional[object]:
+    """Return ``module.name``, importing it on first use, or ``None`` if it is missing.
+
+    LangChain, Chroma and sentence-transformers take seconds to import. Modules
+    that only sometimes need them look them up here when first used, instead
+    of importing them when the module loads. A CLI call that never touches
+    them then never pays for them.
+    """
+    try:
+        return getattr(importlib.import_module(module), name)
+    except ImportError:
+        return None
@@ -1,65 +1,213 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import contextlib
+import json
+import sys
 import time
+from typing import ContextManager, Dict, Iterator, Optional, TextIO
 
-from agent.agent import SupportAgent
-from agent.escalation import EscalationLogic
+from agent.agent import AgentResult, SupportAgent
+from agent.batch import BatchRunner, read_batch_items
 from agent.guardrails import GuardrailEngine
-from agent.memory import ConversationMemory
+from agent.matcher import create_matcher
+from app.components import AgentComponents, build_components, create_session_store
 from app.config import AppConfig
-from app.server import create_app
-from rag.index import create_vector_store
-from rag.pipeline import RagPipeline
 
-try:
-    from langchain_ollama import OllamaLLM
-except ImportError:  # pragma: no cover
-    OllamaLLM = None
+# FastAPI, uvicorn and the server module are imported by --serve only, and
+# LangChain by whichever component first needs it, so a --query or --screen
+# call does not pay for them.
+PROMPT = "> "
 
 
 def build_agent(config: AppConfig) -> SupportAgent:
-    memory = ConversationMemory(max_turns=6, summary_trigger=10)
-    vector_store = create_vector_store(config.rag)
-    llm = OllamaLLM(model=config.ollama.model) if OllamaLLM is not None else None
-    rag = RagPipeline(config=config.rag, vector_store=vector_store, llm=llm)
-    guardrails = GuardrailEngine(config=config.guardrails)
-    escalation = EscalationLogic(config=config.escalation)
-    return SupportAgent(
-        config=config,
-        memory=memory,
-        rag=rag,
-        guardrails=guardrails,
-        escalation=escalation,
+    return build_components(config).agent
+
+
+def print_result(result: AgentResult, elapsed_ms: int, out: TextIO = sys.stdout) -> None:
+    print(f"Response: {result.response}", file=out)
+    print(f"Escalated: {result.escalated} ({result.escalation_reason})", file=out)
+    print(f"Confidence: {result.confidence:.2f}", file=out)
+    print(f"Latency: {elapsed_ms}ms", file=out)
+
+
+def answer(agent: SupportAgent, query: str, out: TextIO = sys.stdout) -> AgentResult:
+    start = time.time()
+    result = agent.handle_message(query)
+    print_result(result, int((time.time() - start) * 1000), out)
+    return result
+
+
+def chat_jsonl(
+    components: AgentComponents,
+    source: TextIO,
+    sink: TextIO,
+    field: str = "message",
+    session_field: str = "session_id",
+    concurrency: int = 8,
+    chunk_size: int = 256,
+) -> int:
+    """Answer every JSONL line of ``source`` and write one NDJSON record per line."""
+    sessions = create_session_store(components.config, summarizer=components.summarizer)
+    runner = BatchRunner(
+        components.agent,
+        sessions.get,
+        concurrency=concurrency,
+        chunk_size=chunk_size,
     )
 
+    async def run() -> int:
+        written = 0
+        async for record in runner.run(read_batch_items(source, field, session_field)):
+            sink.write(json.dumps(record) + "\n")
+            written += 1
+        return written
+
+    return asyncio.run(run())
+
+
+def run_interactive(agent: SupportAgent, source: TextIO, out: TextIO = sys.stdout) -> int:
+    """Answer one query per line of ``source`` with an already built agent.
+
+    Components are wired and heavy imports paid once, so every query after
+    the first costs only its own work. Lines share one conversation. Stops
+    at EOF or an empty line and returns the number of queries answered.
+    """
+    answered = 0
+    interactive = source.isatty()
+    while True:
+        if interactive:
+            print(PROMPT, end="", file=out, flush=True)
+        line = source.readline()
+        if not line.strip():
+            return answered
+        answer(agent, line.strip(), out)
+        out.flush()
+        answered += 1
+
+
+def open_output(path: Optional[str]) -> ContextManager[TextIO]:
+    if path:
+        return open(path, "w", encoding="utf-8")
+    return contextlib.nullcontext(sys.stdout)
+
+
+def read_jsonl_field(handle: TextIO, field: str, errors: Dict[int, str]) -> Iterator[str]:
+    """Yield ``field`` of each JSONL object.
+
+    A line that is not a JSON object yields an empty message and its index is
+    added to ``errors``, so later lines keep their indexes.
+    """
+    index = 0
+    for line in handle:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = None
+        if isinstance(record, dict):
+            yield str(record.get(field, ""))
+        else:
+            errors[index] = "invalid_json"
+            yield ""
+        index += 1
+
+
+def screen_jsonl(
+    config: AppConfig,
+    source: TextIO,
+    sink: TextIO,
+    field: str = "message",
+    workers: int = 0,
+    chunk_size: int = 1000,
+) -> int:
+    engine = GuardrailEngine(
+        config.guardrails, matcher=create_matcher(config.guardrails, config.escalation)
+    )
+    screened = 0
+    # Filled as lines are read and drained as their rows are written.
+    errors: Dict[int, str] = {}
+    for batch in engine.evaluate_batch(
+        read_jsonl_field(source, field, errors), chunk_size=chunk_size, workers=workers
+    ):
+        for row in batch.rows():
+            error = errors.pop(row["index"], None)
+            if error is not None:
+                row = {"index": row["index"], "error": error}
+            sink.write(json.dumps(row) + "\n")
+        screened += len(batch)
+    return screened
+
 
 def run_cli() -> None:
     parser = argparse.ArgumentParser(description="Customer Support Bot demo")
     mode = parser.add_mutually_exclusive_group(required=True)
     mode.add_argument("--query", help="User query")
+    mode.add_argument(
+        "--interactive",
+        action="store_true",
+        help="Answer queries from stdin, one per line, without restarting",
+    )
     mode.add_argument("--serve", action="store_true", help="Run API server")
+    mode.add_argument("--screen", metavar="JSONL", help="Run guardrails over a JSONL file")
+    mode.add_argument("--batch", metavar="JSONL", help="Answer every message in a JSONL file")
+    parser.add_argument(
+        "--output", help="Where --screen and --batch write JSONL results (default stdout)"
+    )
+    parser.add_argument("--field", default="message", help="JSON field holding the text")
+    parser.add_argument(
+        "--session-field", default="session_id", help="JSON field holding the --batch session"
+    )
+    parser.add_argument("--workers", type=int, default=0, help="Processes for --screen")
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Messages --batch answers at once"
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Messages per chunk")
     args = parser.parse_args()
 
     config = AppConfig()
 
+    if args.screen:
+        start = time.time()
+        with open(args.screen, encoding="utf-8") as source, open_output(args.output) as sink:
+            count = screen_jsonl(config, source, sink, args.field, args.workers, args.chunk_size)
+        elapsed = time.time() - start
+        print(f"Screened {count} messages in {elapsed:.1f}s", file=sys.stderr)
+        return
+
     if args.serve:
         import uvicorn
 
+        from app.server import create_app
+
         app = create_app(config)
         uvicorn.run(app, host=config.api_host, port=config.api_port)
         return
 
-    agent = build_agent(config)
-
-    start = time.time()
-    result = agent.handle_message(args.query)
-    elapsed_ms = int((time.time() - start) * 1000)
+    if args.batch:
+        start = time.time()
+        with open(args.batch, encoding="utf-8") as source, open_output(args.output) as sink:
+            count = chat_jsonl(
+                build_components(config),
+                source,
+                sink,
+                args.field,
+                args.session_field,
+                args.concurrency,
+                args.chunk_size,
+            )
+        elapsed = time.time() - start
+        print(f"Answered {count} messages in {elapsed:.1f}s", file=sys.stderr)
+        return
 
-    print(f"Response: {result.response}")
-    print(f"Escalated: {result.escalated} ({result.escalation_reason})")
-    print(f"Confidence: {result.confidence:.2f}")
-    print(f"Latency: {elapsed_ms}ms")
+    agent = build_agent(config)
+    if args.interactive:
+        run_interactive(agent, sys.stdin)
+        return
+    answer(agent, args.query)
 
 
 if __name__ == "__main__":
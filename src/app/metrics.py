@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Sequence, Tuple
+
+LATENCY_BUCKETS_S = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CHUNK_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16)
+PROMPT_CHAR_BUCKETS = (256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+PROMPT_TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+# Values observed on a trace, mapped to the histogram buckets they are exported with.
+OBSERVED_VALUES = {
+    "retrieved_chunks": CHUNK_BUCKETS,
+    "prompt_chars": PROMPT_CHAR_BUCKETS,
+    "prompt_tokens": PROMPT_TOKEN_BUCKETS,
+}
+
+
+class Trace:
+    """Lap timer for one request.
+
+    ``mark(stage)`` charges the time since the previous mark to ``stage``, so
+    each stage costs a single ``perf_counter`` call.
+    """
+
+    __slots__ = ("stage_ms", "values", "_start", "_last")
+
+    def __init__(self) -> None:
+        self.stage_ms: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stage_ms[stage] = self.stage_ms.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def observe(self, name: str, value: float) -> None:
+        self.values[name] = value
+
+    @property
+    def total_ms(self) -> float:
+        return (self._last - self._start) * 1000
+
+
+class _NullTrace:
+    """Stand-in for unsampled requests; every call is a no-op."""
+
+    __slots__ = ()
+    total_ms = 0.0
+
+    @property
+    def stage_ms(self) -> Dict[str, float]:
+        return {}
+
+    def mark(self, stage: str) -> None:
+        pass
+
+    def observe(self, name: str, value: float) -> None:
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+_CURRENT_TRACE: ContextVar = ContextVar("current_trace", default=NULL_TRACE)
+
+
+def current_trace():
+    """Return the trace of the request being handled, or ``NULL_TRACE``."""
+    return _CURRENT_TRACE.get()
+
+
+class activate_trace:
+    """Make ``trace`` the current trace for the duration of a ``with`` block."""
+
+    __slots__ = ("trace", "_token")
+
+    def __init__(self, trace) -> None:
+        self.trace = trace
+
+    def __enter__(self):
+        self._token = _CURRENT_TRACE.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc_info) -> None:
+        _CURRENT_TRACE.reset(self._token)
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        sep = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:g}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Per-stage latency and request-shape histograms, exported as Prometheus text.
+
+    Only a ``sample_rate`` fraction of requests is traced. Unsampled requests
+    get ``NULL_TRACE`` and are only counted.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, prefix: str = "csb") -> None:
+        self.sample_rate = sample_rate
+        self.prefix = prefix
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _Histogram] = {}
+        self._request_latency = _Histogram(LATENCY_BUCKETS_S)
+        self._values = {name: _Histogram(bounds) for name, bounds in OBSERVED_VALUES.items()}
+
+    def start_trace(self):
+        with self._lock:
+            self.requests += 1
+        if self.sample_rate <= 0.0:
+            return NULL_TRACE
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return NULL_TRACE
+        return Trace()
+
+    def record(self, trace) -> None:
+        if trace is NULL_TRACE:
+            return
+        with self._lock:
+            self._request_latency.observe(trace.total_ms / 1000)
+            for stage, elapsed_ms in trace.stage_ms.items():
+                histogram = self._stages.get(stage)
+                if histogram is None:
+                    histogram = self._stages[stage] = _Histogram(LATENCY_BUCKETS_S)
+                histogram.observe(elapsed_ms / 1000)
+            for name, value in trace.values.items():
+                histogram = self._values.get(name)
+                if histogram is not None:
+                    histogram.observe(value)
+
+    def render(self) -> str:
+        prefix = self.prefix
+        with self._lock:
+            stages: List[Tuple[str, _Histogram]] = sorted(self._stages.items())
+            lines = [
+                f"# HELP {prefix}_requests_total Messages handled, sampled or not.",
+                f"# TYPE {prefix}_requests_total counter",
+                f"{prefix}_requests_total {self.requests}",
+                f"# HELP {prefix}_request_latency_seconds End-to-end latency of sampled messages.",
+                f"# TYPE {prefix}_request_latency_seconds histogram",
+                *self._request_latency.render(f"{prefix}_request_latency_seconds", ""),
+                f"# HELP {prefix}_stage_latency_seconds Latency of each stage of sampled messages.",
+                f"# TYPE {prefix}_stage_latency_seconds histogram",
+            ]
+            for stage, histogram in stages:
+                lines.extend(
+                    histogram.render(f"{prefix}_stage_latency_seconds", f'stage="{stage}"')
+                )
+            for name, histogram in self._values.items():
+                lines.append(f"# HELP {prefix}_{name} Per-message {name.replace('_', ' ')}.")
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                lines.extend(histogram.render(f"{prefix}_{name}", ""))
+        return "\n".join(lines) + "\n"
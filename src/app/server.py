@@ -1,27 +1,26 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import uuid
-from dataclasses import dataclass
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, Optional
+from typing import AsyncIterator, Optional
 
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
-from agent.agent import SupportAgent
-from agent.escalation import EscalationLogic
-from agent.guardrails import GuardrailEngine
-from agent.memory import ConversationMemory
+from agent.agent import AgentResult
+from agent.batch import BatchRunner, read_batch_items
+from agent.memory_backend import create_memory_backend
+from app.components import build_components, create_session_store
 from app.config import AppConfig
-from rag.index import VectorStore, create_vector_store
-from rag.pipeline import RagPipeline
-
-try:
-    from langchain_ollama import OllamaLLM
-except ImportError:  # pragma: no cover
-    OllamaLLM = None
+from app.warmup import Warmup
+from rag.ingest import create_ingestion_pipeline
+from rag.manifest import create_manifest
+from rag.scheduler import SchedulerOverloaded
 
 
 class ChatRequest(BaseModel):
@@ -45,36 +44,53 @@ class IngestPathRequest(BaseModel):
     path: Optional[str] = None
 
 
-@dataclass
-class AgentRegistry:
-    config: AppConfig
-    vector_store: VectorStore
-    agents: Dict[str, SupportAgent]
-
-    def get_agent(self, session_id: str) -> SupportAgent:
-        if session_id not in self.agents:
-            memory = ConversationMemory(max_turns=6, summary_trigger=10)
-            guardrails = GuardrailEngine(config=self.config.guardrails)
-            escalation = EscalationLogic(config=self.config.escalation)
-            llm = None
-            if OllamaLLM is not None:
-                llm = OllamaLLM(model=self.config.ollama.model)
-            rag = RagPipeline(config=self.config.rag, vector_store=self.vector_store, llm=llm)
-            self.agents[session_id] = SupportAgent(
-                config=self.config,
-                memory=memory,
-                rag=rag,
-                guardrails=guardrails,
-                escalation=escalation,
-            )
-        return self.agents[session_id]
-
-
-def create_app(config: Optional[AppConfig] = None) -> FastAPI:
-    app = FastAPI(title="Customer Support Bot")
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app(config: Optional[AppConfig] = None, llm: Optional[object] = None) -> FastAPI:
     config = config or AppConfig()
-    vector_store = create_vector_store(config.rag)
-    registry = AgentRegistry(config=config, vector_store=vector_store, agents={})
+    components = build_components(config, llm=llm)
+    vector_store = components.vector_store
+    answer_cache = components.answer_cache
+    agent = components.agent
+    rag = components.rag
+    scheduler = components.scheduler
+    metrics = components.metrics
+    ingestion = create_ingestion_pipeline(config.rag, vector_store)
+    manifest = create_manifest(config.rag, vector_store)
+    memory_backend = create_memory_backend(config.memory)
+    summarizer = components.summarizer
+    sessions = create_session_store(config, backend=memory_backend, summarizer=summarizer)
+
+    warmup = Warmup(
+        vector_store, components.llm, retry_interval_s=config.warmup.retry_interval_s
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # In the background, so /health answers while the model loads.
+        warming = asyncio.create_task(warmup.run()) if config.warmup.enabled else None
+        if warming is None:
+            warmup.skip()
+        yield
+        if warming is not None:
+            warming.cancel()
+        # Summaries still in flight are written through the backend, so drain them first.
+        if summarizer is not None:
+            summarizer.close()
+        if memory_backend is not None:
+            memory_backend.close()
+
+    app = FastAPI(title="Customer Support Bot", lifespan=lifespan)
+
+    @app.exception_handler(SchedulerOverloaded)
+    async def overloaded(request: Request, exc: SchedulerOverloaded) -> JSONResponse:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "overloaded", "detail": str(exc)},
+            headers={"Retry-After": "1"},
+        )
 
     base_dir = Path(__file__).resolve().parents[2]
     static_dir = base_dir / "web" / "static"
@@ -86,12 +102,31 @@ def create_app(config: Optional[AppConfig] = None) -> FastAPI:
 
     @app.get("/health")
     def health() -> dict:
+        # Liveness only; /ready says whether the server can answer quickly.
         return {"status": "ok"}
 
+    @app.get("/ready")
+    def ready() -> JSONResponse:
+        return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.status())
+
+    @app.get("/stats")
+    def stats() -> dict:
+        return {
+            "vector_store": vector_store.stats(),
+            "answer_cache": answer_cache.stats() if answer_cache is not None else {},
+            "sessions": sessions.metrics(),
+            "coalescing": rag.coalescer.stats() if rag.coalescer is not None else {},
+            "scheduler": scheduler.stats() if scheduler is not None else {},
+        }
+
+    @app.get("/metrics")
+    def prometheus_metrics() -> PlainTextResponse:
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
     @app.post("/ingest")
     def ingest(payload: IngestRequest) -> dict:
-        vector_store.add(payload.documents)
-        return {"ingested": len(payload.documents)}
+        report = ingestion.ingest_texts(payload.documents)
+        return {"ingested": len(payload.documents), **report.as_dict()}
 
     @app.post("/ingest-path")
     def ingest_path(payload: IngestPathRequest) -> dict:
@@ -101,18 +136,18 @@ def create_app(config: Optional[AppConfig] = None) -> FastAPI:
             return {"error": "path_outside_project"}
         if not target.exists():
             return {"error": "path_not_found"}
-        files = [
-            p for p in target.rglob("*") if p.suffix.lower() in {".md", ".txt"}
-        ]
-        documents = [p.read_text(encoding="utf-8") for p in files]
-        vector_store.add(documents)
-        return {"ingested": len(documents), "files": [str(p) for p in files]}
+        sync = ingestion.sync_directory(target, manifest)
+        return {
+            "ingested": len(sync.added) + len(sync.changed),
+            "files": sync.added + sync.changed + sync.unchanged,
+            **sync.as_dict(),
+        }
 
     @app.post("/chat", response_model=ChatResponse)
-    def chat(payload: ChatRequest) -> ChatResponse:
+    async def chat(payload: ChatRequest) -> ChatResponse:
         session_id = payload.session_id or str(uuid.uuid4())
-        agent = registry.get_agent(session_id)
-        result = agent.handle_message(payload.message)
+        session = sessions.get(session_id)
+        result = await agent.ahandle_message(payload.message, session=session)
         return ChatResponse(
             response=result.response,
             escalated=result.escalated,
@@ -121,4 +156,58 @@ def create_app(config: Optional[AppConfig] = None) -> FastAPI:
             session_id=session_id,
         )
 
+    @app.post("/chat/stream")
+    async def chat_stream(payload: ChatRequest) -> StreamingResponse:
+        session_id = payload.session_id or str(uuid.uuid4())
+        session = sessions.get(session_id)
+
+        async def events() -> AsyncIterator[str]:
+            try:
+                async for item in agent.astream_message(payload.message, session=session):
+                    if isinstance(item, AgentResult):
+                        done = ChatResponse(
+                            response=item.response,
+                            escalated=item.escalated,
+                            escalation_reason=item.escalation_reason,
+                            confidence=item.confidence,
+                            session_id=session_id,
+                        )
+                        yield sse_event("done", done.model_dump())
+                    else:
+                        yield sse_event("token", {"token": item})
+            except SchedulerOverloaded as exc:
+                # Headers are already sent, so report overload in-band.
+                yield sse_event("error", {"error": "overloaded", "detail": str(exc)})
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.post("/chat/batch")
+    async def chat_batch(
+        request: Request,
+        concurrency: int = Query(default=8, ge=1, le=64),
+        chunk_size: int = Query(default=256, ge=1, le=10000),
+    ) -> StreamingResponse:
+        """Answer an NDJSON body of ``{"session_id", "message"}`` lines as NDJSON.
+
+        Records stream back as items finish, each with the ``index`` of its
+        input line. Turns of one session run in input order. The body is read
+        in full first: the response's disconnect listener also calls
+        ``receive()``, so reading the body while streaming could lose it.
+        """
+        body = await request.body()
+        runner = BatchRunner(
+            agent, sessions.get, concurrency=concurrency, chunk_size=chunk_size
+        )
+        items = read_batch_items(body.decode("utf-8").splitlines())
+
+        async def records() -> AsyncIterator[str]:
+            async for record in runner.run(items):
+                yield json.dumps(record) + "\n"
+
+        return StreamingResponse(records(), media_type="application/x-ndjson")
+
     return app
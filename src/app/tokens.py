@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+# Llama-family tokenizers average roughly four characters per token on
+# English support text; close enough for budgeting without loading a tokenizer.
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
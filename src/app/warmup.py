@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from rag.index import VectorStore
+
+WARMUP_QUERY = "How do I reset my password?"
+WARMUP_PROMPT = "Reply with the single word OK."
+
+
+@dataclass
+class WarmupStep:
+    # pending, ok, failed or skipped
+    status: str = "pending"
+    ms: float = 0.0
+    error: Optional[str] = None
+
+
+class Warmup:
+    """Pays the first-request costs before the server takes traffic.
+
+    ``index`` runs one search, which builds the embedding client, embeds a
+    query and loads the index. ``llm`` runs one tiny generation through the
+    async client ``/chat`` uses, so Ollama loads the model and the HTTP pool
+    is opened. Failed steps are retried every ``retry_interval_s`` until all
+    pass. ``ready`` becomes true once none are pending or failed.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        llm: Optional[object],
+        retry_interval_s: float = 5.0,
+    ) -> None:
+        self.vector_store = vector_store
+        self.llm = llm
+        self.retry_interval_s = retry_interval_s
+        self.attempts = 0
+        self.ready = False
+        self._steps: List[Tuple[str, Optional[Callable[[], Awaitable[object]]]]] = [
+            ("index", self._search),
+            ("llm", self._generate if llm is not None else None),
+        ]
+        self.steps: Dict[str, WarmupStep] = {name: WarmupStep() for name, _ in self._steps}
+
+    async def _search(self) -> object:
+        return await self.vector_store.asearch(WARMUP_QUERY, top_k=1)
+
+    async def _generate(self) -> object:
+        ainvoke = getattr(self.llm, "ainvoke", None)
+        if ainvoke is not None:
+            return await ainvoke(WARMUP_PROMPT)
+        return await asyncio.to_thread(self.llm.invoke, WARMUP_PROMPT)
+
+    async def run_once(self) -> bool:
+        self.attempts += 1
+        for name, step in self._steps:
+            state = self.steps[name]
+            if state.status in ("ok", "skipped"):
+                continue
+            if step is None:
+                state.status = "skipped"
+                continue
+            start = time.perf_counter()
+            try:
+                await step()
+            except Exception as exc:  # noqa: BLE001 - reported on /ready, retried
+                state.status, state.error = "failed", str(exc) or type(exc).__name__
+            else:
+                state.status, state.error = "ok", None
+            state.ms = (time.perf_counter() - start) * 1000
+        self.ready = all(state.status in ("ok", "skipped") for state in self.steps.values())
+        return self.ready
+
+    async def run(self) -> None:
+        while not await self.run_once():
+            await asyncio.sleep(self.retry_interval_s)
+
+    def skip(self) -> None:
+        for state in self.steps.values():
+            state.status = "skipped"
+        self.ready = True
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "status": "ready" if self.ready else "warming_up",
+            "attempts": self.attempts,
+            "steps": {
+                name: {"status": state.status, "ms": round(state.ms, 1), "error": state.error}
+                for name, state in self.steps.items()
+            },
+        }
@@ -1,8 +1,72 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import math
+from dataclasses import dataclass, field
 from statistics import mean
-from typing import List
+from typing import Dict, Iterable, List, Mapping, Optional
+
+STAGES = (
+    "guardrails",
+    "escalation",
+    "memory_context",
+    "retrieval",
+    "prompt",
+    "llm",
+    "memory_update",
+)
+
+
+class LatencyHistogram:
+    """Streaming latency histogram with HDR-style logarithmic buckets.
+
+    Bucket widths grow geometrically, so any percentile is reported within
+    ``precision`` relative error while the number of buckets only grows with
+    the logarithm of the observed range (about 2.3k buckets from 1us to 3h at
+    1%). ``count``, ``total`` and ``max`` are exact.
+    """
+
+    def __init__(self, precision: float = 0.01, floor_ms: float = 0.001) -> None:
+        self._log_base = math.log1p(precision)
+        self._growth = 1.0 + precision
+        self._floor = floor_ms
+        self._buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms: float) -> None:
+        value = max(float(value_ms), 0.0)
+        index = 0
+        if value > self._floor:
+            index = max(1, math.ceil(math.log(value / self._floor) / self._log_base))
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                return min(self._floor * self._growth**index, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
 
 
 @dataclass
@@ -10,18 +74,59 @@ class EvalReport:
     accuracy: float
     autonomy_rate: float
     avg_latency_ms: float
+    cache_hit_rate: float = 0.0
+    cache_latency_saved_ms: float = 0.0
+    p50_latency_ms: float = 0.0
+    p90_latency_ms: float = 0.0
+    p99_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+    over_budget_rate: float = 0.0
+    stage_latency_ms: Dict[str, Dict[str, float]] = field(default_factory=dict)
 
 
 def build_report(
     correctness: List[bool],
     escalations: List[bool],
-    latencies_ms: List[int],
+    latencies_ms: Iterable[float],
+    cache_stats: Optional[Dict[str, float]] = None,
+    stage_latencies_ms: Optional[Mapping[str, Iterable[float]]] = None,
+    latency_budget_ms: Optional[float] = None,
 ) -> EvalReport:
+    """Aggregate eval results.
+
+    Latencies are consumed once into histograms, so they may be generators.
+    ``stage_latencies_ms`` maps stage names (see ``STAGES``) to per-request
+    timings; stages without samples are left out of the breakdown.
+    """
     accuracy = mean(correctness) if correctness else 0.0
     autonomy_rate = 1.0 - mean(escalations) if escalations else 0.0
-    avg_latency_ms = mean(latencies_ms) if latencies_ms else 0.0
+
+    histogram = LatencyHistogram()
+    over_budget = 0
+    for latency in latencies_ms:
+        histogram.record(latency)
+        if latency_budget_ms is not None and latency > latency_budget_ms:
+            over_budget += 1
+
+    stage_latency_ms: Dict[str, Dict[str, float]] = {}
+    for stage, values in (stage_latencies_ms or {}).items():
+        stage_histogram = LatencyHistogram()
+        for value in values:
+            stage_histogram.record(value)
+        if stage_histogram.count:
+            stage_latency_ms[stage] = stage_histogram.summary()
+
+    cache_stats = cache_stats or {}
     return EvalReport(
         accuracy=accuracy,
         autonomy_rate=autonomy_rate,
-        avg_latency_ms=avg_latency_ms,
+        avg_latency_ms=histogram.mean(),
+        cache_hit_rate=cache_stats.get("answer_cache_hit_rate", 0.0),
+        cache_latency_saved_ms=cache_stats.get("answer_cache_latency_saved_ms", 0.0),
+        p50_latency_ms=histogram.percentile(50),
+        p90_latency_ms=histogram.percentile(90),
+        p99_latency_ms=histogram.percentile(99),
+        max_latency_ms=histogram.max,
+        over_budget_rate=over_budget / histogram.count if histogram.count else 0.0,
+        stage_latency_ms=stage_latency_ms,
     )
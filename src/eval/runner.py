@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from eval.report import STAGES, EvalReport, build_report
+from eval.synthetic import SyntheticCase
+
+EvalCase = Tuple[str, SyntheticCase]
+
+
+@dataclass
+class EvalOutcome:
+    case_id: str
+    query: str
+    expected_escalation: bool
+    escalated: bool
+    correct: bool
+    latency_ms: float
+    error: Optional[str] = None
+    stage_ms: Dict[str, float] = field(default_factory=dict)
+
+
+def load_cases(path: str) -> Iterator[EvalCase]:
+    """Stream ``{"id", "query", "expected_escalation"}`` objects from a JSONL file.
+
+    Cases without an ``id`` are identified by their line number, which keeps
+    checkpoints valid as long as the file is only appended to.
+    """
+    with open(path, encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            raw = json.loads(line)
+            case = SyntheticCase(
+                query=raw["query"], expected_escalation=bool(raw["expected_escalation"])
+            )
+            yield str(raw.get("id", line_number)), case
+
+
+class EvalCheckpoint:
+    """Append-only JSONL of finished outcomes, used to resume interrupted runs.
+
+    Outcomes with an ``error`` do not count as done, so resuming retries them.
+    The last line recorded for a case wins.
+    """
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = Path(path) if path else None
+        self.outcomes: Dict[str, EvalOutcome] = {}
+        if self.path is not None and self.path.exists():
+            with self.path.open(encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        outcome = EvalOutcome(**json.loads(line))
+                        self.outcomes[outcome.case_id] = outcome
+        self._handle = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = self.path.open("a", encoding="utf-8")
+
+    @property
+    def done(self) -> Set[str]:
+        return {case_id for case_id, outcome in self.outcomes.items() if outcome.error is None}
+
+    def record(self, outcome: EvalOutcome) -> None:
+        self.outcomes[outcome.case_id] = outcome
+        if self._handle is not None:
+            self._handle.write(json.dumps(asdict(outcome)) + "\n")
+            self._handle.flush()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+def _outcome(
+    case_id: str, case: SyntheticCase, prediction: Any, start: float, error: Optional[str]
+) -> EvalOutcome:
+    # Predictors may return a bare bool or an AgentResult-like object whose
+    # ``stage_ms`` carries the per-stage timings of that request.
+    if isinstance(prediction, bool):
+        escalated, stage_ms = prediction, {}
+    else:
+        escalated = bool(prediction.escalated)
+        stage_ms = dict(getattr(prediction, "stage_ms", None) or {})
+    return EvalOutcome(
+        case_id=case_id,
+        query=case.query,
+        expected_escalation=case.expected_escalation,
+        escalated=escalated,
+        correct=error is None and escalated == case.expected_escalation,
+        latency_ms=(time.perf_counter() - start) * 1000,
+        error=error,
+        stage_ms=stage_ms,
+    )
+
+
+class EvalRunner:
+    """Run eval cases concurrently, checkpointing each finished case.
+
+    Only ``concurrency * 2`` cases are pulled from the input at a time, so
+    JSONL files of any size stream through in bounded memory. A failing
+    predictor call is recorded as an incorrect outcome rather than aborting
+    the run, and is retried when the run is resumed from its checkpoint.
+    """
+
+    def __init__(self, concurrency: int = 8, checkpoint_path: Optional[str] = None) -> None:
+        self.concurrency = concurrency
+        self.checkpoint_path = checkpoint_path
+
+    def run(
+        self, cases: Iterable[EvalCase], predict: Callable[[str], Any]
+    ) -> List[EvalOutcome]:
+        checkpoint = EvalCheckpoint(self.checkpoint_path)
+        done = checkpoint.done
+
+        def evaluate(case_id: str, case: SyntheticCase) -> EvalOutcome:
+            start = time.perf_counter()
+            try:
+                return _outcome(case_id, case, predict(case.query), start, None)
+            except Exception as exc:  # noqa: BLE001 - recorded, not raised
+                return _outcome(case_id, case, False, start, repr(exc))
+
+        pending: Set[Future] = set()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for case_id, case in cases:
+                    if case_id in done:
+                        continue
+                    if len(pending) >= self.concurrency * 2:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            checkpoint.record(future.result())
+                    pending.add(pool.submit(evaluate, case_id, case))
+                for future in pending:
+                    checkpoint.record(future.result())
+        finally:
+            checkpoint.close()
+        return list(checkpoint.outcomes.values())
+
+    async def arun(
+        self, cases: Iterable[EvalCase], apredict: Callable[[str], Awaitable[Any]]
+    ) -> List[EvalOutcome]:
+        checkpoint = EvalCheckpoint(self.checkpoint_path)
+        done = checkpoint.done
+        queue: "asyncio.Queue[Optional[EvalCase]]" = asyncio.Queue(self.concurrency * 2)
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                case_id, case = item
+                start = time.perf_counter()
+                try:
+                    prediction = await apredict(case.query)
+                    checkpoint.record(_outcome(case_id, case, prediction, start, None))
+                except Exception as exc:  # noqa: BLE001 - recorded, not raised
+                    checkpoint.record(_outcome(case_id, case, False, start, repr(exc)))
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            for case_id, case in cases:
+                if case_id not in done:
+                    await queue.put((case_id, case))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            checkpoint.close()
+        return list(checkpoint.outcomes.values())
+
+
+def report_outcomes(
+    outcomes: List[EvalOutcome],
+    latency_budget_ms: Optional[float] = None,
+    cache_stats: Optional[Dict[str, float]] = None,
+) -> EvalReport:
+    stages = {
+        stage: [outcome.stage_ms[stage] for outcome in outcomes if stage in outcome.stage_ms]
+        for stage in STAGES
+    }
+    return build_report(
+        correctness=[outcome.correct for outcome in outcomes],
+        escalations=[outcome.escalated for outcome in outcomes],
+        latencies_ms=(outcome.latency_ms for outcome in outcomes),
+        cache_stats=cache_stats,
+        stage_latencies_ms=stages,
+        latency_budget_ms=latency_budget_ms,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run an escalation eval set against the agent")
+    parser.add_argument("cases", help="JSONL file of eval cases")
+    parser.add_argument("--checkpoint", help="JSONL file to record and resume progress")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    from agent.session import SessionState
+    from app.components import build_components
+    from app.config import AppConfig
+
+    config = AppConfig()
+    # Trace every case so the report can break latency down by stage.
+    config.metrics.sample_rate = 1.0
+    components = build_components(config)
+    agent = components.agent
+
+    def predict(query: str) -> object:
+        # A fresh session per case keeps cases independent of each other.
+        return agent.handle_message(query, session=SessionState())
+
+    runner = EvalRunner(concurrency=args.concurrency, checkpoint_path=args.checkpoint)
+    outcomes = runner.run(load_cases(args.cases), predict)
+    cache = components.answer_cache
+    report = report_outcomes(
+        outcomes,
+        latency_budget_ms=config.eval.latency_budget_ms,
+        cache_stats=cache.stats() if cache is not None else None,
+    )
+    print(json.dumps(asdict(report), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+@dataclass
+class _Postings:
+    # Parallel arrays keep each posting at 8 bytes instead of a tuple object.
+    doc_ids: array = field(default_factory=lambda: array("I"))
+    freqs: array = field(default_factory=lambda: array("I"))
+
+
+@dataclass
+class BM25Index:
+    k1: float = 1.2
+    b: float = 0.75
+    _postings: Dict[str, _Postings] = field(default_factory=dict)
+    _doc_lengths: array = field(default_factory=lambda: array("I"))
+    _total_length: int = 0
+    _deleted: Set[int] = field(default_factory=set)
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths) - len(self._deleted)
+
+    def add(self, text: str) -> int:
+        doc_id = len(self._doc_lengths)
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, freq in counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Postings()
+            postings.doc_ids.append(doc_id)
+            postings.freqs.append(freq)
+        self._doc_lengths.append(len(tokens))
+        self._total_length += len(tokens)
+        return doc_id
+
+    def remove(self, doc_id: int) -> None:
+        # Tombstone only; postings of removed documents are skipped at query time.
+        if doc_id in self._deleted or doc_id >= len(self._doc_lengths):
+            return
+        self._deleted.add(doc_id)
+        self._total_length -= self._doc_lengths[doc_id]
+
+    def idf(self, term: str) -> float:
+        postings = self._postings.get(term)
+        if postings is None:
+            return 0.0
+        df = len(postings.doc_ids)
+        n = len(self._doc_lengths)
+        if self._deleted:
+            df -= sum(1 for doc_id in postings.doc_ids if doc_id in self._deleted)
+            n -= len(self._deleted)
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """Return ``(doc_id, score)`` pairs, best first.
+
+        Scores are normalised by the best score the query terms could reach,
+        so they stay in ``[0, 1]`` and remain comparable with ``min_score``.
+        """
+        n = len(self)
+        if n == 0 or top_k <= 0:
+            return []
+        avg_length = self._total_length / n or 1.0
+        k1, b = self.k1, self.b
+        lengths = self._doc_lengths
+        deleted = self._deleted
+
+        scores: Dict[int, float] = {}
+        ceiling = 0.0
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            idf = self.idf(term)
+            ceiling += idf * (k1 + 1.0)
+            for doc_id, freq in zip(postings.doc_ids, postings.freqs):
+                if deleted and doc_id in deleted:
+                    continue
+                norm = k1 * (1.0 - b + b * lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (k1 + 1.0) / (
+                    freq + norm
+                )
+        if not scores or ceiling <= 0.0:
+            return []
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(doc_id, min(score / ceiling, 1.0)) for doc_id, score in best]
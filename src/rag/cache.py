@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from app.config import RAGConfig
+from rag.bm25 import tokenize
+from rag.index import RetrievedChunk, content_hash
+
+# (context digest, sorted chunk IDs): only entries in one scope may match.
+Scope = Tuple[str, Tuple[str, ...]]
+CacheKey = Tuple[str, Scope]
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(tokenize(query))
+
+
+@dataclass
+class CachedAnswer:
+    answer: str
+    confidence: float
+    terms: FrozenSet[str]
+    created_at: float
+    latency_ms: float
+
+
+class AnswerCache:
+    """LLM answers keyed on the normalized query, the retrieved chunk IDs and
+    a digest of the conversation context the answer was generated with.
+
+    Chunk IDs are content hashes, so ingesting documents that change what a
+    query retrieves changes its key and the old answer is no longer served.
+    The context is part of the key because the answer may repeat details
+    from it. Answers are therefore shared between sessions only when the
+    context is the same, usually empty on a first turn. Near matches are
+    only considered among entries with the same chunks and context.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_s: float = 3600.0,
+        similarity_threshold: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.latency_saved_ms = 0.0
+        self._entries: "OrderedDict[CacheKey, CachedAnswer]" = OrderedDict()
+        self._by_scope: Dict[Scope, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, chunks: List[RetrievedChunk], context: str = "") -> CacheKey:
+        digest = content_hash(context) if context else ""
+        return normalize_query(query), (digest, tuple(sorted(chunk.chunk_id for chunk in chunks)))
+
+    def _drop(self, key: CacheKey) -> None:
+        self._entries.pop(key, None)
+        bucket = self._by_scope.get(key[1])
+        if bucket is not None:
+            bucket.discard(key[0])
+            if not bucket:
+                del self._by_scope[key[1]]
+
+    def _expired(self, entry: CachedAnswer, now: float) -> bool:
+        return now - entry.created_at > self.ttl_s
+
+    def _find_near(self, key: CacheKey, now: float) -> Optional[CacheKey]:
+        terms = frozenset(key[0].split())
+        best_key, best_score = None, self.similarity_threshold
+        for normalized in self._by_scope.get(key[1], ()):
+            candidate = (normalized, key[1])
+            entry = self._entries[candidate]
+            if self._expired(entry, now) or not (terms or entry.terms):
+                continue
+            score = len(terms & entry.terms) / len(terms | entry.terms)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
+
+    def get(
+        self, query: str, chunks: List[RetrievedChunk], context: str = ""
+    ) -> Optional[CachedAnswer]:
+        key = self.key(query, chunks, context)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                self._drop(key)
+                entry = None
+            if entry is None and self.similarity_threshold < 1.0:
+                near = self._find_near(key, now)
+                if near is not None:
+                    key, entry = near, self._entries[near]
+                    self.near_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.latency_saved_ms += entry.latency_ms
+            return entry
+
+    def put(
+        self,
+        query: str,
+        chunks: List[RetrievedChunk],
+        answer: str,
+        confidence: float,
+        latency_ms: float,
+        context: str = "",
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self.key(query, chunks, context)
+        entry = CachedAnswer(
+            answer=answer,
+            confidence=confidence,
+            terms=frozenset(key[0].split()),
+            created_at=self.clock(),
+            latency_ms=latency_ms,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._by_scope.setdefault(key[1], set()).add(key[0])
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_scope.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "answer_cache_hits": self.hits,
+                "answer_cache_near_hits": self.near_hits,
+                "answer_cache_misses": self.misses,
+                "answer_cache_hit_rate": self.hits / lookups if lookups else 0.0,
+                "answer_cache_latency_saved_ms": self.latency_saved_ms,
+                "answer_cache_entries": len(self._entries),
+            }
+
+
+def create_answer_cache(config: RAGConfig) -> Optional[AnswerCache]:
+    if config.answer_cache_size <= 0:
+        return None
+    return AnswerCache(
+        max_entries=config.answer_cache_size,
+        ttl_s=config.answer_cache_ttl_s,
+        similarity_threshold=config.answer_cache_similarity,
+    )
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Let concurrent callers with the same key share one in-flight call.
+
+    The first caller for a key (the leader) runs the call. Callers that
+    arrive while it is running (followers) wait for its result or exception
+    instead of starting their own. Keys are released as soon as the call
+    finishes, so nothing is cached here. Later callers start a new call.
+
+    Followers wait on a ``concurrent.futures.Future``, which works both from
+    threads and from any event loop. Sync and async callers therefore
+    coalesce with each other. A sync caller must not run on the event-loop
+    thread of an async leader, because it would block that leader.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _settle(self, key: Hashable, future: Future, result=None, error=None) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, call: Callable[[], T]) -> T:
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = call()
+        except BaseException as exc:
+            self._settle(key, future, error=exc)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def ado(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        future, leader = self._join(key)
+        if not leader:
+            # Shielded: cancelling a wrapped future cancels the shared one,
+            # which would fail every other follower of this call.
+            return await asyncio.shield(asyncio.wrap_future(future))
+        task = asyncio.ensure_future(call())
+
+        def done(task: asyncio.Task) -> None:
+            if task.cancelled():
+                self._settle(key, future, error=asyncio.CancelledError())
+            elif task.exception() is not None:
+                self._settle(key, future, error=task.exception())
+            else:
+                self._settle(key, future, task.result())
+
+        task.add_done_callback(done)
+        # Shielded: a leader whose client disconnects must not cancel the
+        # call its followers are waiting on.
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "coalesce_leaders": self.leaders,
+                "coalesce_followers": self.followers,
+                "coalesce_in_flight": len(self._calls),
+            }
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from rag.index import RetrievedChunk, VectorStore, unique_documents
+
+try:
+    import faiss
+    import numpy as np
+except ImportError:  # pragma: no cover
+    faiss = None
+    np = None
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+# FAISS warns below roughly 39 training points per IVF list.
+IVF_TRAINING_FACTOR = 39
+
+
+def _is_mapped(index) -> bool:
+    """Whether ``index`` reads its vectors from the mapped file, not private memory."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return isinstance(faiss.downcast_InvertedLists(ivf.invlists), faiss.OnDiskInvertedLists)
+    storage = faiss.downcast_index(getattr(index, "storage", index))
+    codes = getattr(storage, "codes", None)
+    # Builds without mmap support keep codes in a plain std::vector.
+    return codes is not None and not getattr(codes, "is_owned", True)
+
+
+class FaissVectorStore(VectorStore):
+    """Cosine-similarity store on a FAISS index, persisted for memory-mapped reads.
+
+    ``persist_directory`` holds three files:
+
+    - ``vectors.f32``: every embedding ever added, as contiguous float32 rows.
+    - ``index.faiss``: the FAISS index over those rows. Index position equals
+      row number.
+    - ``meta.json``: row IDs, documents, deleted rows and the dimension.
+
+    At startup the index is memory-mapped where the FAISS build supports it
+    for the index type: ``IO_FLAG_MMAP_IFC`` for flat and HNSW codes,
+    ``IO_FLAG_MMAP`` for IVF lists. Workers on one host then share a single
+    copy in the page cache and start without loading it. ``faiss_mmapped``
+    in ``stats()`` reports whether the mapping took effect. The first write
+    reloads the index into private memory. Writes replace files atomically,
+    and readers pick up a newer index within ``reload_interval_s``. Only one
+    process should ingest at a time.
+
+    Searches hold the store lock only for the index lookup and row mapping,
+    and writes hold it only while they change rows. Embedding happens outside
+    the lock, so an ingest does not stall queries while it embeds.
+
+    ``ivf`` stays an exact flat index until there are enough vectors to train
+    ``nlist`` lists. Deleted rows are tombstoned and filtered at query time.
+    The index is rebuilt from ``vectors.f32`` once a quarter of the rows are
+    tombstones.
+    """
+
+    persistent = True
+
+    def __init__(
+        self,
+        persist_directory: str,
+        embeddings: object,
+        index_type: str = "flat",
+        nlist: int = 256,
+        nprobe: int = 16,
+        hnsw_m: int = 32,
+        ef_search: int = 64,
+        reload_interval_s: float = 1.0,
+    ) -> None:
+        if faiss is None:
+            raise RuntimeError("faiss-cpu and numpy are unavailable.")
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"index_type must be one of {INDEX_TYPES}")
+        self.directory = Path(persist_directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embeddings = embeddings
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.reload_interval_s = reload_interval_s
+        self._index_path = self.directory / "index.faiss"
+        self._vectors_path = self.directory / "vectors.f32"
+        self._meta_path = self.directory / "meta.json"
+        self._lock = threading.RLock()
+        self._dim = 0
+        self._ids: List[str] = []
+        self._documents: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._deleted: Set[int] = set()
+        self._index = None
+        self._mmapped = False
+        self._loaded_mtime = 0.0
+        self._checked_at = 0.0
+        self._load()
+
+    # -- persistence -------------------------------------------------------
+
+    def _load(self) -> None:
+        if not self._meta_path.exists() or not self._index_path.exists():
+            return
+        meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        self._dim = meta["dim"]
+        self._ids = meta["ids"]
+        self._documents = meta["documents"]
+        self._deleted = set(meta["deleted"])
+        self._rows = {
+            doc_id: row for row, doc_id in enumerate(self._ids) if row not in self._deleted
+        }
+        self._loaded_mtime = self._index_path.stat().st_mtime
+        index, self._mmapped = self._read_mapped()
+        self._index = self._tune(index)
+
+    def _read_mapped(self) -> Tuple[object, bool]:
+        # IO_FLAG_MMAP maps only IVF inverted lists; IO_FLAG_MMAP_IFC (newer
+        # FAISS) maps the codes of flat and HNSW indexes.
+        flags = [getattr(faiss, "IO_FLAG_MMAP_IFC", None), faiss.IO_FLAG_MMAP]
+        for flag in filter(None, flags):
+            try:
+                index = faiss.read_index(str(self._index_path), flag | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                # Not every index type supports every mmap flag.
+                continue
+            if _is_mapped(index):
+                return index, True
+        return faiss.read_index(str(self._index_path)), False
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval_s:
+            return
+        self._checked_at = now
+        try:
+            mtime = self._index_path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                self._load()
+
+    def _save(self) -> None:
+        tmp_index = self._index_path.with_suffix(".faiss.tmp")
+        faiss.write_index(self._index, str(tmp_index))
+        tmp_meta = self._meta_path.with_suffix(".json.tmp")
+        tmp_meta.write_text(
+            json.dumps(
+                {
+                    "dim": self._dim,
+                    "ids": self._ids,
+                    "documents": self._documents,
+                    "deleted": sorted(self._deleted),
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_meta, self._meta_path)
+        os.replace(tmp_index, self._index_path)
+        self._loaded_mtime = self._index_path.stat().st_mtime
+
+    def _vectors(self):
+        rows = len(self._ids)
+        if not rows:
+            return np.empty((0, self._dim), dtype=np.float32)
+        return np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+
+    # -- index construction ------------------------------------------------
+
+    def _tune(self, index):
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = self.nprobe
+        if hasattr(index, "hnsw"):
+            index.hnsw.efSearch = self.ef_search
+        return index
+
+    def _build(self, vectors) -> object:
+        if self.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(self._dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        elif self.index_type == "ivf" and len(vectors) >= self.nlist * IVF_TRAINING_FACTOR:
+            quantizer = faiss.IndexFlatIP(self._dim)
+            index = faiss.IndexIVFFlat(
+                quantizer, self._dim, self.nlist, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(vectors)
+        else:
+            index = faiss.IndexFlatIP(self._dim)
+        if len(vectors):
+            index.add(vectors)
+        return self._tune(index)
+
+    def _writable(self) -> None:
+        # A memory-mapped index is read-only; take a private copy before writing.
+        if self._mmapped:
+            self._index = self._tune(faiss.read_index(str(self._index_path)))
+            self._mmapped = False
+
+    def _needs_rebuild(self) -> bool:
+        untrained_ivf = (
+            self.index_type == "ivf"
+            and faiss.try_extract_index_ivf(self._index) is None
+            and len(self._ids) >= self.nlist * IVF_TRAINING_FACTOR
+        )
+        return untrained_ivf or len(self._deleted) * 4 > max(len(self._ids), 1)
+
+    def _compact(self) -> None:
+        live = [row for row in range(len(self._ids)) if row not in self._deleted]
+        vectors = np.ascontiguousarray(self._vectors()[live]) if live else None
+        self._ids = [self._ids[row] for row in live]
+        self._documents = [self._documents[row] for row in live]
+        self._deleted = set()
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        tmp_vectors = self._vectors_path.with_suffix(".f32.tmp")
+        with tmp_vectors.open("wb") as handle:
+            if vectors is not None:
+                handle.write(vectors.tobytes())
+        os.replace(tmp_vectors, self._vectors_path)
+
+    # -- VectorStore -------------------------------------------------------
+
+    def _embed(self, texts: List[str]):
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        faiss.normalize_L2(vectors)
+        return vectors
+
+    def add(self, documents: List[str], ids: Optional[List[str]] = None) -> None:
+        with self._lock:
+            pairs = [(i, d) for i, d in unique_documents(documents, ids) if i not in self._rows]
+        if not pairs:
+            return
+        vectors = self._embed([doc for _, doc in pairs])
+        with self._lock:
+            # Another writer may have added some of these while we embedded.
+            fresh = [row for row, (doc_id, _) in enumerate(pairs) if doc_id not in self._rows]
+            if not fresh:
+                return
+            if len(fresh) < len(pairs):
+                pairs = [pairs[row] for row in fresh]
+                vectors = np.ascontiguousarray(vectors[fresh])
+            self._dim = self._dim or vectors.shape[1]
+            with self._vectors_path.open("ab") as handle:
+                # Drop rows orphaned by a crash between appending and saving meta.
+                handle.truncate(len(self._ids) * self._dim * 4)
+                handle.write(vectors.tobytes())
+            for doc_id, doc in pairs:
+                self._rows[doc_id] = len(self._ids)
+                self._ids.append(doc_id)
+                self._documents.append(doc)
+            if self._index is not None:
+                self._writable()
+            if self._index is None or self._needs_rebuild():
+                if self._deleted:
+                    self._compact()
+                self._index = self._build(np.ascontiguousarray(self._vectors()))
+            else:
+                self._index.add(vectors)
+            self._save()
+
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        self._maybe_reload()
+        return {doc_id for doc_id in ids if doc_id in self._rows}
+
+    def documents(self) -> Iterator[Tuple[str, str]]:
+        self._maybe_reload()
+        with self._lock:
+            pairs = [(doc_id, self._documents[row]) for doc_id, row in self._rows.items()]
+        yield from pairs
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            removed = [self._rows.pop(doc_id) for doc_id in ids if doc_id in self._rows]
+            if not removed:
+                return
+            self._deleted.update(removed)
+            self._writable()
+            if self._needs_rebuild():
+                self._compact()
+                self._index = self._build(np.ascontiguousarray(self._vectors()))
+            self._save()
+
+    def search(self, query: str, top_k: int) -> List[RetrievedChunk]:
+        self._maybe_reload()
+        if self._index is None or top_k <= 0:
+            return []
+        vector = np.asarray([self.embeddings.embed_query(query)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        # Compaction and reloads renumber rows; hold the lock until they are mapped.
+        with self._lock:
+            index, deleted = self._index, self._deleted
+            if index is None or index.ntotal == 0:
+                return []
+            k = min(top_k + len(deleted), index.ntotal)
+            scores, rows = index.search(vector, k)
+            results = []
+            for score, row in zip(scores[0], rows[0]):
+                if row < 0 or row in deleted:
+                    continue
+                results.append(
+                    RetrievedChunk(
+                        content=self._documents[row],
+                        score=max(0.0, min(float(score), 1.0)),
+                        chunk_id=self._ids[row],
+                    )
+                )
+                if len(results) == top_k:
+                    break
+        return results
+
+    def prefetch(self, queries: List[str]) -> None:
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if embed_queries is not None:
+            embed_queries(queries)
+
+    def stats(self) -> Dict[str, int]:
+        stats = {
+            "faiss_vectors": len(self._rows),
+            "faiss_tombstones": len(self._deleted),
+            "faiss_mmapped": int(self._mmapped),
+        }
+        embedding_stats = getattr(self.embeddings, "stats", None)
+        if embedding_stats is not None:
+            stats.update(embedding_stats())
+        return stats
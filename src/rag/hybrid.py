@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from app.lazy import optional_import
+from rag.index import InMemoryVectorStore, RetrievedChunk, VectorStore, unique_documents
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[RetrievedChunk]], k: int = 60
+) -> List[RetrievedChunk]:
+    """Merge ranked lists by summing ``1 / (k + rank)`` per chunk.
+
+    Scores are divided by the best reachable sum, so a chunk ranked first in
+    every list scores 1.0. Chunks are matched on content because dense stores
+    do not always return the IDs they were given; the first list's copy wins.
+    """
+    if not rankings:
+        return []
+    scores: Dict[str, float] = {}
+    chunks: Dict[str, RetrievedChunk] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking, start=1):
+            scores[chunk.content] = scores.get(chunk.content, 0.0) + 1.0 / (k + rank)
+            chunks.setdefault(chunk.content, chunk)
+    ceiling = len(rankings) / (k + 1)
+    ordered = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [
+        RetrievedChunk(content=content, score=score / ceiling, chunk_id=chunks[content].chunk_id)
+        for content, score in ordered
+    ]
+
+
+class Reranker:
+    def rerank(self, query: str, chunks: List[RetrievedChunk]) -> List[RetrievedChunk]:
+        raise NotImplementedError
+
+
+class CrossEncoderReranker(Reranker):
+    """Rescore candidates with a sentence-transformers cross-encoder."""
+
+    def __init__(self, model_name: str) -> None:
+        cross_encoder = optional_import("sentence_transformers", "CrossEncoder")
+        if cross_encoder is None:
+            raise RuntimeError("sentence-transformers is unavailable.")
+        self.model = cross_encoder(model_name)
+
+    def rerank(self, query: str, chunks: List[RetrievedChunk]) -> List[RetrievedChunk]:
+        if not chunks:
+            return chunks
+        logits = self.model.predict([(query, chunk.content) for chunk in chunks])
+        rescored = [
+            RetrievedChunk(
+                content=chunk.content,
+                score=1.0 / (1.0 + math.exp(-float(logit))),
+                chunk_id=chunk.chunk_id,
+            )
+            for chunk, logit in zip(chunks, logits)
+        ]
+        return sorted(rescored, key=lambda chunk: chunk.score, reverse=True)
+
+
+class HybridVectorStore(VectorStore):
+    """BM25 and dense retrieval run side by side and fused with RRF.
+
+    Each retriever returns ``candidates`` times ``top_k`` results. Results
+    below ``min_score`` are dropped before fusion, so an irrelevant dense hit
+    cannot ride on rank alone. A reranker, when configured, rescores the
+    fused candidates. It is skipped whenever retrieval has already used
+    enough of ``budget_ms`` that the reranker's recent latency would overrun
+    it. After ``probe_every`` skips in a row the next query reranks anyway, so
+    a reranker that has got fast again is noticed.
+    """
+
+    def __init__(
+        self,
+        dense: VectorStore,
+        lexical: Optional[InMemoryVectorStore] = None,
+        rrf_k: int = 60,
+        candidates: int = 3,
+        min_score: float = 0.0,
+        reranker: Optional[Reranker] = None,
+        budget_ms: float = 250.0,
+        probe_every: int = 20,
+    ) -> None:
+        self.dense = dense
+        self.lexical = lexical if lexical is not None else InMemoryVectorStore()
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.min_score = min_score
+        self.reranker = reranker
+        self.budget_ms = budget_ms
+        self.probe_every = probe_every
+        self.reranked = 0
+        self.rerank_skipped = 0
+        self._rerank_ms = 0.0
+        self._skips_in_row = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="dense-search")
+        # A persisted dense store outlives the in-memory BM25 index; rebuild it.
+        self.lexical.add(*self._unzip(dense.documents()))
+
+    @property
+    def persistent(self) -> bool:
+        return self.dense.persistent
+
+    @staticmethod
+    def _unzip(pairs: Iterator[Tuple[str, str]]) -> Tuple[List[str], List[str]]:
+        ids, documents = [], []
+        for doc_id, doc in pairs:
+            ids.append(doc_id)
+            documents.append(doc)
+        return documents, ids
+
+    def documents(self) -> Iterator[Tuple[str, str]]:
+        return self.dense.documents()
+
+    def add(self, documents: List[str], ids: Optional[List[str]] = None) -> None:
+        pairs = unique_documents(documents, ids)
+        self.lexical.add(*self._unzip(iter(pairs)))
+        known = self.dense.existing_ids([doc_id for doc_id, _ in pairs])
+        fresh = [(doc_id, doc) for doc_id, doc in pairs if doc_id not in known]
+        if fresh:
+            self.dense.add(*self._unzip(iter(fresh)))
+
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        return self.lexical.existing_ids(ids) & self.dense.existing_ids(ids)
+
+    def delete(self, ids: List[str]) -> None:
+        self.lexical.delete(ids)
+        self.dense.delete(ids)
+
+    def search(self, query: str, top_k: int) -> List[RetrievedChunk]:
+        start = time.perf_counter()
+        depth = top_k * self.candidates
+        dense = self._pool.submit(self.dense.search, query, depth)
+        lexical = self.lexical.search(query, depth)
+        return self._merge(query, top_k, lexical, dense.result(), start)
+
+    async def asearch(self, query: str, top_k: int) -> List[RetrievedChunk]:
+        start = time.perf_counter()
+        depth = top_k * self.candidates
+        lexical, dense = await asyncio.gather(
+            self.lexical.asearch(query, depth), self.dense.asearch(query, depth)
+        )
+        if self.reranker is None:
+            return self._merge(query, top_k, lexical, dense, start)
+        # Reranking is CPU-heavy; keep it off the event loop.
+        return await asyncio.to_thread(self._merge, query, top_k, lexical, dense, start)
+
+    def _merge(
+        self,
+        query: str,
+        top_k: int,
+        lexical: List[RetrievedChunk],
+        dense: List[RetrievedChunk],
+        start: float,
+    ) -> List[RetrievedChunk]:
+        fused = reciprocal_rank_fusion(
+            [
+                [chunk for chunk in lexical if chunk.score >= self.min_score],
+                [chunk for chunk in dense if chunk.score >= self.min_score],
+            ],
+            k=self.rrf_k,
+        )
+        if self.reranker is None or not fused:
+            return fused[:top_k]
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            over_budget = elapsed_ms + self._rerank_ms > self.budget_ms
+            # Skipped calls are never measured, so re-measure now and then.
+            probe = over_budget and self._skips_in_row >= self.probe_every
+            if over_budget and not probe:
+                self._skips_in_row += 1
+                self.rerank_skipped += 1
+                return fused[:top_k]
+        rerank_start = time.perf_counter()
+        reranked = self.reranker.rerank(query, fused[: top_k * self.candidates])
+        rerank_ms = (time.perf_counter() - rerank_start) * 1000
+        with self._lock:
+            self.reranked += 1
+            self._skips_in_row = 0
+            if self.reranked == 1 or probe:
+                # The first measurement, or one replacing a stale estimate.
+                self._rerank_ms = rerank_ms
+            else:
+                # Moving average, so one slow call among fast ones has little effect.
+                self._rerank_ms = 0.8 * self._rerank_ms + 0.2 * rerank_ms
+        return reranked[:top_k]
+
+    def prefetch(self, queries: List[str]) -> None:
+        self.dense.prefetch(queries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **self.dense.stats(),
+                "hybrid_reranked": self.reranked,
+                "hybrid_rerank_skipped": self.rerank_skipped,
+            }
@@ -1,72 +1,376 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from app.config import RAGConfig
+from app.lazy import optional_import
+from rag.bm25 import BM25Index
 
-try:
-    from langchain_community.vectorstores import Chroma
-    from langchain_ollama import OllamaEmbeddings
-except ImportError:  # pragma: no cover
-    Chroma = None
-    OllamaEmbeddings = None
+
+def _chroma() -> Optional[type]:
+    return optional_import("langchain_community.vectorstores", "Chroma")
+
+
+def _ollama_embeddings() -> Optional[type]:
+    return optional_import("langchain_ollama", "OllamaEmbeddings")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def unique_documents(
+    documents: Iterable[str], ids: Optional[Iterable[str]] = None
+) -> List[Tuple[str, str]]:
+    """Pair documents with their IDs (content hashes by default), dropping repeats."""
+    documents = list(documents)
+    ids = list(ids) if ids is not None else [content_hash(doc) for doc in documents]
+    seen: Set[str] = set()
+    pairs = []
+    for doc_id, doc in zip(ids, documents):
+        if doc_id not in seen:
+            seen.add(doc_id)
+            pairs.append((doc_id, doc))
+    return pairs
 
 
 @dataclass
 class RetrievedChunk:
     content: str
     score: float
+    chunk_id: str = ""
+
+    def __post_init__(self) -> None:
+        if not self.chunk_id:
+            self.chunk_id = content_hash(self.content)
 
 
 class VectorStore:
-    def add(self, documents: List[str]) -> None:
+    # Whether documents survive a restart (and ingest manifests should too).
+    persistent = False
+
+    def add(self, documents: List[str], ids: Optional[List[str]] = None) -> None:
+        raise NotImplementedError
+
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        return set()
+
+    def documents(self) -> Iterator[Tuple[str, str]]:
+        """Yield every stored ``(id, document)`` pair."""
+        return iter(())
+
+    def delete(self, ids: List[str]) -> None:
         raise NotImplementedError
 
     def search(self, query: str, top_k: int) -> List[RetrievedChunk]:
         raise NotImplementedError
 
+    async def asearch(self, query: str, top_k: int) -> List[RetrievedChunk]:
+        return await asyncio.to_thread(self.search, query, top_k)
+
+    def prefetch(self, queries: List[str]) -> None:
+        """Warm whatever ``search`` computes per query, for many queries at once."""
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
 
 @dataclass
 class InMemoryVectorStore(VectorStore):
     _documents: List[str] = field(default_factory=list)
+    _ids: List[str] = field(default_factory=list)
+    _positions: Dict[str, int] = field(default_factory=dict)
+    _index: BM25Index = field(default_factory=BM25Index)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def add(self, documents: List[str], ids: Optional[List[str]] = None) -> None:
+        with self._lock:
+            for doc_id, doc in unique_documents(documents, ids):
+                if doc_id in self._positions:
+                    continue
+                self._positions[doc_id] = self._index.add(doc)
+                self._documents.append(doc)
+                self._ids.append(doc_id)
+
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        return {doc_id for doc_id in ids if doc_id in self._positions}
 
-    def add(self, documents: List[str]) -> None:
-        self._documents.extend(documents)
+    def documents(self) -> Iterator[Tuple[str, str]]:
+        for doc_id, position in list(self._positions.items()):
+            yield doc_id, self._documents[position]
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            for doc_id in ids:
+                position = self._positions.pop(doc_id, None)
+                if position is not None:
+                    self._index.remove(position)
+                    self._documents[position] = ""
 
     def search(self, query: str, top_k: int) -> List[RetrievedChunk]:
-        # Naive retrieval by keyword overlap as a placeholder.
-        ranked: List[Tuple[str, float]] = []
-        query_terms = set(query.lower().split())
-        for doc in self._documents:
-            doc_terms = set(doc.lower().split())
-            overlap = len(query_terms.intersection(doc_terms))
-            if overlap > 0:
-                ranked.append((doc, overlap / max(len(query_terms), 1)))
-        ranked.sort(key=lambda item: item[1], reverse=True)
-        return [RetrievedChunk(content=doc, score=score) for doc, score in ranked[:top_k]]
+        # ``add`` publishes postings before the document they point to.
+        with self._lock:
+            return [
+                RetrievedChunk(
+                    content=self._documents[position], score=score, chunk_id=self._ids[position]
+                )
+                for position, score in self._index.search(query, top_k)
+            ]
+
+    async def asearch(self, query: str, top_k: int) -> List[RetrievedChunk]:
+        # Index lookups are CPU-bound and short; a thread hop would cost more.
+        return self.search(query, top_k)
+
+
+class EmbeddingDiskCache:
+    """Append-only float32 vector file, memory-mapped for reads.
+
+    ``<name>.keys`` holds the vector dimension on its first line followed by
+    one key per row of ``<name>.f32``. Rows are written before their key, so
+    a crash can only leave an orphaned trailing row, which is ignored and
+    truncated before the next append.
+    """
+
+    def __init__(self, directory: str, name: str = "embeddings") -> None:
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = path / f"{name}.f32"
+        self._keys_path = path / f"{name}.keys"
+        self._rows: Dict[str, int] = {}
+        self._dim = 0
+        self._map: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _load(self) -> None:
+        if not self._keys_path.exists():
+            return
+        lines = self._keys_path.read_text(encoding="utf-8").splitlines()
+        if not lines:
+            return
+        self._dim = int(lines[0])
+        size = self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+        available = size // (self._dim * 4) if self._dim else 0
+        for row, key in enumerate(lines[1 : available + 1]):
+            self._rows[key] = row
+
+    def _remap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        with self._vectors_path.open("rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                return None
+            start = row * self._dim * 4
+            end = start + self._dim * 4
+            if self._map is None or len(self._map) < end:
+                self._remap()
+            vector = array("f")
+            vector.frombytes(self._map[start:end])
+            return vector.tolist()
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        with self._lock:
+            fresh = {key: vec for key, vec in items.items() if key not in self._rows}
+            if not fresh:
+                return
+            if not self._dim:
+                self._dim = len(next(iter(fresh.values())))
+                self._keys_path.write_text(f"{self._dim}\n", encoding="utf-8")
+            fresh = {key: vec for key, vec in fresh.items() if len(vec) == self._dim}
+            with self._vectors_path.open("ab") as handle:
+                # Drop rows orphaned by a crash between appending and writing keys.
+                handle.truncate(len(self._rows) * self._dim * 4)
+                for vector in fresh.values():
+                    handle.write(array("f", vector).tobytes())
+            with self._keys_path.open("a", encoding="utf-8") as handle:
+                for key in fresh:
+                    self._rows[key] = len(self._rows)
+                    handle.write(f"{key}\n")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+
+class CachedEmbeddings:
+    """Content-hash keyed cache in front of a LangChain embeddings client.
+
+    Lookups go to a bounded in-memory LRU first, then to the optional disk
+    tier; only the remaining misses reach the wrapped client, in one batch.
+    """
+
+    def __init__(
+        self,
+        embeddings: object,
+        namespace: str,
+        max_entries: int = 10000,
+        disk: Optional[EmbeddingDiskCache] = None,
+        batch_queries: bool = False,
+    ) -> None:
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self.batch_queries = batch_queries
+        self.max_entries = max_entries
+        self.disk = disk
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, kind: str, text: str) -> str:
+        return content_hash(f"{self.namespace}\0{kind}\0{text}")
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self._remember(key, vector)
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return vector
+        return None
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _embed(self, kind: str, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        vectors: List[Optional[List[float]]] = [self._lookup(key) for key in keys]
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            with self._lock:
+                self.misses += len(missing)
+            if kind == "query" and not self.batch_queries:
+                computed = [self.embeddings.embed_query(text) for text in missing.values()]
+            else:
+                computed = self.embeddings.embed_documents(list(missing.values()))
+            fresh = {key: list(vector) for key, vector in zip(missing, computed)}
+            for key, vector in fresh.items():
+                self._remember(key, vector)
+            if self.disk is not None:
+                self.disk.put_many(fresh)
+            vectors = [fresh[key] if vec is None else vec for key, vec in zip(keys, vectors)]
+        return vectors  # type: ignore[return-value]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("document", list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed queries, sending the uncached ones to the client in one batch.
+
+        The batch goes through ``embed_documents``, so this is only done with
+        ``batch_queries`` set, for clients that embed both alike (Ollama does).
+        """
+        return self._embed("query", list(texts))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "embedding_cache_hits": self.hits,
+                "embedding_cache_disk_hits": self.disk_hits,
+                "embedding_cache_misses": self.misses,
+                "embedding_cache_entries": len(self._memory),
+            }
+
+
+def create_embeddings(
+    model: str, cache_size: int = 10000, cache_directory: Optional[str] = None
+) -> CachedEmbeddings:
+    embeddings_class = _ollama_embeddings()
+    if embeddings_class is None:
+        raise RuntimeError("Ollama embeddings are unavailable.")
+    disk = EmbeddingDiskCache(cache_directory, model) if cache_directory else None
+    return CachedEmbeddings(
+        embeddings_class(model=model),
+        namespace=model,
+        max_entries=cache_size,
+        disk=disk,
+        batch_queries=True,
+    )
 
 
 @dataclass
 class ChromaVectorStore(VectorStore):
     persist_directory: str
     collection_name: str = "support_docs"
+    embedding_model: str = "nomic-embed-text"
+    embedding_cache_size: int = 10000
+    embedding_cache_directory: Optional[str] = None
     _store: object = field(init=False)
+    _embeddings: CachedEmbeddings = field(init=False)
+    persistent = True
 
     def __post_init__(self) -> None:
-        if Chroma is None or OllamaEmbeddings is None:
+        chroma = _chroma()
+        if chroma is None or _ollama_embeddings() is None:
             raise RuntimeError("Chroma or Ollama embeddings are unavailable.")
-        embeddings = OllamaEmbeddings(model="nomic-embed-text")
-        self._store = Chroma(
+        self._embeddings = create_embeddings(
+            self.embedding_model, self.embedding_cache_size, self.embedding_cache_directory
+        )
+        self._store = chroma(
             collection_name=self.collection_name,
-            embedding_function=embeddings,
+            embedding_function=self._embeddings,
             persist_directory=self.persist_directory,
         )
 
-    def add(self, documents: List[str]) -> None:
-        if documents:
-            self._store.add_texts(documents)
+    def add(self, documents: List[str], ids: Optional[List[str]] = None) -> None:
+        pairs = unique_documents(documents, ids)
+        if pairs:
+            self._store.add_texts(
+                [doc for _, doc in pairs], ids=[doc_id for doc_id, _ in pairs]
+            )
+            self._store.persist()
+
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        if not ids:
+            return set()
+        return set(self._store.get(ids=list(ids), include=[])["ids"])
+
+    def documents(self) -> Iterator[Tuple[str, str]]:
+        stored = self._store.get(include=["documents"])
+        return zip(stored["ids"], stored["documents"])
+
+    def delete(self, ids: List[str]) -> None:
+        if ids:
+            self._store.delete(ids=list(ids))
             self._store.persist()
 
     def search(self, query: str, top_k: int) -> List[RetrievedChunk]:
@@ -76,12 +380,60 @@ class ChromaVectorStore(VectorStore):
             for doc, score in results
         ]
 
+    def prefetch(self, queries: List[str]) -> None:
+        self._embeddings.embed_queries(queries)
+
+    def stats(self) -> Dict[str, int]:
+        return self._embeddings.stats()
+
 
 def create_vector_store(config: RAGConfig) -> VectorStore:
+    if config.vector_store == "hybrid":
+        from rag.hybrid import CrossEncoderReranker, HybridVectorStore
+
+        dense = create_vector_store(
+            config.model_copy(update={"vector_store": config.dense_vector_store})
+        )
+        if isinstance(dense, InMemoryVectorStore):
+            # Without a dense store there is nothing to fuse with BM25.
+            return dense
+        reranker = None
+        if config.reranker_model:
+            reranker = CrossEncoderReranker(config.reranker_model)
+        return HybridVectorStore(
+            dense=dense,
+            rrf_k=config.rrf_k,
+            candidates=config.hybrid_candidates,
+            min_score=config.min_score,
+            reranker=reranker,
+            budget_ms=config.retrieval_budget_ms,
+        )
+    if config.vector_store == "faiss":
+        from rag.faiss_store import FaissVectorStore, faiss
+
+        if faiss is None or _ollama_embeddings() is None:
+            return InMemoryVectorStore()
+        return FaissVectorStore(
+            persist_directory=str(Path(config.persist_directory) / "faiss"),
+            embeddings=create_embeddings(
+                "nomic-embed-text",
+                config.embedding_cache_size,
+                config.embedding_cache_directory,
+            ),
+            index_type=config.faiss_index_type,
+            nlist=config.faiss_nlist,
+            nprobe=config.faiss_nprobe,
+            hnsw_m=config.faiss_hnsw_m,
+            ef_search=config.faiss_ef_search,
+        )
     if config.vector_store == "chroma":
-        if Chroma is None or OllamaEmbeddings is None:
+        if _chroma() is None or _ollama_embeddings() is None:
             return InMemoryVectorStore()
         persist_path = Path(config.persist_directory)
         persist_path.mkdir(parents=True, exist_ok=True)
-        return ChromaVectorStore(persist_directory=str(persist_path))
+        return ChromaVectorStore(
+            persist_directory=str(persist_path),
+            embedding_cache_size=config.embedding_cache_size,
+            embedding_cache_directory=config.embedding_cache_directory,
+        )
     return InMemoryVectorStore()
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Set, Tuple
+
+from app.config import RAGConfig
+from rag.index import VectorStore, content_hash
+from rag.manifest import IngestManifest, ManifestEntry
+
+DOC_SUFFIXES = {".md", ".txt"}
+
+
+def iter_doc_files(root: Path) -> Iterator[Path]:
+    for path in sorted(root.rglob("*")):
+        if path.is_file() and path.suffix.lower() in DOC_SUFFIXES:
+            yield path
+
+
+def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+    """Split ``text`` into windows of at most ``chunk_size`` characters.
+
+    Consecutive chunks share ``overlap`` characters. Cuts prefer a paragraph
+    break, then a space, so chunks rarely end mid-word.
+    """
+    text = text.strip()
+    if len(text) <= chunk_size:
+        return [text] if text else []
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            floor = start + overlap + 1
+            cut = text.rfind("\n\n", floor, end)
+            if cut == -1:
+                cut = text.rfind(" ", floor, end)
+            if cut != -1:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+@dataclass
+class IngestReport:
+    documents: int = 0
+    chunks: int = 0
+    duplicates: int = 0
+    batches: int = 0
+    elapsed_s: float = 0.0
+
+    @property
+    def documents_per_s(self) -> float:
+        return self.documents / self.elapsed_s if self.elapsed_s else 0.0
+
+    @property
+    def chunks_per_s(self) -> float:
+        return self.chunks / self.elapsed_s if self.elapsed_s else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "duplicates": self.duplicates,
+            "batches": self.batches,
+            "elapsed_s": round(self.elapsed_s, 4),
+            "documents_per_s": round(self.documents_per_s, 2),
+            "chunks_per_s": round(self.chunks_per_s, 2),
+        }
+
+
+@dataclass
+class SyncReport:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    deleted_chunks: int = 0
+    ingest: IngestReport = field(default_factory=IngestReport)
+
+    def as_dict(self) -> dict:
+        return {
+            "added": self.added,
+            "changed": self.changed,
+            "unchanged": len(self.unchanged),
+            "removed": self.removed,
+            "deleted_chunks": self.deleted_chunks,
+            **self.ingest.as_dict(),
+        }
+
+
+class IngestionPipeline:
+    """Chunk, dedup and add documents to a vector store in parallel batches.
+
+    Documents are consumed lazily, so only the current batch plus at most
+    ``max_workers`` batches in flight are held in memory. Each batch is one
+    ``VectorStore.add`` call, which embeds and persists it once.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        batch_size: int = 64,
+        max_workers: int = 4,
+    ) -> None:
+        self.vector_store = vector_store
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self._sync_lock = threading.Lock()
+
+    def ingest_texts(self, documents: Iterable[str]) -> IngestReport:
+        return self._ingest(self.chunk(document) for document in documents)
+
+    def ingest_files(self, paths: Iterable[Path]) -> IngestReport:
+        return self.ingest_texts(path.read_text(encoding="utf-8") for path in paths)
+
+    def chunk(self, document: str) -> List[str]:
+        return chunk_text(document, self.chunk_size, self.chunk_overlap)
+
+    def _ingest(self, chunked_documents: Iterable[List[str]]) -> IngestReport:
+        report = IngestReport()
+        start = time.perf_counter()
+        seen: Set[str] = set()
+        batch: List[Tuple[str, str]] = []
+        in_flight: Deque[Future] = deque()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+
+            def submit() -> None:
+                fresh = self._drop_known(batch, report)
+                batch.clear()
+                if not fresh:
+                    return
+                if len(in_flight) >= self.max_workers:
+                    in_flight.popleft().result()
+                report.batches += 1
+                report.chunks += len(fresh)
+                in_flight.append(
+                    pool.submit(
+                        self.vector_store.add,
+                        [chunk for _, chunk in fresh],
+                        [chunk_id for chunk_id, _ in fresh],
+                    )
+                )
+
+            for chunks in chunked_documents:
+                report.documents += 1
+                for chunk in chunks:
+                    chunk_id = content_hash(chunk)
+                    if chunk_id in seen:
+                        report.duplicates += 1
+                        continue
+                    seen.add(chunk_id)
+                    batch.append((chunk_id, chunk))
+                    if len(batch) >= self.batch_size:
+                        submit()
+            submit()
+            while in_flight:
+                in_flight.popleft().result()
+
+        report.elapsed_s = time.perf_counter() - start
+        return report
+
+    def sync_directory(self, root: Path, manifest: IngestManifest) -> SyncReport:
+        """Bring the store in line with ``root``, touching only what changed.
+
+        Files whose mtime and size match the manifest are not read. Files that
+        were touched but hash the same only get their manifest entry refreshed.
+        Chunks of changed or removed files are deleted unless another file
+        still produces them.
+        """
+        with self._sync_lock:
+            sync = SyncReport()
+            prefix = f"{root.resolve()}{os.sep}"
+            stale: List[str] = []
+            seen_keys: Set[str] = set()
+            staged: Dict[str, ManifestEntry] = {}
+
+            def changed_documents() -> Iterator[List[str]]:
+                for path in iter_doc_files(root):
+                    key = str(path.resolve())
+                    seen_keys.add(key)
+                    stat = path.stat()
+                    entry = manifest.entries.get(key)
+                    fingerprint = (stat.st_mtime, stat.st_size)
+                    if entry and (entry.mtime, entry.size) == fingerprint:
+                        sync.unchanged.append(key)
+                        continue
+                    text = path.read_text(encoding="utf-8")
+                    digest = content_hash(text)
+                    if entry and entry.sha256 == digest:
+                        entry.mtime, entry.size = stat.st_mtime, stat.st_size
+                        sync.unchanged.append(key)
+                        continue
+                    chunks = self.chunk(text)
+                    if entry:
+                        stale.extend(entry.chunk_ids)
+                        sync.changed.append(key)
+                    else:
+                        sync.added.append(key)
+                    staged[key] = ManifestEntry(
+                        mtime=stat.st_mtime,
+                        size=stat.st_size,
+                        sha256=digest,
+                        chunk_ids=[content_hash(chunk) for chunk in chunks],
+                    )
+                    yield chunks
+
+            sync.ingest = self._ingest(changed_documents())
+            # Only now are the chunks stored. If ingestion failed, the manifest
+            # still describes the old files and the next sync retries them.
+            manifest.entries.update(staged)
+
+            for key in list(manifest.entries):
+                if key.startswith(prefix) and key not in seen_keys:
+                    stale.extend(manifest.entries.pop(key).chunk_ids)
+                    sync.removed.append(key)
+            if stale:
+                live = manifest.referenced_ids()
+                orphaned = sorted(set(stale) - live)
+                self.vector_store.delete(orphaned)
+                sync.deleted_chunks = len(orphaned)
+            manifest.save()
+            return sync
+
+    def _drop_known(
+        self, batch: List[Tuple[str, str]], report: IngestReport
+    ) -> List[Tuple[str, str]]:
+        known = self.vector_store.existing_ids([chunk_id for chunk_id, _ in batch])
+        report.duplicates += len(known)
+        return [(chunk_id, chunk) for chunk_id, chunk in batch if chunk_id not in known]
+
+
+def create_ingestion_pipeline(config: RAGConfig, vector_store: VectorStore) -> IngestionPipeline:
+    return IngestionPipeline(
+        vector_store=vector_store,
+        chunk_size=config.chunk_size,
+        chunk_overlap=config.chunk_overlap,
+        batch_size=config.ingest_batch_size,
+        max_workers=config.ingest_workers,
+    )
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.config import RAGConfig
+from rag.index import VectorStore
+
+
+@dataclass
+class ManifestEntry:
+    mtime: float
+    size: int
+    sha256: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+class IngestManifest:
+    """What each ingested file looked like and which chunks it produced.
+
+    With no ``path`` the manifest lives only as long as the process, which
+    matches stores that are not persisted either.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path
+        self.entries: Dict[str, ManifestEntry] = {}
+        if path is not None and path.exists():
+            raw = json.loads(path.read_text(encoding="utf-8"))
+            self.entries = {key: ManifestEntry(**value) for key, value in raw.items()}
+
+    def referenced_ids(self, excluding: Iterable[str] = ()) -> Set[str]:
+        skip = set(excluding)
+        return {
+            chunk_id
+            for key, entry in self.entries.items()
+            if key not in skip
+            for chunk_id in entry.chunk_ids
+        }
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        data = {key: asdict(entry) for key, entry in self.entries.items()}
+        tmp.write_text(json.dumps(data, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def create_manifest(config: RAGConfig, vector_store: VectorStore) -> IngestManifest:
+    if config.manifest_path:
+        return IngestManifest(Path(config.manifest_path))
+    if vector_store.persistent:
+        return IngestManifest(Path(config.persist_directory) / "ingest_manifest.json")
+    return IngestManifest()
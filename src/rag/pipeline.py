@@ -1,15 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import time
 from dataclasses import dataclass
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, List, Optional, Tuple
 
-from app.config import RAGConfig
+from app.config import OllamaConfig, RAGConfig
+from app.metrics import current_trace
+from rag.cache import AnswerCache, create_answer_cache
+from rag.coalesce import SingleFlight
 from rag.index import RetrievedChunk, VectorStore
+from rag.prompt import PromptBuilder
+from rag.scheduler import llm_priority
 
-try:
-    from langchain_ollama import OllamaLLM
-except ImportError:  # pragma: no cover - optional dependency at runtime
-    OllamaLLM = None
+FALLBACK_ANSWER = "Thanks for reaching out. I can help with that, but I need more details."
+
+
+@dataclass
+class RagDraft:
+    query: str
+    chunks: List[RetrievedChunk]
+    prompt: str
+    confidence: float
+    context: str = ""
+    # LLM scheduler lane for the generation; ``None`` lets the scheduler pick.
+    priority: Optional[int] = None
 
 
 @dataclass
@@ -17,37 +32,186 @@ class RagPipeline:
     config: RAGConfig
     vector_store: VectorStore
     llm: Optional[object] = None
+    answer_cache: Optional[AnswerCache] = None
+    prompt_builder: Optional[PromptBuilder] = None
+    coalescer: Optional[SingleFlight] = None
 
     def __post_init__(self) -> None:
-        if self.llm is None and OllamaLLM is not None:
-            self.llm = OllamaLLM(model="llama3")
+        if self.llm is None:
+            # Imported here because app.components wires RagPipeline itself.
+            from app.components import create_llm
+
+            self.llm = create_llm(OllamaConfig())
+        if self.answer_cache is None:
+            self.answer_cache = create_answer_cache(self.config)
+        if self.prompt_builder is None:
+            self.prompt_builder = PromptBuilder(
+                snippet_token_budget=self.config.snippet_token_budget,
+                max_snippet_tokens=self.config.max_snippet_tokens,
+            )
+        if self.coalescer is None and self.config.coalesce_requests:
+            self.coalescer = SingleFlight()
 
     def retrieve(self, query: str) -> List[RetrievedChunk]:
         results = self.vector_store.search(query, top_k=self.config.top_k)
         return [chunk for chunk in results if chunk.score >= self.config.min_score]
 
+    async def aretrieve(self, query: str) -> List[RetrievedChunk]:
+        results = await self.vector_store.asearch(query, top_k=self.config.top_k)
+        return [chunk for chunk in results if chunk.score >= self.config.min_score]
+
+    def prefetch(self, queries: List[str]) -> None:
+        """Batch the per-query retrieval work (query embeddings) of many queries."""
+        if queries:
+            self.vector_store.prefetch(queries)
+
     def build_prompt(self, query: str, context: str, chunks: List[RetrievedChunk]) -> str:
-        sources = "\n".join(f"- {chunk.content}" for chunk in chunks)
-        return (
-            "You are a customer support agent.\n"
-            f"Conversation context:\n{context}\n"
-            f"Knowledge snippets:\n{sources}\n"
-            f"User question: {query}\n"
-            "Respond with a helpful, concise answer.\n"
-        )
+        return self.prompt_builder.build(query, context, chunks).text
 
     def generate_answer(self, query: str, context: str) -> Tuple[str, float]:
+        return self.generate(self.prepare(query, context))
+
+    async def agenerate_answer(self, query: str, context: str) -> Tuple[str, float]:
+        return await self.agenerate(await self.aprepare(query, context))
+
+    def prepare(self, query: str, context: str) -> RagDraft:
+        """Retrieve and build the prompt; the draft's confidence is already final."""
+        trace = current_trace()
         chunks = self.retrieve(query)
-        prompt = self.build_prompt(query, context, chunks)
+        trace.mark("retrieval")
+        return self._draft(query, context, chunks, trace)
+
+    async def aprepare(self, query: str, context: str) -> RagDraft:
+        trace = current_trace()
+        chunks = await self.aretrieve(query)
+        trace.mark("retrieval")
+        return self._draft(query, context, chunks, trace)
 
+    def generate(self, draft: RagDraft) -> Tuple[str, float]:
         if self.llm is None:
-            return (
-                "Thanks for reaching out. I can help with that, but I need more details.",
-                0.5,
-            )
+            return FALLBACK_ANSWER, draft.confidence
+
+        cached = self._cached_answer(draft.query, draft.chunks, draft.context)
+        if cached is not None:
+            return cached
+
+        def invoke() -> Tuple[str, float]:
+            start = time.perf_counter()
+            with llm_priority(draft.priority):
+                response = self.llm.invoke(draft.prompt)
+            return self._finish(draft.query, draft.chunks, response, start, draft.context)
+
+        if self.coalescer is None:
+            answer = invoke()
+        else:
+            answer = self.coalescer.do(self._key(draft), invoke)
+        current_trace().mark("llm")
+        return answer
 
-        response = self.llm.invoke(prompt)
+    async def agenerate(self, draft: RagDraft) -> Tuple[str, float]:
+        if self.llm is None:
+            return FALLBACK_ANSWER, draft.confidence
+
+        cached = self._cached_answer(draft.query, draft.chunks, draft.context)
+        if cached is not None:
+            return cached
+
+        async def invoke() -> Tuple[str, float]:
+            start = time.perf_counter()
+            with llm_priority(draft.priority):
+                ainvoke = getattr(self.llm, "ainvoke", None)
+                if ainvoke is not None:
+                    response = await ainvoke(draft.prompt)
+                else:
+                    response = await asyncio.to_thread(self.llm.invoke, draft.prompt)
+            return self._finish(draft.query, draft.chunks, response, start, draft.context)
+
+        if self.coalescer is None:
+            answer = await invoke()
+        else:
+            answer = await self.coalescer.ado(self._key(draft), invoke)
+        current_trace().mark("llm")
+        return answer
+
+    async def astream(self, draft: RagDraft) -> AsyncIterator[str]:
+        if self.llm is None:
+            yield FALLBACK_ANSWER
+            return
+
+        cached = self._cached_answer(draft.query, draft.chunks, draft.context)
+        if cached is not None:
+            yield cached[0]
+            return
+
+        start = time.perf_counter()
+        astream = getattr(self.llm, "astream", None)
+        if astream is None:
+            with llm_priority(draft.priority):
+                response = await asyncio.to_thread(self.llm.invoke, draft.prompt)
+            yield response
+        else:
+            # Not held across a yield: the consumer's context would keep it.
+            with llm_priority(draft.priority):
+                tokens = astream(draft.prompt)
+            parts = []
+            async for token in tokens:
+                parts.append(token)
+                yield token
+            response = "".join(parts)
+        self._finish(draft.query, draft.chunks, response, start, draft.context)
+
+    def _draft(
+        self, query: str, context: str, chunks: List[RetrievedChunk], trace
+    ) -> RagDraft:
+        return RagDraft(
+            query=query,
+            chunks=chunks,
+            prompt=self._prompt(query, context, chunks, trace),
+            confidence=0.5 if self.llm is None else self._confidence(chunks),
+            context=context,
+        )
+
+    @staticmethod
+    def _key(draft: RagDraft):
+        return AnswerCache.key(draft.query, draft.chunks, draft.context)
+
+    def _prompt(
+        self, query: str, context: str, chunks: List[RetrievedChunk], trace
+    ) -> str:
+        prompt = self.prompt_builder.build(query, context, chunks)
+        trace.mark("prompt")
+        trace.observe("retrieved_chunks", len(chunks))
+        trace.observe("prompt_chars", len(prompt.text))
+        trace.observe("prompt_tokens", prompt.tokens)
+        return prompt.text
+
+    def _confidence(self, chunks: List[RetrievedChunk]) -> float:
         # If the LLM is available, allow answers without retrieval while
         # still boosting confidence when relevant context exists.
-        confidence = min(0.9, 0.6 + (0.1 * len(chunks)))
+        return min(0.9, 0.6 + (0.1 * len(chunks)))
+
+    def _cached_answer(
+        self, query: str, chunks: List[RetrievedChunk], context: str
+    ) -> Optional[Tuple[str, float]]:
+        if self.answer_cache is None:
+            return None
+        cached = self.answer_cache.get(query, chunks, context)
+        if cached is None:
+            return None
+        return cached.answer, cached.confidence
+
+    def _finish(
+        self,
+        query: str,
+        chunks: List[RetrievedChunk],
+        response: str,
+        start: float,
+        context: str,
+    ) -> Tuple[str, float]:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        confidence = self._confidence(chunks)
+        if self.answer_cache is not None:
+            self.answer_cache.put(
+                query, chunks, response, confidence, elapsed_ms, context=context
+            )
         return response, confidence
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import List, Sequence, Set
+
+from app.tokens import CHARS_PER_TOKEN, estimate_tokens
+from rag.index import RetrievedChunk
+
+# Identical for every request and always first, so Ollama can reuse the KV
+# cache for it. Variable parts follow from most to least stable: the
+# session's context, then the snippets, then the question.
+SYSTEM_PREFIX = (
+    "You are a customer support agent.\n"
+    "Answer from the knowledge snippets and the conversation context.\n"
+    "Respond with a helpful, concise answer.\n"
+)
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+@dataclass
+class BuiltPrompt:
+    text: str
+    tokens: int
+    snippets: int
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[: max_chars - 3].rsplit(" ", 1)[0] + "..."
+
+
+class PromptBuilder:
+    """Assemble prompts behind a constant prefix with deduplicated snippets.
+
+    Snippets are taken in rank order. A sentence already included from a
+    better-ranked chunk is skipped, which removes the overlap chunking leaves
+    between neighbouring chunks as well as outright duplicates. Each snippet
+    is capped at ``max_snippet_tokens`` and all snippets together at
+    ``snippet_token_budget``.
+    """
+
+    def __init__(
+        self,
+        snippet_token_budget: int = 1024,
+        max_snippet_tokens: int = 256,
+        prefix: str = SYSTEM_PREFIX,
+    ) -> None:
+        self.snippet_token_budget = snippet_token_budget
+        self.max_snippet_tokens = max_snippet_tokens
+        self.prefix = prefix
+        self.prefix_tokens = estimate_tokens(prefix)
+
+    def snippets(self, chunks: Sequence[RetrievedChunk]) -> List[str]:
+        seen: Set[str] = set()
+        budget = self.snippet_token_budget
+        snippets: List[str] = []
+        for chunk in chunks:
+            sentences = []
+            for sentence in SENTENCE_SPLIT.split(chunk.content):
+                key = " ".join(sentence.lower().split())
+                if key and key not in seen:
+                    seen.add(key)
+                    sentences.append(sentence.strip())
+            if not sentences:
+                continue
+            snippet = truncate_tokens(" ".join(sentences), min(self.max_snippet_tokens, budget))
+            if not snippet:
+                break
+            snippets.append(snippet)
+            budget -= estimate_tokens(snippet)
+        return snippets
+
+    def build(self, query: str, context: str, chunks: Sequence[RetrievedChunk]) -> BuiltPrompt:
+        snippets = self.snippets(chunks)
+        sources = "\n".join(f"- {snippet}" for snippet in snippets)
+        variable = (
+            f"Conversation context:\n{context}\n"
+            f"Knowledge snippets:\n{sources}\n"
+            f"User question: {query}\n"
+        )
+        return BuiltPrompt(
+            text=self.prefix + variable,
+            tokens=self.prefix_tokens + estimate_tokens(variable),
+            snippets=len(snippets),
+        )
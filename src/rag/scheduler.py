@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.config import SchedulerConfig
+from app.tokens import estimate_tokens
+
+# Lanes, in the order they are served.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+LANES = {PRIORITY_HIGH: "high", PRIORITY_NORMAL: "normal", PRIORITY_BACKGROUND: "background"}
+
+_PRIORITY: ContextVar = ContextVar("llm_priority", default=None)
+
+
+class SchedulerOverloaded(RuntimeError):
+    """Raised instead of queueing once the scheduler's queue is full."""
+
+
+class llm_priority:
+    """Send LLM calls made inside a ``with`` block to ``lane``.
+
+    ``None`` leaves the choice to the scheduler.
+    """
+
+    __slots__ = ("lane", "_token")
+
+    def __init__(self, lane: Optional[int]) -> None:
+        self.lane = lane
+
+    def __enter__(self) -> Optional[int]:
+        self._token = _PRIORITY.set(self.lane)
+        return self.lane
+
+    def __exit__(self, *exc_info) -> None:
+        _PRIORITY.reset(self._token)
+
+
+class LLMScheduler:
+    """Admission control in front of an LLM client.
+
+    Exposes ``invoke``, ``ainvoke`` and ``astream`` like the client it wraps,
+    so ``RagPipeline`` uses it unchanged. At most ``max_in_flight``
+    generations run at once; set it to the backend's parallelism
+    (``OLLAMA_NUM_PARALLEL``) so the backend batches full slots instead of
+    queueing internally. Further calls wait in a queue of ``max_queue``
+    entries. Calls beyond that raise ``SchedulerOverloaded`` straight away.
+
+    Waiting calls are served high lane first, then in arrival order. A call
+    goes to the high lane when an enclosing ``llm_priority`` says so, or when
+    its prompt is at most ``short_prompt_tokens`` long. ``SupportAgent`` puts
+    the answers of sessions with unresolved turns in the high lane. A stream
+    takes its lane when ``astream`` is called and holds its slot until the
+    last token.
+    """
+
+    def __init__(
+        self,
+        llm: object,
+        max_in_flight: int = 2,
+        max_queue: int = 64,
+        short_prompt_tokens: int = 512,
+    ) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        self.llm = llm
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.short_prompt_tokens = short_prompt_tokens
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.served = {lane: 0 for lane in LANES}
+        self._waiters: List[Tuple[int, int, Future]] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def lane(self, prompt: str) -> int:
+        lane = _PRIORITY.get()
+        if lane is not None:
+            return lane
+        if estimate_tokens(prompt) <= self.short_prompt_tokens:
+            return PRIORITY_HIGH
+        return PRIORITY_NORMAL
+
+    # -- slots -------------------------------------------------------------
+
+    def _enqueue(self, lane: int) -> Optional[Future]:
+        """Take a free slot and return ``None``, or return a waiter to block on."""
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                self.served[lane] += 1
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self.rejected += 1
+                raise SchedulerOverloaded(
+                    f"LLM queue is full ({self.max_queue} waiting, "
+                    f"{self.in_flight} in flight)."
+                )
+            waiter: Future = Future()
+            heapq.heappush(self._waiters, (lane, next(self._sequence), waiter))
+            return waiter
+
+    def _release(self) -> None:
+        # Hand the slot straight to the next live waiter, so in_flight never dips.
+        with self._lock:
+            while self._waiters:
+                lane, _, waiter = heapq.heappop(self._waiters)
+                if waiter.set_running_or_notify_cancel():
+                    self.admitted += 1
+                    self.served[lane] += 1
+                    waiter.set_result(None)
+                    return
+            self.in_flight -= 1
+
+    def _abandon(self, waiter: Future) -> None:
+        if not waiter.cancel():
+            # The slot was granted as the caller gave up; pass it on.
+            self._release()
+            return
+        with self._lock:
+            self._waiters = [entry for entry in self._waiters if entry[2] is not waiter]
+            heapq.heapify(self._waiters)
+
+    def _acquire(self, lane: int) -> None:
+        waiter = self._enqueue(lane)
+        if waiter is not None:
+            waiter.result()
+
+    async def _aacquire(self, lane: int) -> None:
+        waiter = self._enqueue(lane)
+        if waiter is None:
+            return
+        try:
+            await asyncio.wrap_future(waiter)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    # -- LLM interface -----------------------------------------------------
+
+    def invoke(self, prompt: str) -> str:
+        self._acquire(self.lane(prompt))
+        try:
+            return self.llm.invoke(prompt)
+        finally:
+            self._release()
+
+    async def ainvoke(self, prompt: str) -> str:
+        await self._aacquire(self.lane(prompt))
+        try:
+            ainvoke = getattr(self.llm, "ainvoke", None)
+            if ainvoke is not None:
+                return await ainvoke(prompt)
+            return await asyncio.to_thread(self.llm.invoke, prompt)
+        finally:
+            self._release()
+
+    def astream(self, prompt: str) -> AsyncIterator[str]:
+        # The lane is picked now, while the caller's llm_priority applies; the
+        # generator body only runs once the caller starts iterating.
+        return self._astream(prompt, self.lane(prompt))
+
+    async def _astream(self, prompt: str, lane: int) -> AsyncIterator[str]:
+        await self._aacquire(lane)
+        try:
+            astream = getattr(self.llm, "astream", None)
+            if astream is None:
+                yield await asyncio.to_thread(self.llm.invoke, prompt)
+                return
+            async for token in astream(prompt):
+                yield token
+        finally:
+            self._release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = {
+                "scheduler_in_flight": self.in_flight,
+                "scheduler_queued": len(self._waiters),
+                "scheduler_admitted": self.admitted,
+                "scheduler_rejected": self.rejected,
+            }
+            for lane, name in LANES.items():
+                stats[f"scheduler_{name}_served"] = self.served[lane]
+            return stats
+
+
+def create_scheduler(config: SchedulerConfig, llm: Optional[object]) -> Optional[LLMScheduler]:
+    if llm is None or config.max_in_flight == 0:
+        return None
+    return LLMScheduler(
+        llm,
+        max_in_flight=config.max_in_flight,
+        max_queue=config.max_queue,
+        short_prompt_tokens=config.short_prompt_tokens,
+    )
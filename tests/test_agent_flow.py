@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from dataclasses import dataclass
 
 from app.config import AppConfig, EscalationConfig, GuardrailConfig
@@ -7,15 +8,34 @@ from agent.agent import SupportAgent
 from agent.escalation import EscalationLogic
 from agent.guardrails import GuardrailEngine
 from agent.memory import ConversationMemory
+from agent.session import SessionState
+from rag.pipeline import RagDraft
 
 
 @dataclass
 class StubRag:
     answer: str
     confidence: float
+    prepared: int = 0
+    generated: int = 0
 
-    def generate_answer(self, query: str, context: str):
-        return self.answer, self.confidence
+    def prepare(self, query: str, context: str) -> RagDraft:
+        self.prepared += 1
+        return RagDraft(query, [], "prompt", self.confidence, context)
+
+    async def aprepare(self, query: str, context: str) -> RagDraft:
+        return self.prepare(query, context)
+
+    def generate(self, draft: RagDraft):
+        self.generated += 1
+        return self.answer, draft.confidence
+
+    async def agenerate(self, draft: RagDraft):
+        return self.generate(draft)
+
+    async def astream(self, draft: RagDraft):
+        self.generated += 1
+        yield self.answer
 
 
 def build_agent(confidence: float, allow_sensitive: bool = False) -> SupportAgent:
@@ -62,3 +82,65 @@ def test_user_requests_human_escalation():
     result = agent.handle_message("I want to talk to a human")
     assert result.escalated is True
     assert result.escalation_reason == "user_requested_human"
+
+
+def test_sessions_keep_separate_escalation_counters():
+    agent = build_agent(confidence=0.4, allow_sensitive=True)
+    first, second = SessionState(), SessionState()
+    agent.handle_message("How do I reset my password?", session=first)
+    agent.handle_message("How do I reset my password?", session=first)
+    assert first.unresolved_turns == 2
+    assert second.unresolved_turns == 0
+    assert len(first.memory.context().splitlines()) == 4
+    assert second.memory.context() == ""
+
+
+def test_pre_generation_escalations_skip_retrieval_and_llm():
+    agent = build_agent(confidence=0.9)
+    session = SessionState()
+    human = agent.handle_message("Please let me talk to a person", session=session)
+    refund = asyncio.run(agent.ahandle_message("I want a refund now.", session=session))
+    assert agent.rag.prepared == 0
+    assert (human.escalation_reason, refund.escalation_reason) == (
+        "user_requested_human",
+        "guardrail_triggered",
+    )
+    assert human.confidence == 0.0
+
+    async def stream():
+        return [item async for item in agent.astream_message("this is not helpful", session)]
+
+    *tokens, result = asyncio.run(stream())
+    assert result.escalation_reason == "user_frustrated"
+    assert tokens == [result.response]
+    assert session.unresolved_turns == 3
+    assert agent.rag.prepared == agent.rag.generated == 0
+
+
+def test_turn_limit_escalates_before_generation():
+    agent = build_agent(confidence=0.4, allow_sensitive=True)
+    session = SessionState()
+    for _ in range(3):
+        agent.handle_message("How do I reset my password?", session=session)
+    assert agent.rag.prepared == 3
+    result = agent.handle_message("How do I reset my password?", session=session)
+    assert result.escalation_reason == "too_many_turns"
+    assert agent.rag.prepared == 3
+
+
+def test_low_confidence_escalates_before_generation_on_every_path():
+    agent = build_agent(confidence=0.4, allow_sensitive=True)
+    question = "How do I reset my password?"
+
+    async def stream():
+        return [item async for item in agent.astream_message(question, SessionState())]
+
+    results = [
+        agent.handle_message(question, session=SessionState()),
+        asyncio.run(agent.ahandle_message(question, session=SessionState())),
+        asyncio.run(stream())[-1],
+    ]
+    assert [result.escalation_reason for result in results] == ["low_confidence"] * 3
+    assert all(result.confidence == 0.4 for result in results)
+    assert agent.rag.prepared == 3
+    assert agent.rag.generated == 0
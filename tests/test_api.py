@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import time
+
+import httpx
 from fastapi.testclient import TestClient
 
-from app.config import AppConfig, RAGConfig
+from app.config import AppConfig, RAGConfig, SchedulerConfig
 from app.server import create_app
 
 
@@ -19,6 +24,22 @@ def test_health_endpoint():
     assert response.json()["status"] == "ok"
 
 
+def test_ready_reports_warmup_while_health_stays_live():
+    llm = SlowStubLLM(delay_s=0.2)
+    app = create_app(AppConfig(rag=RAGConfig(vector_store="in_memory")), llm=llm)
+    with TestClient(app) as client:
+        assert client.get("/health").json()["status"] == "ok"
+        cold = client.get("/ready")
+        assert cold.status_code == 503
+        assert cold.json()["status"] == "warming_up"
+        deadline = time.monotonic() + 5
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        steps = client.get("/ready").json()["steps"]
+        assert steps["index"]["status"] == steps["llm"]["status"] == "ok"
+
+
 def test_ingest_path_success():
     client = build_client()
     response = client.post("/ingest-path", json={"path": "data/docs"})
@@ -38,3 +59,157 @@ def test_ingest_path_missing():
     response = client.post("/ingest-path", json={"path": "data/does_not_exist"})
     assert response.status_code == 200
     assert response.json()["error"] == "path_not_found"
+
+
+class SlowStubLLM:
+    def __init__(self, delay_s: float) -> None:
+        self.delay_s = delay_s
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def invoke(self, prompt: str) -> str:
+        raise AssertionError("the async path must not call the blocking client")
+
+    async def ainvoke(self, prompt: str) -> str:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay_s)
+        self.in_flight -= 1
+        return "Reset your password from Settings > Security."
+
+
+def test_chat_serves_concurrent_requests_without_blocking():
+    llm = SlowStubLLM(delay_s=0.2)
+    # Admission control is covered separately; here every request must run at once.
+    config = AppConfig(
+        rag=RAGConfig(vector_store="in_memory"), scheduler=SchedulerConfig(max_in_flight=0)
+    )
+    app = create_app(config, llm=llm)
+    requests = 300
+
+    async def run_load() -> list:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(
+                    client.post("/chat", json={"message": f"question number {i}"})
+                    for i in range(requests)
+                )
+            )
+
+    start = time.perf_counter()
+    responses = asyncio.run(run_load())
+    elapsed = time.perf_counter() - start
+
+    assert all(response.status_code == 200 for response in responses)
+    assert llm.peak_in_flight > requests // 2
+    # Serially this would take requests * delay_s = 60s.
+    assert elapsed < 10
+
+
+def test_chat_returns_503_when_the_llm_queue_is_full():
+    llm = SlowStubLLM(delay_s=0.2)
+    config = AppConfig(
+        rag=RAGConfig(vector_store="in_memory"),
+        scheduler=SchedulerConfig(max_in_flight=2, max_queue=2),
+    )
+    app = create_app(config, llm=llm)
+
+    async def run_load() -> list:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(
+                *(client.post("/chat", json={"message": f"question {i}"}) for i in range(10))
+            )
+
+    responses = asyncio.run(run_load())
+    codes = sorted(response.status_code for response in responses)
+    assert codes == [200] * 4 + [503] * 6
+    assert llm.peak_in_flight == 2
+    rejected = next(response for response in responses if response.status_code == 503)
+    assert rejected.json()["error"] == "overloaded"
+    assert rejected.headers["Retry-After"] == "1"
+
+
+class StreamingStubLLM:
+    def invoke(self, prompt: str) -> str:
+        return "Open Settings then Security."
+
+    async def astream(self, prompt: str):
+        for token in ["Open ", "Settings ", "then ", "Security."]:
+            yield token
+
+
+def parse_sse(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_chat_stream_sends_tokens_then_metadata():
+    config = AppConfig(rag=RAGConfig(vector_store="in_memory"))
+    client = TestClient(create_app(config, llm=StreamingStubLLM()))
+    client.post("/ingest", json={"documents": ["Reset your password in Settings > Security."]})
+    response = client.post("/chat/stream", json={"message": "How do I reset my password?"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    tokens = [data["token"] for name, data in events if name == "token"]
+    assert tokens == ["Open ", "Settings ", "then ", "Security."]
+    name, done = events[-1]
+    assert name == "done"
+    assert done["response"] == "Open Settings then Security."
+    assert done["escalated"] is False
+    assert done["session_id"]
+
+
+def test_chat_stream_escalates_without_generating():
+    config = AppConfig(rag=RAGConfig(vector_store="in_memory"))
+    client = TestClient(create_app(config, llm=StreamingStubLLM()))
+    response = client.post("/chat/stream", json={"message": "I want to talk to a human"})
+    events = parse_sse(response.text)
+    assert [name for name, _ in events] == ["token", "done"]
+    assert events[-1][1]["escalation_reason"] == "user_requested_human"
+
+
+def test_chat_sessions_share_one_agent():
+    client = build_client()
+    first = client.post("/chat", json={"message": "hello"}).json()
+    client.post("/chat", json={"message": "hello again", "session_id": first["session_id"]})
+    client.post("/chat", json={"message": "new conversation"})
+    sessions = client.get("/stats").json()["sessions"]
+    assert sessions["sessions"] == 2
+    assert sessions["approx_bytes_per_session"] > 0
+
+
+def test_metrics_endpoint_exports_prometheus_text():
+    client = build_client()
+    client.post("/chat", json={"message": "How do I reset my password?"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE csb_stage_latency_seconds histogram" in response.text
+    assert 'csb_stage_latency_seconds_count{stage="guardrails"} 1' in response.text
+
+
+def test_chat_batch_streams_ndjson_in_session_order():
+    config = AppConfig(rag=RAGConfig(vector_store="in_memory"))
+    client = TestClient(create_app(config, llm=StreamingStubLLM()))
+    body = "".join(
+        json.dumps({"session_id": f"s{i % 2}", "message": f"reset password {i}"}) + "\n"
+        for i in range(6)
+    )
+    response = client.post(
+        "/chat/batch?concurrency=4",
+        content=body + "{broken\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(record["index"] for record in records) == list(range(7))
+    assert next(r for r in records if r["index"] == 6)["error"] == "invalid_json"
+    assert all("response" in r for r in records if r["index"] < 6)
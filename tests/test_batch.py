@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import random
+
+from agent.batch import BatchRunner, read_batch_items
+from app.components import build_components, create_session_store
+from app.config import AppConfig, RAGConfig
+from app.main import chat_jsonl
+from rag.index import CachedEmbeddings, InMemoryVectorStore
+
+
+class RecordingLLM:
+    """Async stub with random latency that records peak concurrency."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def invoke(self, prompt: str) -> str:
+        raise AssertionError("the batch path must not call the blocking client")
+
+    async def ainvoke(self, prompt: str) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        await asyncio.sleep(random.uniform(0, 0.01))
+        self.in_flight -= 1
+        return "Open Settings > Security."
+
+
+class PrefetchSpyStore(InMemoryVectorStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.prefetched = []
+
+    def prefetch(self, queries):
+        self.prefetched.append(list(queries))
+
+
+def build(llm, store=None):
+    config = AppConfig(rag=RAGConfig(vector_store="in_memory", answer_cache_size=0))
+    store = store or InMemoryVectorStore()
+    store.add(["Reset your password from Settings > Security."])
+    return build_components(config, llm=llm, vector_store=store)
+
+
+def jsonl(rows) -> str:
+    return "".join(json.dumps(row) + "\n" for row in rows)
+
+
+def test_batch_keeps_session_order_and_runs_sessions_concurrently():
+    llm = RecordingLLM()
+    store = PrefetchSpyStore()
+    components = build(llm, store)
+    sessions = create_session_store(components.config)
+    rows = [
+        {"session_id": f"s{i % 5}", "message": f"How do I reset my password, step {i}?"}
+        for i in range(40)
+    ]
+    runner = BatchRunner(components.agent, sessions.get, concurrency=5, chunk_size=16)
+
+    async def run():
+        items = read_batch_items(jsonl(rows).splitlines())
+        return [record async for record in runner.run(items)]
+
+    records = asyncio.run(run())
+
+    assert sorted(record["index"] for record in records) == list(range(40))
+    assert llm.calls == 40
+    assert 1 < llm.peak_in_flight <= 5
+    for s in range(5):
+        context = sessions.get(f"s{s}").memory.context().splitlines()
+        steps = [
+            int(line.rsplit(" ", 1)[-1].rstrip("?"))
+            for line in context
+            if line.startswith("User:")
+        ]
+        assert steps == sorted(steps)
+    # One prefetch per chunk: 16 + 16 + 8 messages.
+    assert [len(queries) for queries in store.prefetched] == [16, 16, 8]
+
+
+def test_batch_reports_bad_lines_and_escalates_without_the_llm():
+    llm = RecordingLLM()
+    components = build(llm)
+    source = io.StringIO(
+        "not json\n"
+        + jsonl(
+            [
+                {"session_id": "a", "message": "I want a refund now."},
+                {"session_id": "a", "message": "Let me talk to a person"},
+                {"session_id": "b"},
+                {"message": "How do I reset my password?"},
+            ]
+        )
+    )
+    sink = io.StringIO()
+
+    assert chat_jsonl(components, source, sink) == 5
+    records = {r["index"]: r for r in map(json.loads, sink.getvalue().splitlines())}
+    assert records[0]["error"] == "invalid_json"
+    assert records[1]["escalation_reason"] == "guardrail_triggered"
+    assert records[2]["escalation_reason"] == "user_requested_human"
+    assert records[3] == {"index": 3, "session_id": "b", "error": "missing_message"}
+    assert records[4]["response"] == "Open Settings > Security."
+    assert records[4]["session_id"]
+    assert llm.calls == 1
+
+
+class CountingEmbeddings:
+    def __init__(self) -> None:
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_cached_embeddings_batch_query_prefetch():
+    client = CountingEmbeddings()
+    embeddings = CachedEmbeddings(client, namespace="m", batch_queries=True)
+    embeddings.embed_queries(["a", "bb", "a", "ccc"])
+    assert client.batches == [["a", "bb", "ccc"]]
+    assert embeddings.embed_query("bb") == [2.0]
+    assert len(client.batches) == 1
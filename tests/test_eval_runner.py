@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from eval.report import LatencyHistogram
+from eval.runner import EvalRunner, load_cases, report_outcomes
+from eval.synthetic import SyntheticCase
+
+
+def write_cases(path, count: int) -> None:
+    with path.open("w", encoding="utf-8") as handle:
+        for i in range(count):
+            query = f"refund request {i}" if i % 2 else f"password question {i}"
+            handle.write(json.dumps({"id": f"c{i}", "query": query, "expected_escalation": bool(i % 2)}) + "\n")
+
+
+def predict(query: str) -> bool:
+    return "refund" in query
+
+
+def test_runner_resumes_from_checkpoint(tmp_path):
+    cases_path = tmp_path / "cases.jsonl"
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    write_cases(cases_path, 20)
+
+    calls = []
+
+    def interrupted(query: str) -> bool:
+        if len(calls) >= 8:
+            raise KeyboardInterrupt
+        calls.append(query)
+        return predict(query)
+
+    runner = EvalRunner(concurrency=1, checkpoint_path=str(checkpoint))
+    try:
+        runner.run(load_cases(str(cases_path)), interrupted)
+    except KeyboardInterrupt:
+        pass
+    finished = len(checkpoint.read_text().splitlines())
+    assert 0 < finished < 20
+
+    resumed = []
+
+    def counting(query: str) -> bool:
+        resumed.append(query)
+        return predict(query)
+
+    outcomes = runner.run(load_cases(str(cases_path)), counting)
+    assert len(outcomes) == 20
+    assert len(resumed) == 20 - finished
+    report = report_outcomes(outcomes)
+    assert report.accuracy == 1.0
+    assert report.autonomy_rate == 0.5
+
+
+def test_runner_records_predictor_errors_and_supports_async(tmp_path):
+    cases_path = tmp_path / "cases.jsonl"
+    write_cases(cases_path, 10)
+
+    async def apredict(query: str) -> bool:
+        await asyncio.sleep(0)
+        if query.endswith(" 3"):
+            raise RuntimeError("llm timeout")
+        return predict(query)
+
+    outcomes = asyncio.run(EvalRunner(concurrency=4).arun(load_cases(str(cases_path)), apredict))
+    assert len(outcomes) == 10
+    failed = [outcome for outcome in outcomes if outcome.error]
+    assert [outcome.case_id for outcome in failed] == ["c3"]
+    assert not failed[0].correct
+
+
+def test_resume_retries_cases_that_errored(tmp_path):
+    cases_path = tmp_path / "cases.jsonl"
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+    write_cases(cases_path, 6)
+
+    def flaky(query: str) -> bool:
+        if query.endswith(" 3"):
+            raise RuntimeError("llm timeout")
+        return predict(query)
+
+    EvalRunner(concurrency=2, checkpoint_path=checkpoint).run(load_cases(str(cases_path)), flaky)
+
+    retried = []
+
+    def recovered(query: str) -> bool:
+        retried.append(query)
+        return predict(query)
+
+    runner = EvalRunner(concurrency=2, checkpoint_path=checkpoint)
+    outcomes = runner.run(load_cases(str(cases_path)), recovered)
+    assert retried == ["refund request 3"]
+    assert len(outcomes) == 6
+    assert all(outcome.error is None and outcome.correct for outcome in outcomes)
+
+
+def test_histogram_percentiles_stay_within_precision():
+    histogram = LatencyHistogram(precision=0.01)
+    for value in range(1, 10001):
+        histogram.record(value / 10)
+    assert histogram.count == 10000
+    assert histogram.max == 1000.0
+    for q, exact in ((50, 500.0), (90, 900.0), (99, 990.0)):
+        assert abs(histogram.percentile(q) - exact) <= exact * 0.01
+    assert histogram.percentile(100) == 1000.0
+    assert len(histogram._buckets) < 1200
+
+
+def test_report_breaks_latency_down_by_stage_and_budget():
+    class Prediction:
+        def __init__(self, escalated: bool) -> None:
+            self.escalated = escalated
+            self.stage_ms = {"guardrails": 0.2, "retrieval": 3.0, "llm": 40.0}
+
+    outcomes = EvalRunner(concurrency=2).run(
+        [(str(i), SyntheticCase(query=f"q{i}", expected_escalation=False)) for i in range(10)],
+        lambda query: Prediction(False),
+    )
+    report = report_outcomes(outcomes, latency_budget_ms=0.0)
+    assert report.over_budget_rate == 1.0
+    assert set(report.stage_latency_ms) == {"guardrails", "retrieval", "llm"}
+    assert abs(report.stage_latency_ms["llm"]["p99"] - 40.0) <= 0.4
+    assert report.p50_latency_ms <= report.p99_latency_ms <= report.max_latency_ms
+
+    assert report_outcomes(outcomes, latency_budget_ms=60_000).over_budget_rate == 0.0
+
+
+def test_report_includes_answer_cache_stats():
+    outcomes = EvalRunner(concurrency=1).run(
+        [("1", SyntheticCase(query="q", expected_escalation=False))], lambda query: False
+    )
+    report = report_outcomes(
+        outcomes,
+        cache_stats={"answer_cache_hit_rate": 0.25, "answer_cache_latency_saved_ms": 900.0},
+    )
+    assert report.cache_hit_rate == 0.25
+    assert report.cache_latency_saved_ms == 900.0
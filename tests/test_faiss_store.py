@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+import zlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+from rag.faiss_store import FaissVectorStore  # noqa: E402
+
+
+class BagOfWordsEmbeddings:
+    """Deterministic embeddings: one hashed dimension per lowercase word."""
+
+    dim = 64
+
+    def _vector(self, text: str):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector[zlib.crc32(word.strip("?.>").encode()) % self.dim] += 1.0
+        return vector
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+DOCS = [
+    "reset your password in settings",
+    "download invoices from billing",
+    "track shipping for your order",
+]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_faiss_store_searches_persists_and_deletes(tmp_path, index_type):
+    embeddings = BagOfWordsEmbeddings()
+    store = FaissVectorStore(str(tmp_path), embeddings, index_type=index_type, nlist=4)
+    store.add(DOCS)
+    store.add(DOCS[:1])
+    assert store.stats()["faiss_vectors"] == 3
+
+    best = store.search("how do I reset my password", top_k=1)[0]
+    assert best.content == DOCS[0]
+    assert 0.0 < best.score <= 1.0
+
+    reopened = FaissVectorStore(str(tmp_path), embeddings, index_type=index_type, nlist=4)
+    assert [chunk.content for chunk in reopened.search("invoices billing", top_k=1)] == [DOCS[1]]
+    assert dict(reopened.documents()).keys() == dict(store.documents()).keys()
+
+    reopened.delete([best.chunk_id])
+    assert all(chunk.content != DOCS[0] for chunk in reopened.search("reset password", top_k=3))
+    assert reopened.existing_ids([best.chunk_id]) == set()
+    reopened.add([DOCS[0]])
+    assert reopened.search("reset password", top_k=1)[0].content == DOCS[0]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf", "hnsw"])
+def test_faiss_store_reports_whether_the_index_is_mapped(tmp_path, index_type):
+    import faiss
+
+    embeddings = BagOfWordsEmbeddings()
+    docs = [f"{doc} {i}" for i in range(200) for doc in DOCS]
+    FaissVectorStore(str(tmp_path), embeddings, index_type=index_type, nlist=4).add(docs)
+
+    reopened = FaissVectorStore(str(tmp_path), embeddings, index_type=index_type, nlist=4)
+    expected = index_type == "ivf" or hasattr(faiss, "IO_FLAG_MMAP_IFC")
+    assert reopened.stats()["faiss_mmapped"] == int(expected)
+    if expected and index_type != "ivf":
+        storage = faiss.downcast_index(getattr(reopened._index, "storage", reopened._index))
+        assert not storage.codes.is_owned
+    # Writing to a mapped index takes a private copy first.
+    reopened.add(["cancel your subscription"])
+    assert reopened.stats()["faiss_mmapped"] == 0
+    assert reopened.search("cancel subscription", top_k=1)[0].content == "cancel your subscription"
+
+
+def test_faiss_store_searches_while_writes_compact_rows(tmp_path):
+    store = FaissVectorStore(str(tmp_path), BagOfWordsEmbeddings())
+    store.add([f"{doc} {i}" for i in range(50) for doc in DOCS])
+    errors = []
+    stop = threading.Event()
+
+    def search() -> None:
+        try:
+            while not stop.is_set():
+                store.search("reset password", top_k=5)
+        except Exception as exc:  # noqa: BLE001 - reported by the assert below
+            errors.append(exc)
+
+    readers = [threading.Thread(target=search) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for round_ in range(20):
+        # Deleting over a quarter of the rows forces a compaction.
+        ids = [doc_id for doc_id, _ in store.documents()]
+        store.delete(ids[: len(ids) // 2])
+        store.add([f"{doc} round {round_} {i}" for i in range(40) for doc in DOCS])
+    stop.set()
+    for reader in readers:
+        reader.join()
+    assert errors == []
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from rag.index import InMemoryVectorStore
+from rag.ingest import IngestionPipeline, chunk_text
+from rag.manifest import IngestManifest
+
+
+def test_chunk_text_overlaps_and_respects_size():
+    text = " ".join(f"word{i}" for i in range(400))
+    chunks = chunk_text(text, chunk_size=200, overlap=50)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunks[0][-20:].split()[-1] in chunks[1]
+    assert chunk_text("short doc", chunk_size=200, overlap=50) == ["short doc"]
+    assert chunk_text("   ", chunk_size=200, overlap=50) == []
+
+
+def test_pipeline_dedups_within_and_across_runs():
+    store = InMemoryVectorStore()
+    pipeline = IngestionPipeline(store, chunk_size=100, chunk_overlap=20, batch_size=2)
+    docs = [f"Article {i}: how to update billing details for plan {i}." for i in range(5)]
+
+    first = pipeline.ingest_texts(docs + docs[:2])
+    assert first.documents == 7
+    assert first.chunks == 5
+    assert first.duplicates == 2
+    assert first.batches == 3
+
+    second = pipeline.ingest_texts(docs)
+    assert second.chunks == 0
+    assert second.duplicates == 5
+    assert len(store._documents) == 5
+
+
+def test_pipeline_reports_throughput():
+    pipeline = IngestionPipeline(InMemoryVectorStore(), chunk_size=50, chunk_overlap=10)
+    report = pipeline.ingest_texts(["alpha beta gamma delta " * 20])
+    summary = report.as_dict()
+    assert summary["chunks"] > 1
+    assert summary["chunks_per_s"] > 0
+
+
+def test_sync_directory_only_touches_changed_files(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(4):
+        (docs / f"article{i}.md").write_text(f"Article {i} explains billing cycle {i}.")
+    store = InMemoryVectorStore()
+    pipeline = IngestionPipeline(store, chunk_size=200, chunk_overlap=20)
+    manifest = IngestManifest(tmp_path / "manifest.json")
+
+    first = pipeline.sync_directory(docs, manifest)
+    assert len(first.added) == 4
+    assert first.ingest.chunks == 4
+
+    (docs / "article1.md").write_text("Article 1 now covers refunds instead.")
+    (docs / "article2.md").unlink()
+    (docs / "article5.md").write_text("Article 5 covers shipping.")
+    second = pipeline.sync_directory(docs, IngestManifest(tmp_path / "manifest.json"))
+    assert [Path(p).name for p in second.added] == ["article5.md"]
+    assert [Path(p).name for p in second.changed] == ["article1.md"]
+    assert [Path(p).name for p in second.removed] == ["article2.md"]
+    assert len(second.unchanged) == 2
+    assert second.ingest.chunks == 2
+    assert second.deleted_chunks == 2
+    remaining = [chunk.content for chunk in store.search("billing cycle", top_k=10)]
+    assert "Article 2 explains billing cycle 2." not in remaining
+    assert store.search("refunds", top_k=1)[0].content.startswith("Article 1 now")
+
+
+def test_sync_directory_keeps_chunks_shared_with_other_files(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("Shared policy text.")
+    (docs / "b.md").write_text("Shared policy text.")
+    store = InMemoryVectorStore()
+    pipeline = IngestionPipeline(store)
+    manifest = IngestManifest()
+    pipeline.sync_directory(docs, manifest)
+    (docs / "a.md").unlink()
+    report = pipeline.sync_directory(docs, manifest)
+    assert report.deleted_chunks == 0
+    assert store.search("shared policy", top_k=1)
+
+
+class FailingStore(InMemoryVectorStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.fail = True
+
+    def add(self, documents, ids=None):
+        if self.fail:
+            raise RuntimeError("embedding service unavailable")
+        super().add(documents, ids)
+
+
+def test_sync_directory_retries_files_after_a_failed_ingest(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.md").write_text("Refunds take five days.")
+    store = FailingStore()
+    pipeline = IngestionPipeline(store)
+    manifest = IngestManifest(tmp_path / "manifest.json")
+
+    with pytest.raises(RuntimeError):
+        pipeline.sync_directory(docs, manifest)
+    assert manifest.entries == {}
+
+    store.fail = False
+    report = pipeline.sync_directory(docs, manifest)
+    assert [Path(p).name for p in report.added] == ["a.md"]
+    assert store.search("refunds", top_k=1)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import io
+import json
+
+from agent.escalation import EscalationLogic
+from agent.guardrails import GuardrailEngine
+from agent.matcher import CompiledMatcher, KeywordAutomaton, create_matcher
+from app.config import AppConfig, EscalationConfig, GuardrailConfig
+from app.main import screen_jsonl
+
+
+def test_automaton_finds_overlapping_and_suffix_terms():
+    automaton = KeywordAutomaton({"a": ["he", "hers"], "b": ["she"], "c": ["his"]})
+    assert automaton.find("ushers") == {"a", "b"}
+    assert automaton.find("this") == {"c"}
+    assert automaton.find("nothing here") == {"a"}
+    assert automaton.find("xyz") == set()
+
+
+def test_matcher_redacts_all_pii_in_one_pass():
+    matcher = create_matcher()
+    text = "Mail jane.doe@example.com or call 555-123-4567 about my refund"
+    scan = matcher.scan(text)
+    assert scan.pii == ("pii0", "pii1")
+    assert scan.redact(text) == "Mail [REDACTED] or call [REDACTED] about my refund"
+    assert "restricted" in scan.labels
+
+
+def test_guardrails_and_escalation_match_previous_behaviour():
+    guardrails = GuardrailEngine(GuardrailConfig())
+    result = guardrails.evaluate("Email me at a@b.co or 555 123 4567, I want a REFUND")
+    assert result.reasons == ["pii_detected", "pii_detected", "restricted_action"]
+    assert result.redacted_input == "Email me at [REDACTED] or [REDACTED], I want a REFUND"
+
+    escalation = EscalationLogic(EscalationConfig())
+    decision = escalation.evaluate(0.9, [], 0, "This is NOT HELPFUL")
+    assert decision.reason == "user_frustrated"
+    decision = escalation.evaluate(0.9, [], 0, "can a representative call me")
+    assert decision.reason == "user_requested_human"
+
+
+def test_custom_term_files_extend_builtin_lists(tmp_path):
+    terms = tmp_path / "restricted.txt"
+    terms.write_text("# compliance list\nwire transfer\n" + "\n".join(f"term{i}" for i in range(5000)))
+    config = GuardrailConfig(restricted_terms_file=str(terms))
+    engine = GuardrailEngine(config, matcher=create_matcher(guardrails=config))
+    assert engine.evaluate("please do a Wire Transfer").reasons == ["restricted_action"]
+    assert engine.evaluate("I need term4999 now").reasons == ["restricted_action"]
+    assert engine.evaluate("I want a refund").reasons == ["restricted_action"]
+    assert engine.evaluate("hello there").safe
+
+
+def test_matcher_without_patterns_only_reports_labels():
+    matcher = CompiledMatcher({"greeting": ["hello"]})
+    scan = matcher.scan("Hello world")
+    assert scan.labels == {"greeting"}
+    assert scan.redact("Hello world") == "Hello world"
+
+
+def test_evaluate_batch_matches_single_evaluation():
+    engine = GuardrailEngine(GuardrailConfig())
+    messages = [
+        "How do I reset my password?",
+        "Call me at 555-123-4567 about a refund",
+        "a@b.co",
+    ] * 5
+    batches = list(engine.evaluate_batch(messages, chunk_size=4))
+    assert [batch.start for batch in batches] == [0, 4, 8, 12]
+    rows = [row for batch in batches for row in batch.rows()]
+    assert [row["index"] for row in rows] == list(range(15))
+    for message, row in zip(messages, rows):
+        single = engine.evaluate(message)
+        assert row["safe"] == single.safe
+        assert row["reasons"] == single.reasons
+        assert row["redacted"] == single.redacted_input
+
+
+def test_evaluate_batch_in_process_pool():
+    engine = GuardrailEngine(GuardrailConfig())
+    messages = (f"message {i} about a refund" if i % 3 == 0 else f"hi {i}" for i in range(50))
+    batches = list(engine.evaluate_batch(messages, chunk_size=8, workers=2))
+    restricted = [
+        i for batch in batches for i, flag in enumerate(batch.restricted, batch.start) if flag
+    ]
+    assert restricted == list(range(0, 50, 3))
+
+
+def test_screen_jsonl_streams_results():
+    source = io.StringIO(
+        '{"message": "hello"}\n\n{"message": "refund me at a@b.co"}\n{"other": 1}\n'
+    )
+    sink = io.StringIO()
+    assert screen_jsonl(AppConfig(), source, sink, chunk_size=2) == 3
+    rows = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert [row["safe"] for row in rows] == [True, False, True]
+    assert rows[1]["reasons"] == ["pii_detected", "restricted_action"]
+    assert rows[1]["redacted"] == "refund me at [REDACTED]"
+
+
+def test_screen_jsonl_reports_malformed_lines_and_continues():
+    source = io.StringIO('{"message": "hi"}\nnot json\n[1, 2]\n{"message": "refund me"}\n')
+    sink = io.StringIO()
+    assert screen_jsonl(AppConfig(), source, sink, chunk_size=2) == 4
+    rows = [json.loads(line) for line in sink.getvalue().splitlines()]
+    assert rows[1] == {"index": 1, "error": "invalid_json"}
+    assert rows[2] == {"index": 2, "error": "invalid_json"}
+    assert rows[3]["index"] == 3 and rows[3]["reasons"] == ["restricted_action"]
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from agent.memory import ConversationMemory
+from agent.memory_backend import SqliteMemoryBackend
+from agent.summarizer import BackgroundSummarizer, llm_summary
+
+
+def build_backend(path, **kwargs) -> SqliteMemoryBackend:
+    kwargs.setdefault("flush_interval_s", 0)
+    return SqliteMemoryBackend(str(path / "sessions.db"), **kwargs)
+
+
+def test_sqlite_backend_survives_restart(tmp_path):
+    backend = build_backend(tmp_path)
+    memory = ConversationMemory(max_turns=2, session_id="s1", backend=backend)
+    memory.add_turn("hi", "hello")
+    memory.add_turn("reset password?", "Use Settings.")
+    memory.add_turn("thanks", "You're welcome.")
+    memory.update_summary("Password help.")
+    backend.close()
+
+    restarted = build_backend(tmp_path)
+    memory = ConversationMemory(max_turns=2, session_id="s1", backend=restarted)
+    context = memory.context()
+    assert context.startswith("Summary: Password help.")
+    assert "User: hi" not in context
+    assert "User: thanks" in context
+    restarted.close()
+
+
+def test_sqlite_backend_batches_writes_and_serves_hot_sessions(tmp_path):
+    backend = build_backend(tmp_path, batch_size=3)
+    memory = ConversationMemory(session_id="s1", backend=backend)
+    memory.context()
+    memory.add_turn("one", "1")
+    memory.add_turn("two", "2")
+    assert backend._pending_turns
+    assert "User: two" in memory.context()
+    memory.add_turn("three", "3")
+    assert not backend._pending_turns
+    assert backend.cache_misses == 1
+    assert backend.cache_hits == 1
+    backend.close()
+
+
+def test_sqlite_backend_shares_sessions_between_workers(tmp_path):
+    worker_a = build_backend(tmp_path)
+    worker_b = build_backend(tmp_path, batch_size=1)
+    on_a = ConversationMemory(session_id="s1", backend=worker_a)
+    on_b = ConversationMemory(session_id="s1", backend=worker_b)
+    other_on_a = ConversationMemory(session_id="s2", backend=worker_a)
+    assert on_a.context() == ""
+    assert other_on_a.context() == ""
+
+    on_b.add_turn("where are invoices?", "Account > Billing.")
+    # Seen at once, without waiting out a TTL.
+    assert "where are invoices?" in on_a.context()
+    # A commit to another session only costs s2 an index lookup, not a re-read.
+    assert other_on_a.context() == ""
+    assert worker_a.cache_misses == 3
+    assert worker_a.cache_hits == 1
+    worker_a.close()
+    worker_b.close()
+
+
+def test_sqlite_backend_serves_paced_turns_from_cache_and_prunes(tmp_path):
+    now = [0.0]
+    backend = build_backend(tmp_path, clock=lambda: now[0])
+    memory = ConversationMemory(max_turns=2, session_id="s1", backend=backend)
+    other = ConversationMemory(session_id="s2", backend=backend)
+    other.context()
+    other.add_turn("queued", "for s2")
+    for i in range(5):
+        now[0] += 30.0  # a user reading and typing between turns
+        memory.context()
+        memory.add_turn(f"question {i}", f"answer {i}")
+    assert backend.cache_misses == 2
+
+    now[0] += 301.0
+    assert "User: question 4" in memory.context()
+    assert backend.cache_misses == 3
+    # Re-reading s1 committed only s1's queued turns, keeping the newest two.
+    assert backend._pending_turns == [("s2", "queued", "for s2")]
+    rows = backend._conn.execute(
+        "SELECT user FROM turns WHERE session_id = 's1' ORDER BY id"
+    ).fetchall()
+    assert rows == [("question 3",), ("question 4",)]
+    backend.close()
+
+
+def test_sqlite_backend_keeps_disk_work_off_the_event_loop(tmp_path):
+    backend = build_backend(tmp_path, batch_size=1, flush_interval_s=60)
+    memory = ConversationMemory(session_id="s1", backend=backend)
+
+    async def run():
+        # A commit in progress: the loop must keep running while it lasts.
+        with backend._db_lock:
+            context = asyncio.ensure_future(memory.acontext())
+            await asyncio.sleep(0.05)
+            assert not context.done()
+            memory.add_turn("one", "1")
+        await context
+
+    asyncio.run(run())
+    # The full batch was handed to the flusher thread instead.
+    deadline = time.monotonic() + 5
+    while backend._pending_turns:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    assert "User: one" in memory.context()
+    backend.close()
+
+
+def test_context_is_cached_and_kept_within_token_budget():
+    memory = ConversationMemory(max_turns=50, max_tokens=60)
+    for i in range(10):
+        memory.add_turn(f"question {i} about invoices", f"answer {i} about billing")
+    context = memory.context()
+    assert memory.context() is context
+    assert len(context) // 4 <= 60
+    assert "question 9" in context
+    assert "question 0" not in context
+
+    memory.add_turn("one more", "sure")
+    assert memory.context() is not context
+    assert memory.context().endswith("User: one more\nAssistant: sure")
+
+
+def test_backend_session_trimmed_by_tokens_is_not_rebuilt_on_every_read(tmp_path):
+    backend = build_backend(tmp_path)
+    memory = ConversationMemory(max_turns=50, max_tokens=60, session_id="s1", backend=backend)
+    memory.context()
+    for i in range(10):
+        memory.add_turn(f"question {i} about invoices", f"answer {i} about billing")
+    context = memory.context()
+    assert memory.context() is context
+    assert "question 0" not in context
+
+    # A turn added by another worker is still picked up.
+    ConversationMemory(max_turns=50, session_id="s1", backend=backend).add_turn("more", "ok")
+    assert memory.context().endswith("User: more\nAssistant: ok")
+    backend.close()
+
+
+def test_evicted_turns_are_summarized_in_the_background():
+    summarizer = BackgroundSummarizer()
+    memory = ConversationMemory(max_turns=2, summary_trigger=2, summarizer=summarizer)
+    memory.add_turn("My order 1234 never arrived. It was due Monday.", "Sorry. I will check.")
+    memory.add_turn("Any update?", "It is in transit.")
+    memory.add_turn("Can you expedite it?", "Done.")
+    assert memory.summary == ""
+    memory.add_turn("Thanks", "You're welcome.")
+    summarizer.close()
+
+    assert summarizer.completed == 1
+    assert "order 1234 never arrived" in memory.summary
+    assert "Any update?" in memory.summary
+    context = memory.context()
+    assert context.startswith("Summary: ")
+    assert "User: Can you expedite it?" in context
+
+
+def test_llm_summary_falls_back_when_the_llm_fails():
+    class FailingLLM:
+        def invoke(self, prompt: str) -> str:
+            raise RuntimeError("ollama down")
+
+    summarize = llm_summary(FailingLLM(), max_tokens=50)
+    summary = summarize("", [("Where is my invoice? I need it today.", "Under Billing.")])
+    assert summary == "User: Where is my invoice? Agent: Under Billing."
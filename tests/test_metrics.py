@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from app.config import AppConfig, RAGConfig
+from app.components import build_components
+from app.metrics import NULL_TRACE, MetricsRegistry
+from rag.index import InMemoryVectorStore
+
+
+class StubLLM:
+    def invoke(self, prompt: str) -> str:
+        return "Open Settings > Security."
+
+
+def build(sample_rate: float):
+    config = AppConfig(rag=RAGConfig(vector_store="in_memory", answer_cache_size=0))
+    config.metrics.sample_rate = sample_rate
+    store = InMemoryVectorStore()
+    store.add(["Reset your password from Settings > Security."])
+    return build_components(config, llm=StubLLM(), vector_store=store)
+
+
+def test_sampled_messages_are_timed_per_stage():
+    components = build(sample_rate=1.0)
+    result = components.agent.handle_message("How do I reset my password?")
+    assert list(result.stage_ms) == [
+        "guardrails",
+        "escalation",
+        "memory_context",
+        "retrieval",
+        "prompt",
+        "llm",
+        "memory_update",
+    ]
+    early = components.agent.handle_message("Let me talk to a person")
+    assert list(early.stage_ms) == ["guardrails", "escalation", "memory_update"]
+
+    text = components.metrics.render()
+    assert "csb_requests_total 2" in text
+    assert 'csb_stage_latency_seconds_count{stage="llm"} 1' in text
+    assert 'csb_retrieved_chunks_bucket{le="1"} 1' in text
+    assert "csb_prompt_chars_count 1" in text
+
+
+def test_unsampled_messages_are_only_counted():
+    components = build(sample_rate=0.0)
+    assert components.metrics.start_trace() is NULL_TRACE
+    result = components.agent.handle_message("How do I reset my password?")
+    assert result.stage_ms == {}
+
+    text = components.metrics.render()
+    assert "csb_requests_total 2" in text
+    assert "csb_stage_latency_seconds_count" not in text
+    assert "csb_request_latency_seconds_count 0" in text
+
+
+def test_sample_rate_traces_a_fraction_of_requests():
+    metrics = MetricsRegistry(sample_rate=0.25)
+    sampled = sum(metrics.start_trace() is not NULL_TRACE for _ in range(4000))
+    assert 700 < sampled < 1300
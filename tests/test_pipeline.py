@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+from app.config import RAGConfig
+from rag.cache import AnswerCache
+from rag.index import InMemoryVectorStore, RetrievedChunk
+from rag.pipeline import RagPipeline
+from rag.prompt import SYSTEM_PREFIX, PromptBuilder
+
+
+class StubLLM:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def invoke(self, prompt: str) -> str:
+        self.calls += 1
+        return f"answer {self.calls}"
+
+
+class GatedLLM(StubLLM):
+    """Blocks every call until ``release`` is set."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.release = threading.Event()
+
+    def invoke(self, prompt: str) -> str:
+        self.release.wait(timeout=5)
+        return super().invoke(prompt)
+
+    async def ainvoke(self, prompt: str) -> str:
+        while not self.release.is_set():
+            await asyncio.sleep(0.005)
+        return super().invoke(prompt)
+
+
+def build_pipeline(llm=None, **overrides) -> tuple[RagPipeline, StubLLM]:
+    store = InMemoryVectorStore()
+    store.add(["Reset your password from Settings > Security."])
+    llm = llm or StubLLM()
+    pipeline = RagPipeline(config=RAGConfig(**overrides), vector_store=store, llm=llm)
+    return pipeline, llm
+
+
+def test_answer_cache_serves_exact_and_near_duplicates():
+    pipeline, llm = build_pipeline(answer_cache_similarity=0.75)
+    first, _ = pipeline.generate_answer("How do I reset my password?", context="")
+    again, _ = pipeline.generate_answer("how do i reset my PASSWORD", context="")
+    near, _ = pipeline.generate_answer("how do i reset my password please", context="")
+    assert llm.calls == 1
+    assert first == again == near
+    assert pipeline.answer_cache.stats()["answer_cache_near_hits"] == 1
+
+
+def test_answer_cache_misses_when_retrieved_set_changes():
+    pipeline, llm = build_pipeline()
+    pipeline.generate_answer("How do I reset my password?", context="")
+    pipeline.vector_store.add(["To reset my password I open the email link."])
+    pipeline.generate_answer("How do I reset my password?", context="")
+    assert llm.calls == 2
+
+
+def test_answer_cache_is_not_shared_across_conversation_contexts():
+    pipeline, llm = build_pipeline()
+    alice = "User: my order is 1234 for alice@example.com\nAssistant: noted"
+    pipeline.generate_answer("How do I reset my password?", context=alice)
+    other, _ = pipeline.generate_answer("How do I reset my password?", context="")
+    assert llm.calls == 2
+    again, _ = pipeline.generate_answer("How do I reset my password?", context="")
+    assert llm.calls == 2
+    assert again == other
+
+
+def test_answer_cache_ttl_and_capacity():
+    now = [0.0]
+    cache = AnswerCache(max_entries=2, ttl_s=10.0, clock=lambda: now[0])
+    chunks = [RetrievedChunk(content="doc", score=1.0)]
+    cache.put("a", chunks, "A", 0.9, latency_ms=100.0)
+    cache.put("b", chunks, "B", 0.9, latency_ms=100.0)
+    cache.put("c", chunks, "C", 0.9, latency_ms=100.0)
+    assert cache.get("a", chunks) is None
+    assert cache.get("c", chunks).answer == "C"
+    now[0] = 11.0
+    assert cache.get("c", chunks) is None
+    assert cache.stats()["answer_cache_latency_saved_ms"] == 100.0
+
+
+def test_prompt_keeps_static_prefix_and_dedups_overlapping_snippets():
+    chunks = [
+        RetrievedChunk(content="Open Settings. Choose Security. Click Reset password.", score=0.9),
+        # Overlaps the first chunk the way neighbouring chunks do after chunking.
+        RetrievedChunk(content="Click Reset password. Check your inbox for the link.", score=0.8),
+        RetrievedChunk(content="Open Settings. Choose Security.", score=0.7),
+    ]
+    builder = PromptBuilder()
+    first = builder.build("How do I reset my password?", "", chunks)
+    second = builder.build("Where are invoices?", "User: hi\nAssistant: hello", chunks[:1])
+
+    assert first.text.startswith(SYSTEM_PREFIX)
+    assert second.text.startswith(SYSTEM_PREFIX)
+    assert first.text.count("Click Reset password.") == 1
+    assert "- Check your inbox for the link." in first.text
+    assert first.snippets == 2
+    assert first.tokens == (len(first.text) + 3) // 4
+
+
+def test_prompt_snippets_fit_the_token_budget():
+    long_chunk = " ".join(f"Step {i} of the billing guide." for i in range(200))
+    chunks = [
+        RetrievedChunk(content=long_chunk, score=0.9),
+        RetrievedChunk(content="Invoices are under Account > Billing.", score=0.8),
+        RetrievedChunk(content="Refunds take five days.", score=0.7),
+    ]
+    builder = PromptBuilder(snippet_token_budget=60, max_snippet_tokens=50)
+    snippets = builder.snippets(chunks)
+    assert snippets[0].endswith("...")
+    assert sum((len(snippet) + 3) // 4 for snippet in snippets) <= 60
+    assert "Refunds take five days." not in snippets
+
+
+def wait_for_followers(pipeline: RagPipeline, count: int) -> None:
+    deadline = time.monotonic() + 5
+    while pipeline.coalescer.stats()["coalesce_followers"] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_concurrent_identical_questions_share_one_llm_call():
+    pipeline, llm = build_pipeline(llm=GatedLLM(), answer_cache_size=0)
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda q=query: results.append(pipeline.generate_answer(q, context=""))
+        )
+        for query in ["Is the site down?"] * 5 + ["is the SITE down"] * 5
+    ]
+    for thread in threads:
+        thread.start()
+    wait_for_followers(pipeline, 9)
+    llm.release.set()
+    for thread in threads:
+        thread.join()
+
+    assert llm.calls == 1
+    assert len(results) == 10 and len(set(results)) == 1
+    # The key is released afterwards; with the cache disabled this is a new call.
+    pipeline.generate_answer("Is the site down?", context="")
+    assert llm.calls == 2
+    assert pipeline.coalescer.stats()["coalesce_in_flight"] == 0
+
+
+def test_async_callers_coalesce_and_survive_leader_cancellation():
+    pipeline, llm = build_pipeline(llm=GatedLLM(), answer_cache_size=0)
+
+    async def run():
+        leader = asyncio.ensure_future(pipeline.agenerate_answer("Is the site down?", ""))
+        await asyncio.sleep(0.01)
+        followers = [
+            asyncio.ensure_future(pipeline.agenerate_answer("is the site down", ""))
+            for _ in range(20)
+        ]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        # A sync caller from another thread joins the same call.
+        sync = asyncio.to_thread(pipeline.generate_answer, "Is the site down?", "")
+        sync_task = asyncio.ensure_future(sync)
+        await asyncio.to_thread(wait_for_followers, pipeline, 21)
+        llm.release.set()
+        return await asyncio.gather(*followers, sync_task)
+
+    answers = asyncio.run(run())
+    assert llm.calls == 1
+    assert len(answers) == 21 and len(set(answers)) == 1
+
+
+def test_cancelled_follower_does_not_fail_the_others():
+    pipeline, llm = build_pipeline(llm=GatedLLM(), answer_cache_size=0)
+
+    async def run():
+        leader = asyncio.ensure_future(pipeline.agenerate_answer("Is the site down?", ""))
+        await asyncio.sleep(0.01)
+        followers = [
+            asyncio.ensure_future(pipeline.agenerate_answer("Is the site down?", ""))
+            for _ in range(2)
+        ]
+        await asyncio.to_thread(wait_for_followers, pipeline, 2)
+        followers[0].cancel()
+        await asyncio.sleep(0.01)
+        llm.release.set()
+        return await asyncio.gather(leader, followers[1])
+
+    leader_answer, follower_answer = asyncio.run(run())
+    assert leader_answer == follower_answer
+    assert llm.calls == 1
+
+
+def test_concurrent_questions_with_different_contexts_are_not_coalesced():
+    pipeline, llm = build_pipeline(llm=GatedLLM(), answer_cache_size=0)
+
+    async def run():
+        tasks = [
+            asyncio.ensure_future(pipeline.agenerate_answer("Is the site down?", context))
+            for context in ["", "", "User: I am bob@example.com\nAssistant: hi"]
+        ]
+        await asyncio.to_thread(wait_for_followers, pipeline, 1)
+        llm.release.set()
+        return await asyncio.gather(*tasks)
+
+    answers = asyncio.run(run())
+    assert llm.calls == 2
+    assert answers[0] == answers[1] != answers[2]
+
+
+def test_coalescing_can_be_disabled():
+    pipeline, _ = build_pipeline(coalesce_requests=False)
+    assert pipeline.coalescer is None
+    assert pipeline.generate_answer("Is the site down?", context="")[0] == "answer 1"
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from array import array
+
+from rag.bm25 import BM25Index
+from rag.hybrid import HybridVectorStore, Reranker, reciprocal_rank_fusion
+from rag.index import (
+    CachedEmbeddings,
+    EmbeddingDiskCache,
+    InMemoryVectorStore,
+    RetrievedChunk,
+    content_hash,
+)
+
+
+def test_bm25_ranks_rarer_terms_higher():
+    index = BM25Index()
+    index.add("reset your password from the security settings page")
+    index.add("download invoices from the billing page")
+    index.add("the page explains shipping times")
+    results = index.search("password page", top_k=3)
+    assert results[0][0] == 0
+    assert len(results) == 3
+    assert all(0.0 < score <= 1.0 for _, score in results)
+
+
+def test_bm25_top_k_and_unknown_terms():
+    index = BM25Index()
+    for i in range(20):
+        index.add(f"article {i} about billing")
+    assert len(index.search("billing", top_k=5)) == 5
+    assert index.search("nonexistent", top_k=5) == []
+
+
+def test_in_memory_store_returns_documents():
+    store = InMemoryVectorStore()
+    store.add(["Invoices are under Account > Billing.", "Reset passwords in Settings."])
+    results = store.search("where are my invoices?", top_k=2)
+    assert results[0].content.startswith("Invoices")
+
+
+def test_in_memory_store_searches_while_documents_are_added():
+    store = InMemoryVectorStore()
+    errors = []
+
+    def add() -> None:
+        for i in range(2000):
+            store.add([f"Invoice {i} is under Account > Billing."])
+
+    def search() -> None:
+        try:
+            while writer.is_alive():
+                store.search("where is my invoice?", top_k=3)
+        except Exception as exc:  # noqa: BLE001 - reported by the assert below
+            errors.append(exc)
+
+    writer = threading.Thread(target=add)
+    readers = [threading.Thread(target=search) for _ in range(4)]
+    writer.start()
+    for reader in readers:
+        reader.start()
+    writer.join()
+    for reader in readers:
+        reader.join()
+    assert errors == []
+
+
+class CountingEmbeddings:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(text)), 1.0, 2.0] for text in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [float(len(text)), 0.0, 0.0]
+
+
+def test_embedding_cache_hits_memory_and_disk(tmp_path):
+    backend = CountingEmbeddings()
+    cache = CachedEmbeddings(backend, "test", disk=EmbeddingDiskCache(str(tmp_path)))
+    cache.embed_documents(["alpha", "beta", "alpha"])
+    cache.embed_query("how do I reset my password")
+    cache.embed_query("how do I reset my password")
+    assert backend.calls == 3
+    assert cache.stats()["embedding_cache_hits"] == 1
+
+    restarted = CountingEmbeddings()
+    warm = CachedEmbeddings(restarted, "test", disk=EmbeddingDiskCache(str(tmp_path)))
+    assert warm.embed_documents(["beta"]) == [[4.0, 1.0, 2.0]]
+    assert restarted.calls == 0
+    assert warm.stats()["embedding_cache_disk_hits"] == 1
+
+
+def test_embedding_disk_cache_drops_orphaned_rows(tmp_path):
+    disk = EmbeddingDiskCache(str(tmp_path))
+    disk.put_many({"a": [1.0, 1.0]})
+    disk.close()
+    # A crash after appending a row but before writing its key.
+    with (tmp_path / "embeddings.f32").open("ab") as handle:
+        handle.write(array("f", [9.0, 9.0]).tobytes())
+
+    reopened = EmbeddingDiskCache(str(tmp_path))
+    reopened.put_many({"b": [2.0, 2.0]})
+    assert reopened.get("a") == [1.0, 1.0]
+    assert reopened.get("b") == [2.0, 2.0]
+    reopened.close()
+    assert EmbeddingDiskCache(str(tmp_path)).get("b") == [2.0, 2.0]
+
+
+def test_embedding_cache_evicts_least_recently_used():
+    backend = CountingEmbeddings()
+    cache = CachedEmbeddings(backend, "test", max_entries=2)
+    cache.embed_documents(["a", "b"])
+    cache.embed_documents(["a"])
+    cache.embed_documents(["c"])
+    cache.embed_documents(["b"])
+    assert backend.calls == 4
+
+
+class RankedDenseStore(InMemoryVectorStore):
+    """Dense stand-in that ranks documents in a fixed order with fixed scores."""
+
+    persistent = True
+
+    def __init__(self, ranking):
+        super().__init__()
+        self.ranking = ranking
+
+    def search(self, query, top_k):
+        return [RetrievedChunk(content=doc, score=score) for doc, score in self.ranking[:top_k]]
+
+
+class SlowReranker(Reranker):
+    def __init__(self, delay_s: float) -> None:
+        self.delay_s = delay_s
+        self.calls = 0
+
+    def rerank(self, query, chunks):
+        self.calls += 1
+        time.sleep(self.delay_s)
+        return list(reversed(chunks))
+
+
+DOCS = [
+    "Reset your password from Settings > Security.",
+    "Invoices live under Account > Billing.",
+    "Forgotten credentials can be recovered with the sign-in help link.",
+]
+
+
+def test_reciprocal_rank_fusion_prefers_agreement():
+    a, b, c = (RetrievedChunk(content=doc, score=0.5) for doc in DOCS)
+    fused = reciprocal_rank_fusion([[a, b], [b, c]])
+    assert [chunk.content for chunk in fused][0] == b.content
+    assert abs(fused[0].score - (1 / 62 + 1 / 61) / (2 / 61)) < 1e-9
+    assert all(0.0 < chunk.score <= 1.0 for chunk in fused)
+
+
+def test_hybrid_store_fuses_lexical_and_dense_hits():
+    dense = RankedDenseStore([(DOCS[2], 0.8), (DOCS[0], 0.7), (DOCS[1], 0.05)])
+    dense.add(DOCS)
+    store = HybridVectorStore(dense=dense, min_score=0.15)
+    assert store.persistent
+    # Seeded from the dense store, so BM25 works after a restart.
+    assert len(store.lexical.existing_ids([content_hash(doc) for doc in DOCS])) == 3
+
+    results = store.search("reset my password", top_k=3)
+    contents = [chunk.content for chunk in results]
+    assert contents[0] == DOCS[0]
+    assert DOCS[2] in contents  # semantic-only match survives fusion
+    assert DOCS[1] not in contents  # below min_score in the dense list
+    assert asyncio.run(store.asearch("reset my password", top_k=3)) == results
+
+
+def test_hybrid_reranker_is_skipped_when_over_budget():
+    dense = RankedDenseStore([(DOCS[0], 0.9), (DOCS[2], 0.8)])
+    dense.add(DOCS)
+    reranker = SlowReranker(delay_s=0.02)
+    store = HybridVectorStore(dense=dense, reranker=reranker, budget_ms=10.0)
+
+    first = store.search("reset password", top_k=2)
+    assert reranker.calls == 1
+    assert first[0].content == DOCS[2]
+    store.search("reset password", top_k=2)
+    assert reranker.calls == 1
+    assert store.stats()["hybrid_rerank_skipped"] == 1
+
+
+def test_hybrid_reranker_is_probed_again_after_skips():
+    dense = RankedDenseStore([(DOCS[0], 0.9), (DOCS[2], 0.8)])
+    dense.add(DOCS)
+    reranker = SlowReranker(delay_s=0.02)
+    store = HybridVectorStore(dense=dense, reranker=reranker, budget_ms=10.0, probe_every=3)
+
+    store.search("reset password", top_k=2)
+    for _ in range(3):
+        store.search("reset password", top_k=2)
+    assert reranker.calls == 1
+    # The reranker recovered; the probe picks that up and it stays on.
+    reranker.delay_s = 0.0
+    store.search("reset password", top_k=2)
+    assert reranker.calls == 2
+    store.search("reset password", top_k=2)
+    assert reranker.calls == 3
+    assert store.stats()["hybrid_rerank_skipped"] == 3
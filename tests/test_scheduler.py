@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from rag.scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_HIGH,
+    LLMScheduler,
+    SchedulerOverloaded,
+    llm_priority,
+)
+
+
+class LatencyStubLLM:
+    """Sleeps ``delay_s`` per call and records call order and peak concurrency."""
+
+    def __init__(self, delay_s: float) -> None:
+        self.delay_s = delay_s
+        self.order = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _enter(self, prompt: str) -> None:
+        with self._lock:
+            self.order.append(prompt)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def invoke(self, prompt: str) -> str:
+        self._enter(prompt)
+        time.sleep(self.delay_s)
+        self._exit()
+        return f"answer to {prompt}"
+
+    async def ainvoke(self, prompt: str) -> str:
+        self._enter(prompt)
+        await asyncio.sleep(self.delay_s)
+        self._exit()
+        return f"answer to {prompt}"
+
+    async def astream(self, prompt: str):
+        self._enter(prompt)
+        for token in ("answer ", "to ", prompt):
+            await asyncio.sleep(self.delay_s / 3)
+            yield token
+        self._exit()
+
+
+def test_in_flight_cap_holds_for_threads():
+    llm = LatencyStubLLM(delay_s=0.02)
+    scheduler = LLMScheduler(llm, max_in_flight=2, max_queue=16)
+    threads = [
+        threading.Thread(target=scheduler.invoke, args=(f"q{i}",)) for i in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(llm.order) == 10
+    assert llm.peak_in_flight == 2
+    stats = scheduler.stats()
+    assert stats["scheduler_admitted"] == 10
+    assert stats["scheduler_in_flight"] == stats["scheduler_queued"] == 0
+
+
+def test_full_queue_fails_fast():
+    llm = LatencyStubLLM(delay_s=0.1)
+    scheduler = LLMScheduler(llm, max_in_flight=1, max_queue=2)
+
+    async def run():
+        calls = [asyncio.ensure_future(scheduler.ainvoke(f"q{i}")) for i in range(3)]
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        with pytest.raises(SchedulerOverloaded):
+            await scheduler.ainvoke("one too many")
+        rejected_after = time.perf_counter() - start
+        await asyncio.gather(*calls)
+        return rejected_after
+
+    assert asyncio.run(run()) < 0.01
+    assert scheduler.stats()["scheduler_rejected"] == 1
+
+
+def test_high_lane_overtakes_queued_long_generations():
+    llm = LatencyStubLLM(delay_s=0.02)
+    scheduler = LLMScheduler(llm, max_in_flight=1, short_prompt_tokens=8)
+    long_prompt = "explain the whole billing history " * 4
+
+    async def run():
+        first = asyncio.ensure_future(scheduler.ainvoke("busy"))
+        await asyncio.sleep(0)
+        queued = [asyncio.ensure_future(scheduler.ainvoke(long_prompt)) for _ in range(3)]
+        await asyncio.sleep(0)
+        with llm_priority(PRIORITY_BACKGROUND):
+            summary = asyncio.ensure_future(scheduler.ainvoke("summary"))
+        await asyncio.sleep(0)
+        short = asyncio.ensure_future(scheduler.ainvoke("site down?"))
+        with llm_priority(PRIORITY_HIGH):
+            escalation = asyncio.ensure_future(scheduler.ainvoke(long_prompt + "!"))
+        await asyncio.gather(first, summary, short, escalation, *queued)
+
+    asyncio.run(run())
+    assert llm.order[:3] == ["busy", "site down?", long_prompt + "!"]
+    assert llm.order[-1] == "summary"
+    assert scheduler.stats()["scheduler_high_served"] == 3
+
+
+def test_cancelled_waiter_and_stream_release_their_slots():
+    llm = LatencyStubLLM(delay_s=0.03)
+    scheduler = LLMScheduler(llm, max_in_flight=1)
+
+    async def run():
+        tokens = []
+
+        async def consume():
+            async for token in scheduler.astream("stream"):
+                tokens.append(token)
+
+        stream = asyncio.ensure_future(consume())
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(scheduler.ainvoke("gives up"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await stream
+        assert await scheduler.ainvoke("next") == "answer to next"
+        return tokens
+
+    assert "".join(asyncio.run(run())) == "answer to stream"
+    assert "gives up" not in llm.order
+    assert scheduler.stats()["scheduler_in_flight"] == 0
+
+
+def test_sessions_with_unresolved_turns_use_the_high_lane():
+    from agent.session import SessionState
+    from app.components import build_components
+    from app.config import AppConfig, RAGConfig, SchedulerConfig
+
+    config = AppConfig(
+        rag=RAGConfig(vector_store="in_memory", answer_cache_size=0),
+        scheduler=SchedulerConfig(short_prompt_tokens=0),
+    )
+    components = build_components(config, llm=LatencyStubLLM(delay_s=0))
+    components.vector_store.add(["Reset your password from Settings > Security."])
+    agent, scheduler = components.agent, components.scheduler
+    question = "How do I reset my password?"
+
+    def struggling() -> SessionState:
+        # An answered turn resets the counter, so each call gets a fresh session.
+        return SessionState(unresolved_turns=1)
+
+    async def run():
+        await agent.ahandle_message(question, session=SessionState())
+        await agent.ahandle_message(question, session=struggling())
+        async for _ in agent.astream_message(question, session=struggling()):
+            pass
+
+    asyncio.run(run())
+    agent.handle_message(question, session=struggling())
+    stats = scheduler.stats()
+    assert stats["scheduler_normal_served"] == 1
+    assert stats["scheduler_high_served"] == 3
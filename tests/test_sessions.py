@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from agent.session import SessionState, SessionStore, approx_session_bytes
+
+
+def test_session_store_reuses_state_per_session():
+    store = SessionStore()
+    first = store.get("a")
+    first.unresolved_turns = 2
+    assert store.get("a") is first
+    assert store.get("b") is not first
+
+
+def test_session_store_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2)
+    store.get("a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+    assert "a" in store and "c" in store
+    assert "b" not in store
+    assert store.metrics()["sessions_evicted"] == 1
+
+
+def test_session_store_expires_idle_sessions():
+    now = [0.0]
+    store = SessionStore(idle_ttl_s=60.0, clock=lambda: now[0])
+    store.get("a")
+    now[0] = 30.0
+    store.get("b")
+    now[0] = 70.0
+    store.evict_expired()
+    assert "a" not in store
+    assert "b" in store
+
+
+def test_session_metrics_report_size():
+    store = SessionStore()
+    store.get("a").memory.add_turn("hello", "hi there")
+    metrics = store.metrics()
+    assert metrics["sessions"] == 1
+    assert metrics["approx_bytes_per_session"] > 0
+
+
+def test_session_size_counts_rendered_turns_and_cached_context():
+    state = SessionState()
+    state.memory.add_turn("where are my invoices?", "Under Account > Billing.")
+    before = approx_session_bytes(state)
+    context = state.memory.context()
+    assert approx_session_bytes(state) >= before + len(context)
+    # Each turn is held twice: as a pair and rendered.
+    assert before > 2 * len(context)
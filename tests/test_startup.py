@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import subprocess
+import sys
+
+from app.components import build_components
+from app.config import AppConfig, RAGConfig
+from app.main import run_interactive
+
+HEAVY_MODULES = (
+    "app.server",
+    "fastapi",
+    "starlette",
+    "uvicorn",
+    "langchain_core",
+    "langchain_community",
+    "langchain_ollama",
+    "chromadb",
+    "sentence_transformers",
+    "faiss",
+)
+
+# Imports the CLI and answers one question with a stub LLM in a fresh interpreter.
+FIRST_ANSWER = """
+import json, sys
+import app.main
+from app.components import build_components
+from app.config import AppConfig, RAGConfig
+
+class StubLLM:
+    def invoke(self, prompt):
+        return "Open Settings > Security."
+
+config = AppConfig(rag=RAGConfig(vector_store="in_memory"))
+build_components(config, llm=StubLLM()).agent.handle_message("How do I reset my password?")
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+class StubLLM:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def invoke(self, prompt: str) -> str:
+        self.calls += 1
+        return "Open Settings > Security."
+
+
+def test_cli_import_and_first_answer_skip_heavy_dependencies():
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    output = subprocess.run(
+        [sys.executable, "-c", FIRST_ANSWER],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    ).stdout
+    loaded = json.loads(output)
+    heavy = [
+        name
+        for name in loaded
+        if any(name == module or name.startswith(module + ".") for module in HEAVY_MODULES)
+    ]
+    assert heavy == []
+
+
+def test_interactive_mode_answers_each_line_with_one_agent():
+    llm = StubLLM()
+    config = AppConfig(rag=RAGConfig(vector_store="in_memory", answer_cache_size=0))
+    components = build_components(config, llm=llm)
+    components.vector_store.add(["Reset your password from Settings > Security."])
+    out = io.StringIO()
+
+    answered = run_interactive(
+        components.agent,
+        io.StringIO("How do I reset my password?\nAnd where is Security?\n\nignored\n"),
+        out,
+    )
+
+    assert answered == 2
+    assert llm.calls == 2
+    assert out.getvalue().count("Response: Open Settings > Security.") == 2
+    assert len(components.agent.memory.context().splitlines()) == 4
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+
+from app.warmup import WARMUP_PROMPT, Warmup
+from rag.index import InMemoryVectorStore
+
+
+class FlakyLLM:
+    """Fails the first ``failures`` calls, like Ollama still loading the model."""
+
+    def __init__(self, failures: int = 0) -> None:
+        self.failures = failures
+        self.prompts = []
+
+    async def ainvoke(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        if len(self.prompts) <= self.failures:
+            raise ConnectionError("connection refused")
+        return "OK"
+
+
+class CountingStore(InMemoryVectorStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.searches = 0
+
+    def search(self, query, top_k):
+        self.searches += 1
+        return super().search(query, top_k)
+
+
+def test_warmup_touches_index_and_model_once():
+    store, llm = CountingStore(), FlakyLLM()
+    warmup = Warmup(store, llm)
+    assert warmup.status()["status"] == "warming_up"
+
+    asyncio.run(warmup.run())
+
+    assert warmup.ready
+    assert store.searches == 1
+    assert llm.prompts == [WARMUP_PROMPT]
+    assert {name: step["status"] for name, step in warmup.status()["steps"].items()} == {
+        "index": "ok",
+        "llm": "ok",
+    }
+
+
+def test_warmup_retries_failed_steps_only():
+    store, llm = CountingStore(), FlakyLLM(failures=2)
+    warmup = Warmup(store, llm, retry_interval_s=0.001)
+
+    assert asyncio.run(warmup.run_once()) is False
+    llm_step = warmup.status()["steps"]["llm"]
+    assert (llm_step["status"], llm_step["error"]) == ("failed", "connection refused")
+
+    asyncio.run(warmup.run())
+    assert warmup.ready and warmup.attempts == 3
+    assert store.searches == 1
+    assert len(llm.prompts) == 3
+
+
+def test_warmup_without_llm_skips_generation():
+    warmup = Warmup(InMemoryVectorStore(), llm=None)
+    assert asyncio.run(warmup.run_once())
+    assert warmup.status()["steps"]["llm"]["status"] == "skipped"
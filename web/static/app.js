@@ -11,6 +11,40 @@ function addBubble(text, role) {
   bubble.textContent = text;
   chat.appendChild(bubble);
   chat.scrollTop = chat.scrollHeight;
+  return bubble;
+}
+
+function parseEvent(block) {
+  let name = "message";
+  let data = "";
+  for (const line of block.split("\n")) {
+    if (line.startsWith("event: ")) {
+      name = line.slice(7);
+    } else if (line.startsWith("data: ")) {
+      data += line.slice(6);
+    }
+  }
+  return { name, data: data ? JSON.parse(data) : null };
+}
+
+const RETRY_MESSAGE = "Something went wrong. Please try again.";
+const BUSY_MESSAGE = "We are busy right now. Please try again in a moment.";
+
+function fail(bubble, text) {
+  statusEl.textContent = "Status: error";
+  if (bubble.textContent) {
+    // Keep the partial answer but make clear it was cut off.
+    bubble.textContent += ` — ${text}`;
+  } else {
+    bubble.textContent = text;
+  }
+}
+
+function finish(data) {
+  sessionId = data.session_id;
+  statusEl.textContent = data.escalated
+    ? `Status: escalated (${data.escalation_reason})`
+    : "Status: resolved";
 }
 
 async function sendMessage(message) {
@@ -20,24 +54,64 @@ async function sendMessage(message) {
     payload.session_id = sessionId;
   }
 
-  const response = await fetch("/chat", {
-    method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify(payload),
-  });
+  let response;
+  try {
+    response = await fetch("/chat/stream", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload),
+    });
+  } catch (error) {
+    response = null;
+  }
 
-  if (!response.ok) {
-    statusEl.textContent = "Status: error";
-    addBubble("Something went wrong. Please try again.", "bot");
+  if (!response || !response.ok || !response.body) {
+    const busy = response && response.status === 503;
+    fail(addBubble("", "bot"), busy ? BUSY_MESSAGE : RETRY_MESSAGE);
     return;
   }
 
-  const data = await response.json();
-  sessionId = data.session_id;
-  addBubble(data.response, "bot");
-  statusEl.textContent = data.escalated
-    ? `Status: escalated (${data.escalation_reason})`
-    : "Status: resolved";
+  const bubble = addBubble("", "bot");
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let ended = false;
+  statusEl.textContent = "Status: answering...";
+
+  try {
+    while (!ended) {
+      const { value, done } = await reader.read();
+      if (done) {
+        break;
+      }
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf("\n\n");
+      while (boundary !== -1 && !ended) {
+        const event = parseEvent(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        if (event.name === "token") {
+          bubble.textContent += event.data.token;
+          chat.scrollTop = chat.scrollHeight;
+        } else if (event.name === "done") {
+          bubble.textContent = event.data.response;
+          finish(event.data);
+          ended = true;
+        } else if (event.name === "error") {
+          const busy = event.data && event.data.error === "overloaded";
+          fail(bubble, busy ? BUSY_MESSAGE : RETRY_MESSAGE);
+          ended = true;
+        }
+        boundary = buffer.indexOf("\n\n");
+      }
+    }
+  } catch (error) {
+    // The connection dropped mid-answer; handled below like an early end.
+  }
+
+  if (!ended) {
+    // The stream closed without a done or error event.
+    fail(bubble, RETRY_MESSAGE);
+  }
 }
 
 form.addEventListener("submit", async (event) => {